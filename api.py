@@ -1,94 +1,133 @@
-import os
-from flask import Flask, request, jsonify
+import datetime
+import json
+import secrets
+from contextlib import asynccontextmanager
 
-from database.database_manager import SessionLocal
-from database.models import Patient, Doctor, Appointment, MedicalExam, User # <-- Adicionado User
-from vector_store.vector_manager import VectorManager
-from llm_services.gemini_service import GeminiChatService
-from llm_services.openai_service import OpenAIChatService
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 
-# --- Funções de Inicialização ---
-def create_initial_user():
-    """
-    Cria o usuário administrador inicial se ele não existir.
-    """
-    db = SessionLocal()
-    try:
-        admin_user = db.query(User).filter_by(username='adm').first()
-        if not admin_user:
-            print("Criando usuário administrador inicial para a API...")
-            new_admin = User(
-                username='adm',
-                name='Dr Marcos Lopes',
-                role='admin'
-            )
-            new_admin.set_password('123456')
-            db.add(new_admin)
-            db.commit()
-            print("Usuário 'adm' criado com sucesso.")
-    finally:
-        db.close()
+import config
+import metrics
+from app_services import AppServices
+from database.api_sessions import (create_session, delete_session, get_session, get_user_credentials, hash_password,
+                                   password_needs_rehash, token_digest, update_password_hash, verify_password)
+from database.async_session import AsyncSessionLocal, dispose_async_database, get_db
+from database.job_queue import STATUSES, get_job, list_jobs, queue_stats, submit_job
+from database.patient_listing import iter_patients_async, list_patients_page
+from database.patient_search import find_patient, search_patients
+from database.patient_history import load_patient_timeline, render_patient_history
+from database.summary_cache import get_cached_summary, store_summary
+from llm_services import history_summarizer
+from llm_services.async_chat import close_http_client
 
 # --- Inicialização da Aplicação ---
-app = Flask(__name__)
+# Índice, modelo e serviços de LLM são criados sob demanda (ver AppServices)
+services = AppServices()
+api = APIRouter()
+
+HOSPITAL_NAME = "Vinsaura Saúde"
 
-# Inicializa os módulos de IA
-vector_manager = VectorManager()
-gemini_chat_service = GeminiChatService()
-openai_chat_service = OpenAIChatService()
+def error_response(message, status_code):
+    return JSONResponse({"error": message}, status_code=status_code)
 
-# Cria o usuário admin e indexa os documentos ao iniciar a API
-create_initial_user()
-print("Inicializando e indexando exames médicos para a API...")
-vector_manager.index_medical_exams()
-print("Indexação concluída para a API.")
+def request_token(request):
+    header = request.headers.get('authorization', '')
+    if header.lower().startswith('bearer '):
+        return header[7:].strip()
+    # EventSource (SSE) não envia cabeçalhos: aceita também o token na query string
+    return request.query_params.get('access_token')
 
-HOSPITAL_NAME = "Vinsaura Saúde"
+async def require_user(request: Request):
+    """
+    Valida o token da requisição: busca O(1) no cache de sessões do worker e,
+    na falta, uma leitura pela chave primária de `api_sessions`. Sem hash de senha.
+    """
+    if not config.API_AUTH_REQUIRED:
+        return None
+    token = request_token(request)
+    if not token:
+        raise HTTPException(401, "Token de acesso ausente.", headers={"WWW-Authenticate": "Bearer"})
+    token_hash = token_digest(token)
+    session = services.session_cache.get(token_hash)
+    if session is None:
+        async with AsyncSessionLocal() as db:
+            session = await db.run_sync(get_session, token_hash)
+        if session is not None:
+            services.session_cache.set(token_hash, session)
+    if session is None or session["expires_at"] <= datetime.datetime.utcnow():
+        services.session_cache.pop(token_hash)
+        raise HTTPException(401, "Token inválido ou expirado.", headers={"WWW-Authenticate": "Bearer"})
+    return session
+
+protected = [Depends(require_user)]
+
+async def require_metrics_access(request: Request):
+    """
+    /metrics: com `METRICS_TOKEN` aceita só esse token (Prometheus com
+    `authorization` fixo, sem login); sem ele, o mesmo token de usuário dos dados.
+    """
+    if not config.METRICS_TOKEN:
+        return await require_user(request)
+    if not secrets.compare_digest(request_token(request) or '', config.METRICS_TOKEN):
+        raise HTTPException(401, "Token de métricas inválido.", headers={"WWW-Authenticate": "Bearer"})
 
 # --- Endpoints da API ---
 
-@app.route('/')
-def home():
-    return jsonify({"hospital_name": HOSPITAL_NAME, "message": "Bem-vindo à API do Sistema de Gerenciamento Hospitalar com IA!"})
+@api.get('/')
+async def home():
+    return {"hospital_name": HOSPITAL_NAME, "message": "Bem-vindo à API do Sistema de Gerenciamento Hospitalar com IA!"}
 
 # --- Endpoint de Autenticação ---
-@app.route('/api/login', methods=['POST'])
-def login():
-    data = request.get_json()
-    if not data or not data.get('username') or not data.get('password'):
-        return jsonify({"error": "'username' e 'password' são obrigatórios."}), 400
+@api.post('/api/login')
+async def login(request: Request, db=Depends(get_db)):
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    if not isinstance(data, dict) or not data.get('username') or not data.get('password'):
+        return error_response("'username' e 'password' são obrigatórios.", 400)
 
     username = data['username']
     password = data['password']
 
-    db = SessionLocal()
-    try:
-        user = db.query(User).filter_by(username=username).first()
-        if user and user.check_password(password):
-            # Em um sistema real, aqui você geraria um token (JWT)
-            return jsonify({
-                "message": "Login bem-sucedido!",
-                "user": {
-                    "username": user.username,
-                    "name": user.name,
-                    "role": user.role
-                }
-            })
-        else:
-            return jsonify({"error": "Credenciais inválidas."}), 401
-    finally:
-        db.close()
+    user = await db.run_sync(get_user_credentials, username)
+    # O hash da senha é custoso em CPU: verificado no pool de autenticação, fora do event loop
+    password_hash = user.password_hash if user else services.dummy_password_hash
+    if not (await services.run_auth(verify_password, password_hash, password) and user):
+        return error_response("Credenciais inválidas.", 401)
 
-# --- Endpoints de Dados (a serem protegidos) ---
+    if password_needs_rehash(user.password_hash):
+        # Custo do hash alterado em PASSWORD_HASH_METHOD: atualiza com a senha recebida
+        new_hash = await services.run_auth(hash_password, password)
+        await db.run_sync(update_password_hash, user.id, new_hash)
+    token, expires_at = await db.run_sync(create_session, user.id, username, user.role)
+    services.session_cache.set(token_digest(token), {"user_id": user.id, "username": username,
+                                                     "role": user.role, "expires_at": expires_at})
+    return {
+        "message": "Login bem-sucedido!",
+        "token": token,
+        "token_type": "bearer",
+        "expires_at": expires_at.isoformat() + "Z",
+        "user": {
+            "username": username,
+            "name": user.name,
+            "role": user.role
+        }
+    }
 
-@app.route('/api/search', methods=['GET'])
-def search_exams():
-    # TODO: Proteger este endpoint
-    query = request.args.get('q')
-    if not query:
-        return jsonify({"error": "Parâmetro 'q' (query) é obrigatório."}), 400
+@api.post('/api/logout')
+async def logout(request: Request, db=Depends(get_db), session=Depends(require_user)):
+    token = request_token(request)
+    if token:
+        token_hash = token_digest(token)
+        services.session_cache.pop(token_hash)
+        await db.run_sync(delete_session, token_hash)
+    return {"message": "Sessão encerrada."}
 
-    similar_exams = vector_manager.search_similar_exams(query)
+# --- Endpoints de Dados (exigem token, ver require_user) ---
+
+def format_search_results(similar_exams):
     results = []
     for exam in similar_exams:
         results.append({
@@ -96,55 +135,314 @@ def search_exams():
             "original_text_snippet": exam["original_text"][:200] + "...",
             "score": round(exam["score"], 4)
         })
-    return jsonify({"query": query, "results": results})
+    return results
+
+def parse_search_filters(source):
+    """
+    Lê os filtros opcionais da busca: paciente, médico, especialidade, tipo de exame e período.
+    """
+    filters = {}
+    try:
+        for key in ('patient_id', 'doctor_id'):
+            if source.get(key) not in (None, ''):
+                filters[key] = int(source[key])
+        for key in ('date_from', 'date_to'):
+            if source.get(key):
+                filters[key] = datetime.date.fromisoformat(source[key])
+    except (TypeError, ValueError):
+        return None, "Filtros inválidos: ids devem ser inteiros e datas no formato AAAA-MM-DD."
+    for key in ('specialty', 'exam_type'):
+        if source.get(key):
+            filters[key] = source[key]
+    return filters, None
+
+@api.get('/api/search', dependencies=protected)
+async def search_exams(request: Request):
+    query = request.query_params.get('q')
+    if not query:
+        return error_response("Parâmetro 'q' (query) é obrigatório.", 400)
+    filters, error = parse_search_filters(request.query_params)
+    if error:
+        return error_response(error, 400)
+
+    similar_exams = await services.run_search(services.vector_manager.search_similar_exams, query, filters=filters)
+    return {"query": query, "results": format_search_results(similar_exams)}
 
-@app.route('/api/summarize', methods=['GET'])
-def summarize_patient_history():
-    # TODO: Proteger este endpoint
-    patient_name = request.args.get('patient_name')
-    llm_service_choice = request.args.get('service', 'gemini').lower()
+@api.post('/api/search/batch', dependencies=protected)
+async def search_exams_batch(request: Request):
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    if not isinstance(data, dict):
+        data = {}
+    queries = data.get('queries')
+    if not isinstance(queries, list) or not queries or not all(isinstance(q, str) and q.strip() for q in queries):
+        return error_response("'queries' deve ser uma lista não vazia de textos.", 400)
+    if len(queries) > config.SEARCH_BATCH_MAX:
+        return error_response(f"Máximo de {config.SEARCH_BATCH_MAX} consultas por requisição.", 400)
+    try:
+        k = int(data.get('k', 5))
+    except (TypeError, ValueError):
+        return error_response("'k' deve ser um número inteiro.", 400)
+    if k < 1:
+        return error_response("'k' deve ser maior que zero.", 400)
+    filters, error = parse_search_filters(data.get('filters') or {})
+    if error:
+        return error_response(error, 400)
+
+    batch_results = await services.run_search(services.vector_manager.search_similar_exams_batch,
+                                              queries, k, filters=filters)
+    return {"results": [
+        {"query": query, "results": format_search_results(similar_exams)}
+        for query, similar_exams in zip(queries, batch_results)
+    ]}
+
+@api.get('/api/search/cache-stats', dependencies=protected)
+async def search_cache_stats():
+    return services.vector_manager.cache_stats()
+
+@api.get('/api/summarize', dependencies=protected)
+async def summarize_patient_history(request: Request, db=Depends(get_db)):
+    patient_name = request.query_params.get('patient_name')
+    llm_service_choice = request.query_params.get('service', 'gemini').lower()
 
     if not patient_name:
-        return jsonify({"error": "Parâmetro 'patient_name' é obrigatório."}), 400
+        return error_response("Parâmetro 'patient_name' é obrigatório.", 400)
+
+    patient = await db.run_sync(find_patient, patient_name)
+    if not patient:
+        return error_response(f"Paciente '{patient_name}' não encontrado.", 404)
+    # Um rollback ao gravar o cache expira `patient`; lê os campos usados na resposta antes
+    patient_id, display_name = patient.id, patient.name
 
-    db = SessionLocal()
+    if llm_service_choice not in services.async_chat_services and llm_service_choice != 'auto':
+        return error_response("Serviço de LLM inválido. Escolha 'gemini', 'openai' ou 'auto'.", 400)
+
+    # O serviço escolhido é o preferido; em caso de falha o roteador usa o outro provedor
+    chat_service = services.llm_router.for_provider(None if llm_service_choice == 'auto' else llm_service_choice)
+    force_refresh = request.query_params.get('refresh', '').lower() in ('1', 'true', 'sim')
+    # Resumo focado: só os exames mais relevantes para o tema (busca vetorial no paciente) e a linha do tempo
+    topic = " ".join(request.query_params.get('topic', '').split())
+    if request.query_params.get('background', '').lower() in ('1', 'true', 'sim'):
+        if topic:
+            return error_response("O resumo focado ('topic') não está disponível em segundo plano.", 400)
+        # Resumo pela fila de tarefas: responde na hora; o resultado sai em /api/jobs/{id}
+        job = await db.run_sync(submit_job, "summarize_patient", {
+            "patient_id": patient_id, "service": llm_service_choice, "force_refresh": force_refresh})
+        return JSONResponse({"patient_name": display_name, "job": job}, status_code=202)
+    relevant = None
+    if topic:
+        try:
+            k = int(request.query_params.get('k', config.SUMMARY_FOCUS_TOP_K))
+        except ValueError:
+            return error_response("'k' deve ser um número inteiro.", 400)
+        if k < 1:
+            return error_response("'k' deve ser maior que zero.", 400)
+        with metrics.stage("summary.retrieval"):
+            relevant = await services.run_search(services.vector_manager.search_similar_exams, topic, k,
+                                                 filters={"patient_id": patient_id})
     try:
-        patient = db.query(Patient).filter(Patient.name.ilike(f"%{patient_name}%")).first()
-        if not patient:
-            return jsonify({"error": f"Paciente '{patient_name}' não encontrado."}), 404
-
-        history_text = f"Histórico do Paciente: {patient.name} (Nasc: {patient.date_of_birth.strftime('%Y-%m-%d')})\n"
-        # ... (lógica para construir o histórico)
-        appointments = db.query(Appointment).filter_by(patient_id=patient.id).all()
-        for appt in appointments:
-            history_text += f"\n  Consulta em {appt.appointment_date.strftime('%Y-%m-%d')} com Dr. {appt.doctor.name}: {appt.description}\n"
-            for exam in appt.exams:
-                history_text += f"    - Exame: {exam.exam_type}\n      Resultados: {exam.results}\n      Plano: {exam.treatment_plan}\n"
-
-        summary = ""
-        if llm_service_choice == 'gemini':
-            summary = gemini_chat_service.summarize_text(history_text)
-        elif llm_service_choice == 'openai':
-            summary = openai_chat_service.summarize_text(history_text)
+        if topic:
+            summary, cached, provider = await history_summarizer.summarize_patient_focus_async(
+                db, patient, llm_service_choice, chat_service, topic, [exam["exam_id"] for exam in relevant],
+                force_refresh=force_refresh)
         else:
-            return jsonify({"error": "Serviço de LLM inválido. Escolha 'gemini' ou 'openai'."}), 400
+            summary, cached, provider = await history_summarizer.summarize_patient_history_async(
+                db, patient, llm_service_choice, chat_service, force_refresh=force_refresh)
+    except RuntimeError as e:
+        return error_response(f"Não foi possível gerar o resumo: {e}", 503)
+
+    response = {"patient_name": display_name,
+                "llm_service_used": provider, "summary": summary, "cached": cached}
+    if topic:
+        response["topic"] = topic
+        response["relevant_exams"] = [{"exam_id": exam["exam_id"], "score": round(exam["score"], 4)}
+                                      for exam in relevant]
+    return response
 
-        return jsonify({"patient_name": patient.name, "llm_service_used": llm_service_choice, "summary": summary})
-    finally:
-        db.close()
+@api.get('/api/ready')
+async def readiness():
+    ready, details = services.readiness()
+    return JSONResponse({"ready": ready, "components": details}, status_code=200 if ready else 503)
 
-@app.route('/api/patients', methods=['GET'])
-def list_patients():
-    # TODO: Proteger este endpoint
-    db = SessionLocal()
+@api.get('/api/llm/stats', dependencies=protected)
+async def llm_stats():
+    return services.llm_router.stats()
+
+# --- Fila de tarefas (executadas por `python -m job_worker`) ---
+
+@api.post('/api/jobs', dependencies=protected)
+async def create_job(request: Request, db=Depends(get_db)):
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    if not isinstance(data, dict) or not data.get('kind'):
+        return error_response("'kind' (tipo da tarefa) é obrigatório.", 400)
+    payload = data.get('payload') or {}
+    priority = data.get('priority')
+    if not isinstance(payload, dict):
+        return error_response("'payload' deve ser um objeto.", 400)
+    if priority is not None and (not isinstance(priority, int) or not 0 <= priority <= 9):
+        return error_response("'priority' deve ser um inteiro entre 0 (mais urgente) e 9.", 400)
+    try:
+        job = await db.run_sync(submit_job, data['kind'], payload, priority)
+    except ValueError as e:
+        return error_response(str(e), 400)
+    return JSONResponse({"job": job}, status_code=202)
+
+@api.get('/api/jobs/stats', dependencies=protected)
+async def job_stats(db=Depends(get_db)):
+    return await db.run_sync(queue_stats)
+
+@api.get('/api/jobs/{job_id}', dependencies=protected)
+async def job_status(job_id: int, db=Depends(get_db)):
+    job = await db.run_sync(get_job, job_id)
+    if job is None:
+        return error_response(f"Tarefa {job_id} não encontrada.", 404)
+    return {"job": job}
+
+@api.get('/api/jobs', dependencies=protected)
+async def list_recent_jobs(request: Request, db=Depends(get_db)):
+    status = request.query_params.get('status')
+    if status and status not in STATUSES:
+        return error_response(f"'status' deve ser um de {', '.join(STATUSES)}.", 400)
+    try:
+        limit = max(1, min(int(request.query_params.get('limit', 50)), 500))
+    except ValueError:
+        return error_response("Parâmetro 'limit' deve ser inteiro.", 400)
+    return {"jobs": await db.run_sync(list_jobs, status, request.query_params.get('kind'), limit)}
+
+@api.get('/metrics', include_in_schema=False, dependencies=[Depends(require_metrics_access)])
+async def prometheus_metrics():
+    body, content_type = metrics.render()
+    return Response(body, media_type=content_type)
+
+def sse_event(data, event=None):
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@api.get('/api/summarize/stream', dependencies=protected)
+async def stream_patient_summary(request: Request, db=Depends(get_db)):
+    patient_name = request.query_params.get('patient_name')
+    llm_service_choice = request.query_params.get('service', 'gemini').lower()
+    force_refresh = request.query_params.get('refresh', '').lower() in ('1', 'true', 'sim')
+
+    if not patient_name:
+        return error_response("Parâmetro 'patient_name' é obrigatório.", 400)
+    if llm_service_choice == 'auto':
+        # O trecho já enviado não pode ser refeito em outro provedor: sem roteador (failover/hedge)
+        return error_response("O streaming não aceita 'auto'. Escolha 'gemini' ou 'openai'.", 400)
+    chat_service = services.async_chat_services.get(llm_service_choice)
+    if chat_service is None:
+        return error_response("Serviço de LLM inválido. Escolha 'gemini' ou 'openai'.", 400)
+
+    patient = await db.run_sync(find_patient, patient_name)
+    if not patient:
+        return error_response(f"Paciente '{patient_name}' não encontrado.", 404)
+    patient_id, display_name = patient.id, patient.name
+    with metrics.stage("summary.history"):
+        appointments = await db.run_sync(load_patient_timeline, patient_id)
+        history_text = render_patient_history(patient, appointments)
+    cached = None if force_refresh else await db.run_sync(get_cached_summary, patient_id, llm_service_choice, history_text)
+
+    async def generate():
+        yield sse_event({"patient_name": display_name, "llm_service_used": llm_service_choice,
+                         "cached": cached is not None}, "meta")
+        if cached is not None:
+            yield sse_event({"text": cached})
+            yield sse_event({}, "done")
+            return
+        parts = []
+        try:
+            prompt_text = history_text
+            if len(history_text) > config.SUMMARY_CHUNK_CHARS:
+                # Históricos longos: resume os trechos (map) e transmite só a etapa final (reduce)
+                summarizer = history_summarizer.AsyncChunkedSummarizer(chat_service, llm_service_choice)
+                async with AsyncSessionLocal() as stream_db:
+                    prompt_text = await summarizer.reduce_input(stream_db, patient, appointments)
+            async for chunk in chat_service.stream_summary(prompt_text):
+                parts.append(chunk)
+                yield sse_event({"text": chunk})
+        except Exception as e:
+            yield sse_event({"error": f"Falha ao gerar o resumo: {e}"}, "error")
+            return
+        async with AsyncSessionLocal() as stream_db:
+            await stream_db.run_sync(store_summary, patient_id, llm_service_choice, history_text, "".join(parts))
+        yield sse_event({}, "done")
+
+    return StreamingResponse(generate(), media_type='text/event-stream',
+                             headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@api.get('/api/patients/search', dependencies=protected)
+async def search_patients_by_name(request: Request, db=Depends(get_db)):
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return error_response("Parâmetro 'q' (nome do paciente) é obrigatório.", 400)
+    try:
+        limit = int(request.query_params.get('limit', 10))
+    except ValueError:
+        return error_response("Parâmetro 'limit' deve ser inteiro.", 400)
+    limit = max(1, min(limit, 50))
+
+    return {"query": query, "patients": await db.run_sync(search_patients, query, limit)}
+
+@api.get('/api/patients', dependencies=protected)
+async def list_patients(request: Request, db=Depends(get_db)):
     try:
-        patients = db.query(Patient).all()
-        patient_list = []
-        for p in patients:
-            patient_list.append({"id": p.id, "name": p.name, "date_of_birth": p.date_of_birth.strftime('%Y-%m-%d') if p.date_of_birth else None})
-        return jsonify({"patients": patient_list})
-    finally:
-        db.close()
+        after = int(request.query_params['after']) if request.query_params.get('after') else None
+        limit = int(request.query_params.get('limit', config.PATIENTS_PAGE_SIZE))
+    except ValueError:
+        return error_response("Parâmetros 'after' e 'limit' devem ser inteiros.", 400)
+    if not 1 <= limit <= config.PATIENTS_PAGE_MAX:
+        return error_response(f"'limit' deve estar entre 1 e {config.PATIENTS_PAGE_MAX}.", 400)
+
+    if request.query_params.get('format') == 'ndjson':
+        # Exportação completa: um paciente por linha, enviado à medida que é lido
+        async def generate():
+            async with AsyncSessionLocal() as stream_db:
+                async for patient in iter_patients_async(stream_db, after):
+                    yield json.dumps(patient, ensure_ascii=False) + "\n"
+
+        return StreamingResponse(generate(), media_type='application/x-ndjson')
+
+    patients, next_cursor = await db.run_sync(list_patients_page, after, limit)
+    return {"patients": patients, "next_cursor": next_cursor}
+
+def create_app(preload=False):
+    """
+    Cria a aplicação ASGI sem carregar nada pesado.
+
+    Com `preload=True` (processo mestre do gunicorn, ver gunicorn.conf.py) o
+    banco, o índice de exames e o modelo ficam prontos antes do fork e são
+    compartilhados pelos workers (copy-on-write e memory-map do índice).
+    O restante é preparado em segundo plano quando o servidor inicia.
+    """
+    @asynccontextmanager
+    async def lifespan(app):
+        await run_in_threadpool(services.prepare_database)
+        services.warm_up_in_background()
+        yield
+        await close_http_client()
+        await dispose_async_database()
+
+    app = FastAPI(title=f"API {HOSPITAL_NAME}", lifespan=lifespan)
+    app.include_router(api)
+    app.add_middleware(metrics.MetricsMiddleware)
+    metrics.register_cache_source("api", services.cache_stats)
+
+    @app.exception_handler(HTTPException)
+    async def http_error(request, exc):
+        return JSONResponse({"error": exc.detail}, status_code=exc.status_code, headers=exc.headers)
+
+    app.state.services = services
+    if preload:
+        services.warm_search()
+    return app
+
+app = create_app()
 
 if __name__ == '__main__':
-    app.run(debug=True)
+    import uvicorn
+    uvicorn.run("api:app", host="127.0.0.1", port=5000, reload=True)
@@ -0,0 +1,234 @@
+import asyncio
+import contextvars
+import functools
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+from database.api_sessions import ensure_session_table, hash_password
+from database.async_session import configure_async_database
+from database.database_manager import SessionLocal
+from database.engine_profiles import configure_database
+from database.job_queue import enqueue, ensure_job_table
+from database.models import User
+from database.patient_search import ensure_patient_search
+from database.summary_cache import ensure_summary_table
+from ttl_cache import TTLCache
+
+
+def create_initial_user():
+    """
+    Cria o usuário administrador inicial se ele não existir.
+    """
+    db = SessionLocal()
+    try:
+        admin_user = db.query(User).filter_by(username='adm').first()
+        if not admin_user:
+            print("Criando usuário administrador inicial para a API...")
+            new_admin = User(
+                username='adm',
+                name='Dr Marcos Lopes',
+                role='admin'
+            )
+            new_admin.password_hash = hash_password('123456')
+            db.add(new_admin)
+            db.commit()
+            print("Usuário 'adm' criado com sucesso.")
+    finally:
+        db.close()
+
+
+# Etapa de preparação -> componente criado no primeiro uso quando API_WARMUP=false
+LAZY_COMPONENTS = {"search": "vector_manager", "summarization": "llm_router"}
+
+
+class AppServices:
+    """
+    Componentes da API criados sob demanda: importar a aplicação não carrega
+    o modelo de embeddings, não cria clientes de LLM e não toca no banco.
+
+    - `prepare_database()`: engine, usuário inicial e tabelas auxiliares (uma vez).
+    - `warm_search()`: carrega o índice (memory-map) e o modelo e sincroniza o índice.
+    - `warm_summarization()`: cria os serviços assíncronos de LLM e o roteador.
+    Cada componente também é criado no primeiro uso, se ainda não estiver pronto.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._components = {}
+        self._ready = {"database": False, "search": False, "summarization": False}
+        self._errors = {}
+        self._timings = {}
+        self._warmup_thread = None
+
+    def _get(self, name, factory):
+        component = self._components.get(name)
+        if component is None:
+            with self._lock:
+                component = self._components.get(name)
+                if component is None:
+                    component = self._components[name] = factory()
+        return component
+
+    # --- Componentes ---
+
+    @property
+    def vector_manager(self):
+        from vector_store.exam_index import ExamIndex
+        return self._get("vector_manager", ExamIndex)
+
+    @property
+    def search_executor(self):
+        # Embeddings e FAISS rodam fora do event loop, em um pool de tamanho fixo
+        return self._get("search_executor", lambda: ThreadPoolExecutor(
+            max_workers=config.SEARCH_WORKERS, thread_name_prefix="search"))
+
+    @property
+    def auth_executor(self):
+        # Hashes de senha são custosos em CPU: pool próprio, separado da busca
+        return self._get("auth_executor", lambda: ThreadPoolExecutor(
+            max_workers=config.AUTH_WORKERS, thread_name_prefix="auth"))
+
+    @property
+    def session_cache(self):
+        return self._get("session_cache", lambda: TTLCache(config.AUTH_CACHE_SIZE, config.AUTH_CACHE_TTL))
+
+    @property
+    def dummy_password_hash(self):
+        # Usuário inexistente também paga uma verificação de hash (tempo de resposta uniforme)
+        return self._get("dummy_password_hash", lambda: hash_password(secrets.token_urlsafe(16)))
+
+    @property
+    def async_chat_services(self):
+        def build():
+            from llm_services.async_chat import AsyncGeminiChatService, AsyncOpenAIChatService
+            return {'gemini': AsyncGeminiChatService(), 'openai': AsyncOpenAIChatService()}
+        return self._get("async_chat_services", build)
+
+    @property
+    def llm_router(self):
+        from llm_services.router import AsyncLLMRouter
+        return self._get("llm_router", lambda: AsyncLLMRouter(self.async_chat_services))
+
+    @staticmethod
+    async def _run_in(executor, function, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        # Leva o contexto da requisição para a thread (contagem de consultas SQL em metrics.py)
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(executor, functools.partial(context.run, function, *args, **kwargs))
+
+    async def run_search(self, function, *args, **kwargs):
+        """
+        Executa uma busca (modelo de embeddings + FAISS) no pool de busca.
+        """
+        return await self._run_in(self.search_executor, function, *args, **kwargs)
+
+    async def run_auth(self, function, *args, **kwargs):
+        """
+        Executa o cálculo/verificação de hash de senha no pool de autenticação.
+        """
+        return await self._run_in(self.auth_executor, function, *args, **kwargs)
+
+    def cache_stats(self):
+        """
+        Estatísticas dos caches já criados (não cria componentes), para o /metrics.
+        """
+        stats = {}
+        if "vector_manager" in self._components:
+            for name, cache_stats in self._components["vector_manager"].cache_stats().items():
+                stats[f"search_{name}"] = cache_stats
+        if "session_cache" in self._components:
+            stats["auth_sessions"] = self._components["session_cache"].stats()
+        return stats
+
+    # --- Preparação ---
+
+    def _step(self, name, function):
+        started = time.perf_counter()
+        try:
+            function()
+        except Exception as e:
+            self._errors[name] = str(e)
+            raise
+        self._errors.pop(name, None)
+        self._timings[name] = round(time.perf_counter() - started, 2)
+        self._ready[name] = True
+
+    def prepare_database(self):
+        if self._ready["database"]:
+            return
+        with self._lock:
+            if not self._ready["database"]:
+                def prepare():
+                    engine = configure_database()
+                    configure_async_database()
+                    create_initial_user()
+                    ensure_summary_table(engine)
+                    ensure_session_table(engine)
+                    ensure_job_table(engine)
+                    ensure_patient_search(engine)
+                self._step("database", prepare)
+
+    def warm_search(self, sync_index=True):
+        self.prepare_database()
+
+        def warm():
+            vector_manager = self.vector_manager
+            vector_manager.warm_up()
+            if sync_index and config.INDEX_SYNC_MODE == "queue":
+                # A sincronização fica com os workers da fila; o índice salvo é recarregado ao mudar
+                db = SessionLocal()
+                try:
+                    enqueue(db, "reindex_exams")
+                finally:
+                    db.close()
+                print("Sincronização do índice de exames enviada para a fila de tarefas.")
+            elif sync_index:
+                print("Carregando índice de exames e sincronizando alterações para a API...")
+                vector_manager.index_medical_exams()
+                print("Indexação concluída para a API.")
+        self._step("search", warm)
+
+    def warm_summarization(self):
+        def warm():
+            self.llm_router
+        self._step("summarization", warm)
+
+    def warm_up(self):
+        for name, step in (("search", self.warm_search), ("summarization", self.warm_summarization)):
+            if self._ready[name]:
+                continue
+            try:
+                step()
+            except Exception as e:
+                print(f"Falha ao preparar '{name}': {e}")
+
+    def warm_up_in_background(self):
+        """
+        Prepara o que ainda falta em uma thread, sem bloquear as requisições.
+        """
+        with self._lock:
+            if self._warmup_thread is None and config.API_WARMUP:
+                self._warmup_thread = threading.Thread(target=self.warm_up, name="api-warmup", daemon=True)
+                self._warmup_thread.start()
+
+    def readiness(self):
+        """
+        Retorna (pronto, detalhes): pronto quando busca e sumarização estão aquecidas.
+        Com `API_WARMUP=false` elas são carregadas no primeiro uso e contam como
+        prontas (`"lazy": true`, com `"loaded"` indicando se já foram criadas).
+        """
+        details = {name: {"ready": ready} for name, ready in self._ready.items()}
+        if not config.API_WARMUP:
+            for name, component in LAZY_COMPONENTS.items():
+                if not self._ready[name] and name not in self._errors:
+                    details[name].update(ready=True, lazy=True, loaded=component in self._components)
+        for name, seconds in self._timings.items():
+            details[name]["seconds"] = seconds
+        for name, error in self._errors.items():
+            details[name]["error"] = error
+        if "vector_manager" in self._components:
+            details["search"].update(self._components["vector_manager"].status())
+        return all(detail["ready"] for detail in details.values()), details
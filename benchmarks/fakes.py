@@ -0,0 +1,83 @@
+"""
+Backends locais e determinísticos para benchmarks: um modelo de embeddings
+com a interface do SentenceTransformer e um serviço de LLM assíncrono, ambos
+sem rede e sem GPU, para medir o custo do próprio sistema.
+"""
+import asyncio
+import re
+import time
+import zlib
+
+import numpy as np
+
+from llm_services.async_chat import AsyncChatService
+from metrics import record_llm_tokens
+
+WORD_RE = re.compile(r"\w+")
+
+
+class FakeEmbeddingModel:
+    """
+    Embeddings por hashing de palavras e bigramas (mesmo texto, mesmo vetor).
+    Textos com vocabulário parecido ficam próximos, o que mantém a busca
+    significativa. `seconds_per_text` simula o custo de um modelo real.
+    """
+
+    def __init__(self, dim=384, seconds_per_text=0.0):
+        self.dim = dim
+        self.seconds_per_text = seconds_per_text
+
+    def get_sentence_embedding_dimension(self):
+        return self.dim
+
+    def _vector(self, text):
+        words = WORD_RE.findall(text.lower())
+        tokens = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        vector = np.zeros(self.dim, dtype=np.float32)
+        if tokens:
+            hashes = np.fromiter((zlib.crc32(token.encode("utf-8")) for token in tokens), dtype=np.uint32,
+                                 count=len(tokens))
+            signs = np.where(hashes & 1, 1.0, -1.0).astype(np.float32)
+            np.add.at(vector, (hashes >> 1) % self.dim, signs)
+        return vector
+
+    def encode(self, sentences, batch_size=32, convert_to_numpy=True, normalize_embeddings=False, **kwargs):
+        if self.seconds_per_text:
+            time.sleep(self.seconds_per_text * len(sentences))
+        vectors = np.stack([self._vector(text) for text in sentences]) if len(sentences) \
+            else np.empty((0, self.dim), dtype=np.float32)
+        if normalize_embeddings:
+            vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        return vectors
+
+
+class FakeChatService(AsyncChatService):
+    """
+    Serviço de LLM simulado: responde com as primeiras frases do texto após
+    `latency` segundos (mais `seconds_per_token` por token gerado no streaming).
+    """
+    provider = "fake"
+
+    def __init__(self, latency=0.0, seconds_per_token=0.0, max_concurrency=64, summary_words=80):
+        super().__init__(max_concurrency)
+        self.latency = latency
+        self.seconds_per_token = seconds_per_token
+        self.summary_words = summary_words
+        self.calls = 0
+
+    def _answer(self, text):
+        self.calls += 1
+        words = text.split()
+        record_llm_tokens(self.provider, len(words), min(len(words), self.summary_words))
+        return "Resumo: " + " ".join(words[:self.summary_words])
+
+    async def _complete(self, text):
+        await asyncio.sleep(self.latency)
+        return self._answer(text)
+
+    async def _stream(self, text):
+        await asyncio.sleep(self.latency)
+        for word in self._answer(text).split():
+            if self.seconds_per_token:
+                await asyncio.sleep(self.seconds_per_token)
+            yield word + " "
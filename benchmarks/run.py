@@ -0,0 +1,309 @@
+"""
+Benchmarks reproduzíveis da importação, indexação, busca, sumarização e listagem.
+
+Cada execução cria um banco SQLite e um índice novos em um diretório de
+trabalho, importa dados sintéticos (`benchmarks.synthetic_data`) e usa os
+backends locais de `benchmarks.fakes` (sem rede). Os resultados são gravados
+em JSON com o commit atual, para comparar execuções:
+
+    python -m benchmarks.run --patients 5000 --appointments 30000 --exams 50000 --output atual.json
+    python -m benchmarks.run --output novo.json --baseline atual.json
+
+Os tempos estão em milissegundos (p50/p90/p99) e as vazões em itens por segundo.
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+
+import numpy as np
+
+import config
+from benchmarks.fakes import FakeChatService, FakeEmbeddingModel
+from benchmarks.synthetic_data import EXAM_RESULTS, SPECIALTIES, generate
+
+
+def timing_stats(samples):
+    """
+    Resumo de uma lista de durações em segundos: contagem, média e percentis em ms.
+    """
+    if not samples:
+        return {"count": 0}
+    values = np.asarray(samples) * 1000
+    p50, p90, p99 = np.percentile(values, [50, 90, 99])
+    return {"count": len(samples), "mean_ms": round(float(values.mean()), 3), "p50_ms": round(float(p50), 3),
+            "p90_ms": round(float(p90), 3), "p99_ms": round(float(p99), 3), "max_ms": round(float(values.max()), 3)}
+
+
+def timed(function, *args, **kwargs):
+    started = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def search_queries(count, seed):
+    """
+    Consultas em texto livre no estilo das buscas dos médicos, sem repetições.
+    """
+    rng = random.Random(seed)
+    exam_types = list(EXAM_RESULTS)
+    complaints = [complaint for complaints, _ in SPECIALTIES.values() for complaint in complaints]
+    queries = set()
+    while len(queries) < count:
+        kind = rng.random()
+        if kind < 0.4:
+            queries.add(EXAM_RESULTS[rng.choice(exam_types)](rng).lower())
+        elif kind < 0.7:
+            queries.add(f"{rng.choice(exam_types).lower()} {rng.choice(complaints).lower()}")
+        else:
+            queries.add(f"paciente com {rng.choice(complaints).lower()} e alteração em {rng.choice(exam_types).lower()}")
+    return sorted(queries)
+
+
+def bench_import(engine, paths):
+    from database.bulk_import import BulkImporter
+    importer = BulkImporter(engine)
+    results = {}
+    for entity, path in paths.items():
+        stats = importer.import_file(entity, path)
+        results[entity] = {"rows": stats["inserted"], "seconds": stats["seconds"],
+                           "rows_per_second": stats["rows_per_second"]}
+    return results
+
+
+def bench_indexing(workdir, index_type, model):
+    from vector_store.exam_index import ExamIndex
+    index_path = os.path.join(workdir, f"exams-{index_type}.index")
+    vector_manager = ExamIndex(index_path=index_path, manifest_path=f"{index_path}.manifest.npz",
+                               index_type=index_type, model=model)
+    _, seconds = timed(vector_manager.index_medical_exams)
+    vectors = vector_manager.status()["vectors"]
+    # Segunda sincronização sem alterações: custo fixo do manifesto a cada inicialização
+    _, noop_seconds = timed(vector_manager.index_medical_exams)
+    return vector_manager, {"index_type": index_type, "exams": vectors, "seconds": round(seconds, 3),
+                            "exams_per_second": round(vectors / seconds) if seconds else vectors,
+                            "noop_sync_seconds": round(noop_seconds, 3)}
+
+
+def bench_search(vector_manager, queries, patient_ids, k):
+    results = {}
+    uncached = [timed(vector_manager.search_similar_exams, query, k)[1] for query in queries]
+    results["uncached"] = timing_stats(uncached)
+    # Mesmas consultas outra vez: resultados vêm do cache de consultas
+    results["cached"] = timing_stats([timed(vector_manager.search_similar_exams, query, k)[1] for query in queries])
+    filtered = [timed(vector_manager.search_similar_exams, f"{query} ({patient_id})", k,
+                      filters={"patient_id": patient_id})[1]
+                for query, patient_id in zip(queries, patient_ids)]
+    results["filtered_by_patient"] = timing_stats(filtered)
+    _, seconds = timed(vector_manager.search_similar_exams_batch, [f"lote {query}" for query in queries], k)
+    results["batch"] = {"queries": len(queries), "seconds": round(seconds, 3),
+                        "queries_per_second": round(len(queries) / seconds) if seconds else len(queries)}
+    return results
+
+
+def bench_history(patient_ids):
+    from database.database_manager import SessionLocal
+    from database.models import Patient
+    from database.patient_history import load_patient_timeline, render_patient_history
+
+    samples, lengths = [], []
+    db = SessionLocal()
+    try:
+        for patient_id in patient_ids:
+            started = time.perf_counter()
+            patient = db.get(Patient, patient_id)
+            history_text = render_patient_history(patient, load_patient_timeline(db, patient_id))
+            samples.append(time.perf_counter() - started)
+            lengths.append(len(history_text))
+            db.expunge_all()
+    finally:
+        db.close()
+    result = timing_stats(samples)
+    result.update(chars_mean=round(float(np.mean(lengths))), chars_max=int(np.max(lengths)))
+    return result
+
+
+async def bench_summarize(patient_ids, chat_service):
+    """
+    Pipeline de `/api/summarize` (histórico, cache, map-reduce, LLM simulado) por paciente.
+    """
+    from database.async_session import AsyncSessionLocal, configure_async_database, dispose_async_database
+    from database.models import Patient
+    from llm_services.history_summarizer import summarize_patient_history_async
+
+    configure_async_database()
+    samples = []
+    try:
+        for patient_id in patient_ids:
+            async with AsyncSessionLocal() as db:
+                started = time.perf_counter()
+                patient = await db.get(Patient, patient_id)
+                await summarize_patient_history_async(db, patient, chat_service.provider, chat_service,
+                                                      force_refresh=True)
+                samples.append(time.perf_counter() - started)
+    finally:
+        await dispose_async_database()
+    result = timing_stats(samples)
+    result["llm_calls"] = chat_service.calls
+    return result
+
+
+def bench_listing(page_size):
+    from database.database_manager import SessionLocal
+    from database.patient_listing import iter_patients, list_patients_page
+
+    db = SessionLocal()
+    try:
+        samples, after, pages = [], None, 0
+        while True:
+            (_, after), seconds = timed(list_patients_page, db, after, page_size)
+            samples.append(seconds)
+            pages += 1
+            if after is None:
+                break
+        result = {"page_size": page_size, "pages": pages, "page": timing_stats(samples)}
+        exported, seconds = timed(lambda: sum(1 for _ in iter_patients(db)))
+        result["export"] = {"rows": exported, "seconds": round(seconds, 3),
+                            "rows_per_second": round(exported / seconds) if seconds else exported}
+    finally:
+        db.close()
+    return result
+
+
+def run(args, workdir):
+    # Banco e índice isolados no diretório de trabalho (antes de criar o engine)
+    config.DATABASE_URL = f"sqlite:///{os.path.join(workdir, 'benchmark.db')}"
+    from database.database_manager import Base
+    from database.engine_profiles import configure_database
+    from database.patient_search import ensure_patient_search
+    from database.summary_cache import ensure_summary_table
+
+    print(f"Gerando dados sintéticos em {workdir}...")
+    paths = generate(os.path.join(workdir, "data"), args.patients, args.doctors, args.appointments, args.exams,
+                     args.seed)
+    engine = configure_database()
+    Base.metadata.create_all(bind=engine)
+    ensure_summary_table(engine)
+
+    results = {}
+    print("Importação...")
+    results["import"] = bench_import(engine, paths)
+    ensure_patient_search(engine)
+
+    if args.real_model:
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(config.EMBEDDING_MODEL)
+    else:
+        model = FakeEmbeddingModel(seconds_per_text=args.embedding_latency)
+    print("Indexação...")
+    vector_manager, results["indexing"] = bench_indexing(workdir, args.index_type, model)
+
+    rng = random.Random(args.seed)
+    print("Busca...")
+    queries = search_queries(args.queries, args.seed)
+    results["search"] = bench_search(vector_manager, queries,
+                                     [rng.randint(1, args.patients) for _ in queries], args.k)
+
+    # Amostra aleatória: como as consultas se concentram em poucos pacientes, inclui históricos longos
+    sample = sorted(rng.sample(range(1, args.patients + 1), min(args.summaries, args.patients)))
+    print("Sumarização...")
+    results["summarize"] = {"history_build": bench_history(sample)}
+    chat_service = FakeChatService(latency=args.llm_latency)
+    results["summarize"]["pipeline"] = asyncio.run(bench_summarize(sample, chat_service))
+
+    print("Listagem de pacientes...")
+    results["patients_listing"] = bench_listing(args.page_size)
+    return results
+
+
+def flatten(data, prefix=""):
+    values = {}
+    for key, value in data.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            values.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[name] = value
+    return values
+
+
+def compare(baseline, current):
+    """
+    Imprime as métricas que mudaram em relação a um resultado anterior.
+    """
+    old, new = flatten(baseline["results"]), flatten(current["results"])
+    print(f"\nComparação com {baseline.get('commit') or 'execução anterior'} "
+          f"({baseline.get('created_at', '?')}):")
+    for name in sorted(old.keys() & new.keys()):
+        if old[name] == new[name]:
+            continue
+        change = f"{(new[name] - old[name]) / old[name] * 100:+.1f}%" if old[name] else "-"
+        print(f"  {name}: {old[name]} -> {new[name]} ({change})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de busca, sumarização e listagem com dados sintéticos.")
+    parser.add_argument("--patients", type=int, default=2000)
+    parser.add_argument("--doctors", type=int, default=40)
+    parser.add_argument("--appointments", type=int, default=10000)
+    parser.add_argument("--exams", type=int, default=15000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--queries", type=int, default=200, help="Consultas do benchmark de busca.")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--index-type", default=config.FAISS_INDEX_TYPE,
+                        help="Tipo do índice FAISS (flat, ivf_flat, ivf_pq, hnsw).")
+    parser.add_argument("--summaries", type=int, default=50, help="Pacientes no benchmark de sumarização.")
+    parser.add_argument("--page-size", type=int, default=config.PATIENTS_PAGE_SIZE)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Latência simulada do LLM (segundos).")
+    parser.add_argument("--embedding-latency", type=float, default=0.0,
+                        help="Custo simulado do modelo de embeddings por texto (segundos).")
+    parser.add_argument("--real-model", action="store_true",
+                        help="Usar o modelo de embeddings real (EMBEDDING_MODEL) em vez do modelo falso.")
+    parser.add_argument("--workdir", help="Diretório de trabalho (padrão: diretório temporário).")
+    parser.add_argument("--output", default="benchmark_results.json", help="Arquivo JSON de resultados.")
+    parser.add_argument("--baseline", help="Resultado anterior (JSON) para comparação.")
+    args = parser.parse_args()
+
+    started = datetime.datetime.now(datetime.timezone.utc)
+    if args.workdir:
+        os.makedirs(args.workdir, exist_ok=True)
+        results = run(args, args.workdir)
+    else:
+        with tempfile.TemporaryDirectory(prefix="benchmark-") as workdir:
+            results = run(args, workdir)
+
+    report = {
+        "commit": git_commit(),
+        "created_at": started.isoformat(timespec="seconds"),
+        "environment": {"python": platform.python_version(), "platform": platform.platform(),
+                        "cpus": os.cpu_count()},
+        "parameters": {key: value for key, value in vars(args).items()
+                       if key not in ("output", "baseline", "workdir")},
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, ensure_ascii=False, indent=2)
+    print(f"\nResultados gravados em {args.output}")
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as handle:
+            compare(json.load(handle), report)
+
+
+if __name__ == "__main__":
+    main()
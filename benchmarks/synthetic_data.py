@@ -0,0 +1,244 @@
+"""
+Gerador de dados sintéticos para benchmarks: médicos, pacientes, consultas e
+exames com texto clínico em português, reproduzíveis a partir de uma semente.
+
+Os arquivos gerados (JSONL) seguem o formato de `database.bulk_import`, de modo
+que também servem para testar a importação em massa:
+
+    python -m benchmarks.synthetic_data --out dados --patients 10000 --appointments 50000 --exams 80000
+    python -m database.bulk_import --doctors dados/doctors.jsonl --patients dados/patients.jsonl \\
+        --appointments dados/appointments.jsonl --exams dados/exams.jsonl
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+
+FIRST_NAMES = (
+    "Ana", "Beatriz", "Bruno", "Camila", "Carlos", "Daniel", "Eduarda", "Felipe", "Fernanda", "Gabriel",
+    "Gustavo", "Helena", "Igor", "Isabela", "João", "Juliana", "Larissa", "Leonardo", "Letícia", "Lucas",
+    "Luiza", "Marcos", "Maria", "Mariana", "Mateus", "Natália", "Otávio", "Paula", "Pedro", "Rafael",
+    "Renata", "Rodrigo", "Sofia", "Tiago", "Valentina", "Vinícius", "Yasmin", "José", "Antônio", "Francisca",
+)
+SURNAMES = (
+    "Silva", "Santos", "Oliveira", "Souza", "Rodrigues", "Ferreira", "Alves", "Pereira", "Lima", "Gomes",
+    "Costa", "Ribeiro", "Martins", "Carvalho", "Almeida", "Lopes", "Soares", "Fernandes", "Vieira", "Barbosa",
+    "Rocha", "Dias", "Nascimento", "Andrade", "Moreira", "Nunes", "Marques", "Machado", "Mendes", "Freitas",
+    "Cardoso", "Ramos", "Gonçalves", "Santana", "Teixeira", "Araújo", "Cavalcanti", "Moura", "Correia", "Pinto",
+)
+
+# Especialidade -> (queixas das consultas, tipos de exame)
+SPECIALTIES = {
+    "Cardiologia": (
+        ("Dor torácica aos esforços", "Palpitações frequentes", "Check-up anual, paciente relata cansaço",
+         "Controle de hipertensão arterial", "Falta de ar ao subir escadas", "Edema em membros inferiores"),
+        ("Eletrocardiograma", "Ecocardiograma", "Teste ergométrico", "Holter 24 horas", "Colesterol total e frações"),
+    ),
+    "Neurologia": (
+        ("Cefaleia frequente há três meses", "Episódios de tontura", "Formigamento nas mãos",
+         "Perda de memória recente", "Crise convulsiva isolada"),
+        ("Tomografia computadorizada do crânio", "Ressonância magnética do crânio", "Eletroencefalograma"),
+    ),
+    "Ortopedia": (
+        ("Dor no joelho direito após atividade física", "Lombalgia crônica", "Entorse de tornozelo",
+         "Dor no ombro ao elevar o braço", "Dor no quadril ao caminhar"),
+        ("Raio-X do joelho", "Ressonância magnética do joelho", "Raio-X da coluna lombar", "Ultrassonografia do ombro"),
+    ),
+    "Endocrinologia": (
+        ("Controle de diabetes tipo 2", "Ganho de peso sem causa aparente", "Queda de cabelo e cansaço",
+         "Acompanhamento de hipotireoidismo"),
+        ("Glicemia de jejum", "Hemoglobina glicada", "TSH e T4 livre", "Colesterol total e frações"),
+    ),
+    "Clínica Médica": (
+        ("Febre e tosse há cinco dias", "Check-up anual", "Dor abdominal difusa", "Cansaço e indisposição",
+         "Acompanhamento de doença crônica"),
+        ("Hemograma completo", "Urina tipo 1", "Creatinina e ureia", "Glicemia de jejum", "Raio-X de tórax"),
+    ),
+    "Gastroenterologia": (
+        ("Azia e queimação após refeições", "Alteração do hábito intestinal", "Dor epigástrica",
+         "Investigação de anemia"),
+        ("Endoscopia digestiva alta", "Ultrassonografia abdominal", "Colonoscopia", "Hemograma completo"),
+    ),
+    "Pneumologia": (
+        ("Tosse persistente há um mês", "Falta de ar noturna", "Acompanhamento de asma", "Chiado no peito"),
+        ("Raio-X de tórax", "Espirometria", "Tomografia de tórax"),
+    ),
+}
+
+# Tipo de exame -> funções que produzem o texto do resultado (normal ou alterado)
+EXAM_RESULTS = {
+    "Eletrocardiograma": lambda r: r.choice((
+        "Ritmo sinusal normal, frequência cardíaca de {} bpm, sem alterações de repolarização.".format(r.randint(55, 95)),
+        "Ritmo sinusal com extrassístoles ventriculares isoladas. Frequência de {} bpm.".format(r.randint(60, 110)),
+        "Sobrecarga ventricular esquerda. Alterações inespecíficas da repolarização ventricular.",
+    )),
+    "Ecocardiograma": lambda r: "Fração de ejeção de {}%. {}".format(r.randint(35, 70), r.choice((
+        "Câmaras cardíacas de dimensões normais, valvas sem alterações.",
+        "Hipertrofia concêntrica do ventrículo esquerdo, disfunção diastólica grau I.",
+        "Insuficiência mitral leve, sem repercussão hemodinâmica."))),
+    "Teste ergométrico": lambda r: r.choice((
+        "Teste máximo, sem alterações isquêmicas. Boa capacidade funcional.",
+        "Infradesnivelamento do segmento ST de 1,5 mm no pico do esforço, sugestivo de isquemia.",
+        "Resposta pressórica exagerada ao esforço, sem arritmias.")),
+    "Holter 24 horas": lambda r: "Ritmo sinusal predominante, {} extrassístoles supraventriculares isoladas. {}".format(
+        r.randint(10, 900), r.choice(("Sem pausas significativas.", "Episódio de taquicardia atrial não sustentada."))),
+    "Colesterol total e frações": lambda r: (
+        "Colesterol total {} mg/dL, LDL {} mg/dL, HDL {} mg/dL, triglicerídeos {} mg/dL.".format(
+            r.randint(140, 290), r.randint(70, 200), r.randint(30, 80), r.randint(60, 400))),
+    "Tomografia computadorizada do crânio": lambda r: r.choice((
+        "Nenhuma evidência de anormalidades intracranianas.",
+        "Pequenas áreas de microangiopatia na substância branca periventricular.",
+        "Sinusopatia maxilar bilateral, parênquima encefálico sem alterações.")),
+    "Ressonância magnética do crânio": lambda r: r.choice((
+        "Estudo dentro dos limites da normalidade.",
+        "Focos de hipersinal em T2/FLAIR inespecíficos na substância branca.",
+        "Redução volumétrica hipocampal leve, compatível com a faixa etária.")),
+    "Eletroencefalograma": lambda r: r.choice((
+        "Atividade de base organizada, sem grafoelementos epileptiformes.",
+        "Ondas agudas em região temporal esquerda durante a sonolência.")),
+    "Raio-X do joelho": lambda r: r.choice((
+        "Redução do espaço articular medial e osteófitos marginais, compatível com artrose.",
+        "Estruturas ósseas preservadas, sem sinais de fratura.")),
+    "Ressonância magnética do joelho": lambda r: r.choice((
+        "Leve estiramento do ligamento colateral medial. Sem ruptura.",
+        "Lesão do corno posterior do menisco medial.",
+        "Condropatia patelar grau II, pequeno derrame articular.")),
+    "Raio-X da coluna lombar": lambda r: r.choice((
+        "Retificação da lordose lombar, discreta redução do espaço discal em L4-L5.",
+        "Osteófitos marginais em corpos vertebrais lombares, alinhamento preservado.")),
+    "Ultrassonografia do ombro": lambda r: r.choice((
+        "Tendinopatia do supraespinhal, sem sinais de ruptura.",
+        "Bursite subacromial-subdeltoidea, tendões íntegros.")),
+    "Glicemia de jejum": lambda r: "Glicemia de jejum de {} mg/dL.".format(r.randint(75, 240)),
+    "Hemoglobina glicada": lambda r: "Hemoglobina glicada de {:.1f}%.".format(r.uniform(4.8, 11.5)),
+    "TSH e T4 livre": lambda r: "TSH {:.2f} mUI/L, T4 livre {:.2f} ng/dL.".format(r.uniform(0.2, 12.0), r.uniform(0.6, 1.9)),
+    "Hemograma completo": lambda r: (
+        "Hemoglobina {:.1f} g/dL, leucócitos {} /mm³, plaquetas {} mil/mm³. {}".format(
+            r.uniform(9.0, 16.5), r.randint(3500, 16000), r.randint(120, 420),
+            r.choice(("Sem alterações na série branca.", "Leucocitose com desvio à esquerda.",
+                      "Anemia microcítica e hipocrômica.")))),
+    "Urina tipo 1": lambda r: r.choice((
+        "Sem alterações significativas.", "Leucocitúria e nitrito positivo, sugestivo de infecção urinária.",
+        "Proteinúria leve (+), hematúria ausente.")),
+    "Creatinina e ureia": lambda r: "Creatinina {:.2f} mg/dL, ureia {} mg/dL.".format(r.uniform(0.6, 2.4), r.randint(15, 90)),
+    "Raio-X de tórax": lambda r: r.choice((
+        "Campos pulmonares livres, área cardíaca normal.",
+        "Opacidade em base pulmonar direita, sugestiva de processo infeccioso.",
+        "Hiperinsuflação pulmonar, compatível com doença pulmonar obstrutiva.")),
+    "Endoscopia digestiva alta": lambda r: r.choice((
+        "Gastrite enantematosa leve de antro. Pesquisa de H. pylori solicitada.",
+        "Esofagite erosiva grau A de Los Angeles.", "Exame sem alterações.")),
+    "Ultrassonografia abdominal": lambda r: r.choice((
+        "Esteatose hepática leve. Vesícula biliar sem cálculos.",
+        "Colelitíase sem sinais de colecistite.", "Órgãos abdominais de aspecto ecográfico normal.")),
+    "Colonoscopia": lambda r: r.choice((
+        "Pólipo séssil de 4 mm em sigmoide, ressecado.", "Doença diverticular dos cólons sem complicações.",
+        "Exame até o íleo terminal sem alterações.")),
+    "Espirometria": lambda r: "VEF1 de {}% do previsto, relação VEF1/CVF de {}. {}".format(
+        r.randint(45, 105), round(r.uniform(0.55, 0.85), 2),
+        r.choice(("Distúrbio ventilatório obstrutivo leve.", "Exame normal.", "Resposta significativa ao broncodilatador."))),
+    "Tomografia de tórax": lambda r: r.choice((
+        "Nódulo pulmonar sólido de 6 mm no lobo superior direito.", "Enfisema centrolobular em lobos superiores.",
+        "Parênquima pulmonar sem alterações.")),
+}
+
+TREATMENT_PLANS = (
+    "Recomenda-se atividade física regular e dieta balanceada. Retorno em 1 ano.",
+    "Prescrito analgésico. Observar e retornar se os sintomas persistirem ou piorarem.",
+    "Fisioterapia por 4 semanas e aplicação de gelo. Evitar esportes de impacto por 2 meses.",
+    "Iniciar estatina e repetir o perfil lipídico em 3 meses.",
+    "Ajuste da dose de metformina e orientação nutricional. Retorno em 90 dias.",
+    "Antibioticoterapia por 7 dias e hidratação oral.",
+    "Encaminhamento para avaliação cirúrgica.",
+    "Manter medicação atual e controle pressórico domiciliar.",
+    "Solicitados exames complementares para investigação.",
+    "Inibidor de bomba de prótons por 8 semanas e mudança de hábitos alimentares.",
+    "Broncodilatador de uso contínuo e revisão da técnica inalatória.",
+    "Levotiroxina com ajuste de dose conforme novo TSH em 6 semanas.",
+)
+
+DATE_START = datetime.datetime(2015, 1, 1)
+DATE_DAYS = (datetime.datetime(2025, 12, 31) - DATE_START).days
+
+
+def person_name(rng):
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(SURNAMES)} {rng.choice(SURNAMES)}"
+
+
+def _write_jsonl(path, records):
+    count = 0
+    with open(path, "w", encoding="utf-8") as handle:
+        for record in records:
+            handle.write(json.dumps(record, ensure_ascii=False) + "\n")
+            count += 1
+    return count
+
+
+def generate(out_dir, patients=1000, doctors=30, appointments=5000, exams=8000, seed=42):
+    """
+    Gera doctors.jsonl, patients.jsonl, appointments.jsonl e exams.jsonl em `out_dir`.
+
+    As consultas se concentram em parte dos pacientes (históricos longos e curtos,
+    como no sistema real). Retorna {entidade: caminho do arquivo}.
+    """
+    rng = random.Random(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    paths = {entity: os.path.join(out_dir, f"{entity}.jsonl")
+             for entity in ("doctors", "patients", "appointments", "exams")}
+    specialties = list(SPECIALTIES)
+
+    doctor_specialty = [specialties[i % len(specialties)] for i in range(doctors)]
+    _write_jsonl(paths["doctors"], (
+        {"id": i + 1, "name": person_name(rng), "specialty": doctor_specialty[i]} for i in range(doctors)))
+
+    def patient_records():
+        for i in range(patients):
+            birth = datetime.date(1930, 1, 1) + datetime.timedelta(days=rng.randrange(90 * 365))
+            yield {"id": i + 1, "name": person_name(rng), "date_of_birth": birth.isoformat()}
+    _write_jsonl(paths["patients"], patient_records())
+
+    appointment_specialty = []
+
+    def appointment_records():
+        for i in range(appointments):
+            # Distribuição enviesada: poucos pacientes concentram muitas consultas
+            patient_id = int(patients * rng.random() ** 2)
+            doctor = rng.randrange(doctors)
+            specialty = doctor_specialty[doctor]
+            appointment_specialty.append(specialty)
+            date = DATE_START + datetime.timedelta(days=rng.randrange(DATE_DAYS), minutes=rng.randrange(8 * 60, 18 * 60))
+            yield {"id": i + 1, "patient_id": patient_id + 1, "doctor_id": doctor + 1,
+                   "appointment_date": date.isoformat(timespec="minutes"),
+                   "description": f"{rng.choice(SPECIALTIES[specialty][0])}."}
+    _write_jsonl(paths["appointments"], appointment_records())
+
+    def exam_records():
+        for i in range(exams):
+            appointment = rng.randrange(appointments)
+            exam_type = rng.choice(SPECIALTIES[appointment_specialty[appointment]][1])
+            yield {"id": i + 1, "appointment_id": appointment + 1, "exam_type": exam_type,
+                   "file_path": f"/exames_ficticios/{i + 1:08d}.pdf",
+                   "results": EXAM_RESULTS[exam_type](rng),
+                   "treatment_plan": rng.choice(TREATMENT_PLANS)}
+    _write_jsonl(paths["exams"], exam_records() if appointments else ())
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera dados clínicos sintéticos (JSONL) para benchmarks.")
+    parser.add_argument("--out", required=True, help="Diretório de saída.")
+    parser.add_argument("--patients", type=int, default=1000)
+    parser.add_argument("--doctors", type=int, default=30)
+    parser.add_argument("--appointments", type=int, default=5000)
+    parser.add_argument("--exams", type=int, default=8000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    paths = generate(args.out, args.patients, args.doctors, args.appointments, args.exams, args.seed)
+    for entity, path in paths.items():
+        print(f"{entity}: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import datetime
+import hashlib
+import secrets
+
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String
+from werkzeug.security import check_password_hash, generate_password_hash
+
+import config
+from database.database_manager import Base
+from database.models import User
+
+
+class ApiSession(Base):
+    """
+    Sessão de login da API. Guarda apenas o hash SHA-256 do token opaco
+    entregue ao cliente, com os dados do usuário necessários às requisições.
+    """
+    __tablename__ = 'api_sessions'
+
+    token_hash = Column(String(64), primary_key=True)
+    user_id = Column(Integer, ForeignKey(User.id, ondelete="CASCADE"), nullable=False, index=True)
+    username = Column(String, nullable=False)
+    role = Column(String)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
+def ensure_session_table(engine):
+    ApiSession.__table__.create(bind=engine, checkfirst=True)
+
+
+# --- Senhas ---
+
+def hash_password(password):
+    """
+    Hash da senha com o método e o custo configurados em `PASSWORD_HASH_METHOD`.
+    """
+    return generate_password_hash(password, method=config.PASSWORD_HASH_METHOD)
+
+
+def password_needs_rehash(password_hash):
+    # Formato do werkzeug: "método:parâmetros$salt$hash"
+    return (password_hash or "").split("$", 1)[0] != config.PASSWORD_HASH_METHOD
+
+
+def verify_password(password_hash, password):
+    return bool(password_hash) and check_password_hash(password_hash, password)
+
+
+def get_user_credentials(db, username):
+    """
+    (id, hash da senha, nome, perfil) do usuário, ou None.
+    """
+    return (db.query(User.id, User.password_hash, User.name, User.role)
+            .filter(User.username == username).first())
+
+
+def update_password_hash(db, user_id, password_hash):
+    db.query(User).filter(User.id == user_id).update({User.password_hash: password_hash})
+    db.commit()
+
+
+# --- Tokens ---
+
+def token_digest(token):
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def create_session(db, user_id, username, role):
+    """
+    Cria uma sessão e retorna (token, expira_em). Sessões vencidas são
+    removidas aqui, sem precisar de uma tarefa periódica.
+    """
+    now = datetime.datetime.utcnow()
+    token = secrets.token_urlsafe(32)
+    expires_at = now + datetime.timedelta(seconds=config.API_TOKEN_TTL)
+    db.query(ApiSession).filter(ApiSession.expires_at <= now).delete()
+    db.add(ApiSession(token_hash=token_digest(token), user_id=user_id, username=username, role=role,
+                      created_at=now, expires_at=expires_at))
+    db.commit()
+    return token, expires_at
+
+
+def get_session(db, token_hash):
+    """
+    Dados da sessão válida com este hash de token, ou None.
+    """
+    session = db.get(ApiSession, token_hash)
+    if session is None or session.expires_at <= datetime.datetime.utcnow():
+        return None
+    return {"user_id": session.user_id, "username": session.username, "role": session.role,
+            "expires_at": session.expires_at}
+
+
+def delete_session(db, token_hash):
+    db.query(ApiSession).filter(ApiSession.token_hash == token_hash).delete()
+    db.commit()
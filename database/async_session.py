@@ -0,0 +1,71 @@
+"""
+Sessões assíncronas do SQLAlchemy para a API (FastAPI).
+
+Usa o mesmo `DATABASE_URL` com o driver assíncrono correspondente (aiosqlite
+ou asyncpg) e os mesmos ajustes de pool e de SQLite de `engine_profiles`.
+Funções de consulta escritas para `Session` são reaproveitadas com
+`await db.run_sync(funcao, *args)`.
+"""
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import config
+from database.engine_profiles import set_sqlite_pragmas
+
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+AsyncSessionLocal = async_sessionmaker(expire_on_commit=False)
+
+_async_engine = None
+
+
+def async_database_url(url=None):
+    url = make_url(url or config.DATABASE_URL)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None:
+        raise ValueError(f"Banco '{url.get_backend_name()}' sem driver assíncrono configurado.")
+    return url.set(drivername=driver)
+
+
+def build_async_engine(url=None):
+    url = async_database_url(url)
+    if url.get_backend_name() == "sqlite":
+        engine = create_async_engine(url, connect_args={"timeout": config.SQLITE_BUSY_TIMEOUT_MS / 1000},
+                                     pool_size=config.DB_POOL_SIZE, max_overflow=config.DB_MAX_OVERFLOW,
+                                     pool_timeout=config.DB_POOL_TIMEOUT)
+        event.listen(engine.sync_engine, "connect", set_sqlite_pragmas)
+        return engine
+    server_settings = {}
+    if config.DB_STATEMENT_TIMEOUT_MS:
+        server_settings["statement_timeout"] = str(config.DB_STATEMENT_TIMEOUT_MS)
+    return create_async_engine(url, connect_args={"server_settings": server_settings},
+                               pool_size=config.DB_POOL_SIZE, max_overflow=config.DB_MAX_OVERFLOW,
+                               pool_timeout=config.DB_POOL_TIMEOUT, pool_recycle=config.DB_POOL_RECYCLE,
+                               pool_pre_ping=True)
+
+
+def configure_async_database():
+    """
+    Cria (uma única vez por processo) o engine assíncrono e liga `AsyncSessionLocal` a ele.
+    """
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = build_async_engine()
+        AsyncSessionLocal.configure(bind=_async_engine)
+    return _async_engine
+
+
+async def dispose_async_database():
+    global _async_engine
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+
+
+async def get_db():
+    """
+    Dependência do FastAPI: uma sessão assíncrona por requisição.
+    """
+    async with AsyncSessionLocal() as session:
+        yield session
@@ -0,0 +1,211 @@
+"""
+Importação em massa de pacientes, médicos, consultas e exames do sistema legado.
+
+Os arquivos (CSV ou JSONL, opcionalmente .gz) são lidos em streaming e gravados
+em lotes grandes, um lote por transação. As colunas seguem os nomes dos modelos;
+`id` é o identificador no sistema legado e as referências (`patient_id`,
+`doctor_id`, `appointment_id`) também usam ids legados. O mapeamento id legado ->
+id novo fica na tabela `import_id_map`: reexecutar a importação ignora registros
+já importados, e arquivos podem ser importados em execuções separadas.
+
+Uso:
+    python -m database.bulk_import --doctors medicos.csv --patients pacientes.csv \\
+        --appointments consultas.jsonl --exams exames.csv.gz
+"""
+import argparse
+import csv
+import datetime
+import gzip
+import io
+import json
+import time
+
+from sqlalchemy import Column, Integer, PrimaryKeyConstraint, String, insert, select
+
+import config
+from database.database_manager import Base
+from database.engine_profiles import configure_database
+from database.models import Appointment, Doctor, MedicalExam, Patient
+
+
+class ImportIdMap(Base):
+    """
+    Id legado -> id no banco, por tipo de registro importado.
+    """
+    __tablename__ = 'import_id_map'
+    __table_args__ = (PrimaryKeyConstraint('entity', 'legacy_id'),)
+
+    entity = Column(String(20), nullable=False)
+    legacy_id = Column(String(64), nullable=False)
+    new_id = Column(Integer, nullable=False)
+
+
+# entidade -> (modelo, colunas de dados, colunas de data, chaves estrangeiras {coluna: entidade referenciada})
+ENTITIES = {
+    "doctors": (Doctor, ("name", "specialty"), (), {}),
+    "patients": (Patient, ("name", "date_of_birth"), ("date_of_birth",), {}),
+    "appointments": (Appointment, ("patient_id", "doctor_id", "appointment_date", "description"),
+                     ("appointment_date",), {"patient_id": "patients", "doctor_id": "doctors"}),
+    "exams": (MedicalExam, ("appointment_id", "exam_type", "file_path", "results", "treatment_plan"),
+              (), {"appointment_id": "appointments"}),
+}
+
+
+def read_records(path):
+    """
+    Lê um arquivo CSV ou JSONL (ou .csv.gz / .jsonl.gz) registro a registro.
+    """
+    name = path[:-3] if path.endswith(".gz") else path
+    raw = gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")
+    with io.TextIOWrapper(raw, encoding="utf-8-sig", newline="") as handle:
+        if name.endswith((".jsonl", ".ndjson")):
+            for line in handle:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(handle)
+
+
+def parse_datetime(value):
+    if value in (None, ""):
+        return None
+    if isinstance(value, (int, float)):
+        return datetime.datetime.fromtimestamp(value, datetime.timezone.utc).replace(tzinfo=None)
+    return datetime.datetime.fromisoformat(str(value))
+
+
+def _legacy_key(value):
+    return None if value in (None, "") else str(value)
+
+
+class BulkImporter:
+    """
+    Grava registros em lotes, resolvendo as chaves estrangeiras pelos mapas em memória.
+    """
+
+    def __init__(self, engine, batch_size=None, max_errors_shown=10):
+        self.engine = engine
+        self.batch_size = batch_size or config.IMPORT_BATCH_SIZE
+        self.max_errors_shown = max_errors_shown
+        self.id_maps = {}
+        ImportIdMap.__table__.create(bind=engine, checkfirst=True)
+
+    def _id_map(self, entity):
+        if entity not in self.id_maps:
+            with self.engine.connect() as connection:
+                self.id_maps[entity] = dict(connection.execute(
+                    select(ImportIdMap.legacy_id, ImportIdMap.new_id).where(ImportIdMap.entity == entity)).all())
+        return self.id_maps[entity]
+
+    def _prepare(self, entity, record):
+        """
+        Converte um registro do arquivo em (id_legado, valores da linha); levanta ValueError se inválido.
+        """
+        _, columns, date_columns, foreign_keys = ENTITIES[entity]
+        values = {column: record.get(column) or None for column in columns}
+        for column in date_columns:
+            values[column] = parse_datetime(values[column])
+        for column, target in foreign_keys.items():
+            legacy = _legacy_key(values[column])
+            if legacy is None:
+                continue
+            if legacy not in self._id_map(target):
+                raise ValueError(f"{column}={legacy} não encontrado em {target}")
+            values[column] = self._id_map(target)[legacy]
+        return _legacy_key(record.get("id")), values
+
+    def _write_batch(self, entity, batch):
+        model = ENTITIES[entity][0]
+        table = model.__table__
+        with self.engine.begin() as connection:
+            new_ids = connection.execute(
+                insert(table).returning(table.c.id, sort_by_parameter_order=True),
+                [values for _, values in batch]).scalars().all()
+            mapping = [{"entity": entity, "legacy_id": legacy, "new_id": new_id}
+                       for (legacy, _), new_id in zip(batch, new_ids) if legacy is not None]
+            if mapping:
+                connection.execute(insert(ImportIdMap.__table__), mapping)
+        self._id_map(entity).update((row["legacy_id"], row["new_id"]) for row in mapping)
+
+    def import_file(self, entity, path):
+        """
+        Importa um arquivo e retorna um dict com as contagens e a vazão (linhas/s).
+        """
+        id_map = self._id_map(entity)
+        stats = {"entity": entity, "read": 0, "inserted": 0, "skipped": 0, "rejected": 0}
+        batch, pending_ids = [], set()
+        started = time.perf_counter()
+
+        def flush():
+            self._write_batch(entity, batch)
+            stats["inserted"] += len(batch)
+            batch.clear()
+            pending_ids.clear()
+            elapsed = time.perf_counter() - started
+            print(f"  {entity}: {stats['inserted']} inseridos ({stats['inserted'] / elapsed:.0f} linhas/s)")
+
+        for line_number, record in enumerate(read_records(path), start=1):
+            stats["read"] += 1
+            legacy = _legacy_key(record.get("id"))
+            if legacy is not None and (legacy in id_map or legacy in pending_ids):
+                stats["skipped"] += 1
+                continue
+            try:
+                batch.append(self._prepare(entity, record))
+            except ValueError as e:
+                stats["rejected"] += 1
+                if stats["rejected"] <= self.max_errors_shown:
+                    print(f"  {path}:{line_number}: registro rejeitado ({e})")
+                continue
+            if legacy is not None:
+                pending_ids.add(legacy)
+            if len(batch) >= self.batch_size:
+                flush()
+        if batch:
+            flush()
+
+        elapsed = time.perf_counter() - started
+        stats["seconds"] = round(elapsed, 2)
+        stats["rows_per_second"] = round(stats["read"] / elapsed) if elapsed else stats["read"]
+        return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importação em massa de dados do sistema legado.")
+    for entity in ENTITIES:
+        parser.add_argument(f"--{entity}", nargs="*", default=[], metavar="ARQUIVO",
+                            help=f"Arquivos CSV/JSONL de {entity}.")
+    parser.add_argument("--batch-size", type=int, default=config.IMPORT_BATCH_SIZE,
+                        help="Registros por lote (um lote por transação).")
+    parser.add_argument("--no-index", action="store_true",
+                        help="Não atualizar o índice de exames e a busca de pacientes ao final.")
+    args = parser.parse_args()
+
+    engine = configure_database()
+    Base.metadata.create_all(bind=engine)
+    importer = BulkImporter(engine, args.batch_size)
+
+    report = []
+    # Ordem das dependências: médicos e pacientes antes das consultas, consultas antes dos exames
+    for entity in ENTITIES:
+        for path in getattr(args, entity):
+            print(f"Importando {entity} de {path}...")
+            stats = importer.import_file(entity, path)
+            report.append(stats)
+            print(f"  {stats['read']} lidos, {stats['inserted']} inseridos, {stats['skipped']} já importados, "
+                  f"{stats['rejected']} rejeitados em {stats['seconds']}s ({stats['rows_per_second']} linhas/s)")
+
+    if args.no_index or not any(stats["inserted"] for stats in report):
+        return
+    from database.patient_search import ensure_patient_search
+    ensure_patient_search(engine)
+    if any(stats["inserted"] for stats in report if stats["entity"] in ("appointments", "exams")):
+        from vector_store.exam_index import ExamIndex
+        print("Atualizando o índice de exames com os novos registros...")
+        started = time.perf_counter()
+        ExamIndex().index_medical_exams()
+        print(f"Índice atualizado em {time.perf_counter() - started:.1f}s.")
+
+
+if __name__ == "__main__":
+    main()
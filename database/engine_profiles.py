@@ -0,0 +1,100 @@
+"""
+Perfis do engine do banco de dados (SQLite ou PostgreSQL) e índices usados pelas consultas.
+
+O `engine` padrão de `database_manager` é criado sem ajustes; `configure_database()`
+cria o engine de acordo com `DATABASE_URL` e religa o `SessionLocal` a ele, de modo
+que todo o código que abre sessões passa a usar o pool configurado.
+"""
+from sqlalchemy import Index, create_engine, event, inspect
+from sqlalchemy.engine import make_url
+
+import config
+from database import database_manager
+from database.models import Appointment, MedicalExam
+
+# Índices das colunas usadas em filtros, JOINs e ordenação (histórico do
+# paciente, filtros da busca semântica e sincronização do índice de exames)
+QUERY_INDEXES = (
+    Index('ix_appointments_patient_date', Appointment.patient_id, Appointment.appointment_date, Appointment.id),
+    Index('ix_appointments_doctor_id', Appointment.doctor_id),
+    Index('ix_appointments_date', Appointment.appointment_date),
+    Index('ix_medical_exams_appointment_id', MedicalExam.appointment_id),
+)
+
+_engine = None
+
+
+def set_sqlite_pragmas(dbapi_connection, _):
+    # WAL: leitores não bloqueiam o escritor (e vice-versa); NORMAL é seguro com WAL
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA busy_timeout={config.SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA synchronous={config.SQLITE_SYNCHRONOUS}")
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.execute(f"PRAGMA cache_size=-{config.SQLITE_CACHE_MB * 1024}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+def _sqlite_engine(url):
+    engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False, "timeout": config.SQLITE_BUSY_TIMEOUT_MS / 1000},
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_timeout=config.DB_POOL_TIMEOUT,
+    )
+    event.listen(engine, "connect", set_sqlite_pragmas)
+    return engine
+
+
+def _postgresql_engine(url):
+    connect_args = {}
+    if config.DB_STATEMENT_TIMEOUT_MS:
+        connect_args["options"] = f"-c statement_timeout={config.DB_STATEMENT_TIMEOUT_MS}"
+    return create_engine(
+        url,
+        connect_args=connect_args,
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_timeout=config.DB_POOL_TIMEOUT,
+        pool_recycle=config.DB_POOL_RECYCLE,
+        pool_pre_ping=True,
+    )
+
+
+def build_engine(url=None):
+    """
+    Cria o engine com o perfil do banco indicado na URL.
+    """
+    url = make_url(url or config.DATABASE_URL)
+    if url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:"):
+        return _sqlite_engine(url)
+    if url.get_backend_name() == "postgresql":
+        return _postgresql_engine(url)
+    return create_engine(url)
+
+
+def ensure_query_indexes(engine):
+    """
+    Cria os índices que faltam em bancos já existentes (tabelas novas os
+    recebem pelo `Base.metadata.create_all`).
+    """
+    inspector = inspect(engine)
+    for index in QUERY_INDEXES:
+        if inspector.has_table(index.table.name):
+            index.create(bind=engine, checkfirst=True)
+
+
+def configure_database():
+    """
+    Cria (uma única vez) o engine configurado, religa `SessionLocal` a ele e
+    garante os índices. Retorna o engine.
+    """
+    global _engine
+    if _engine is None:
+        _engine = build_engine()
+        database_manager.SessionLocal.configure(bind=_engine)
+        database_manager.engine = _engine
+        ensure_query_indexes(_engine)
+    return _engine
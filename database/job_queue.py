@@ -0,0 +1,260 @@
+"""
+Fila de tarefas em segundo plano guardada no próprio banco (tabela `jobs`),
+sem broker externo. Os workers (`python -m job_worker`) reservam a próxima
+tarefa por prioridade (menor número primeiro) e data de execução; falhas são
+repetidas com espera exponencial até `max_attempts`.
+
+Tarefas com a mesma `dedupe_key` não ficam duplicadas na fila e nunca rodam
+ao mesmo tempo (ex.: uma única reindexação por vez).
+"""
+import datetime
+import itertools
+import json
+import random
+
+from sqlalchemy import Column, DateTime, Index, Integer, String, Text, event, exists, func, insert, select, update
+from sqlalchemy.orm import Session, aliased
+
+import config
+from database.database_manager import Base
+from database.models import MedicalExam
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_NORMAL = 5
+PRIORITY_BACKFILL = 9
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+STATUSES = (QUEUED, RUNNING, DONE, FAILED)
+
+# Tipo de tarefa -> prioridade padrão (os handlers ficam em job_worker.py)
+JOB_KINDS = {
+    "reindex_exams": PRIORITY_NORMAL,
+    "summarize_patient": PRIORITY_INTERACTIVE,
+    "summarize_backfill": PRIORITY_BACKFILL,
+}
+
+
+class Job(Base):
+    """
+    Tarefa da fila. `payload` e `result` são JSON.
+    """
+    __tablename__ = 'jobs'
+    __table_args__ = (Index('ix_jobs_claim', 'status', 'priority', 'run_at', 'id'),)
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(50), nullable=False)
+    payload = Column(Text, nullable=False, default="{}")
+    priority = Column(Integer, nullable=False, default=PRIORITY_NORMAL)
+    status = Column(String(10), nullable=False, default=QUEUED)
+    dedupe_key = Column(String(200), index=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False)
+    run_at = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, nullable=False)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    worker = Column(String(100))
+    error = Column(Text)
+    result = Column(Text)
+
+
+def ensure_job_table(engine):
+    Job.__table__.create(bind=engine, checkfirst=True)
+
+
+def _utcnow():
+    return datetime.datetime.utcnow()
+
+
+def _iso(value):
+    return value.isoformat() + "Z" if value else None
+
+
+def job_to_dict(job):
+    return {
+        "id": job.id, "kind": job.kind, "payload": json.loads(job.payload or "{}"), "priority": job.priority,
+        "status": job.status, "attempts": job.attempts, "max_attempts": job.max_attempts,
+        "run_at": _iso(job.run_at), "created_at": _iso(job.created_at), "started_at": _iso(job.started_at),
+        "finished_at": _iso(job.finished_at), "error": job.error,
+        "result": json.loads(job.result) if job.result else None,
+    }
+
+
+def dedupe_key(kind, payload):
+    """
+    Chave que identifica tarefas equivalentes (mesmo trabalho a fazer).
+    """
+    if kind == "summarize_patient":
+        return f"summarize_patient:{payload['patient_id']}:{payload.get('service', 'gemini')}"
+    return kind
+
+
+def _job_values(kind, payload, priority, delay=0, max_attempts=None):
+    now = _utcnow()
+    return {"kind": kind, "payload": json.dumps(payload, ensure_ascii=False), "priority": priority,
+            "status": QUEUED, "dedupe_key": dedupe_key(kind, payload), "attempts": 0,
+            "max_attempts": max_attempts or config.JOB_MAX_ATTEMPTS,
+            "run_at": now + datetime.timedelta(seconds=delay), "created_at": now}
+
+
+def enqueue(db, kind, payload=None, priority=None, delay=0, max_attempts=None, commit=True):
+    """
+    Coloca uma tarefa na fila e a retorna. Se uma tarefa equivalente já está
+    aguardando, ela é reaproveitada (com a maior das prioridades pedidas).
+    """
+    if kind not in JOB_KINDS:
+        raise ValueError(f"Tipo de tarefa desconhecido: '{kind}'. Use um de {', '.join(JOB_KINDS)}.")
+    payload = payload or {}
+    if kind == "summarize_patient" and not isinstance(payload.get("patient_id"), int):
+        raise ValueError("'payload.patient_id' (inteiro) é obrigatório para 'summarize_patient'.")
+    priority = JOB_KINDS[kind] if priority is None else priority
+
+    existing = db.execute(select(Job).where(Job.dedupe_key == dedupe_key(kind, payload), Job.status == QUEUED)
+                          .order_by(Job.id).limit(1)).scalar()
+    if existing is not None:
+        if priority < existing.priority:
+            existing.priority = priority
+    else:
+        existing = Job(**_job_values(kind, payload, priority, delay, max_attempts))
+        db.add(existing)
+    if commit:
+        db.commit()
+    else:
+        db.flush()
+    return existing
+
+
+def submit_job(db, kind, payload=None, priority=None):
+    """
+    `enqueue` para a API: retorna a tarefa como dict.
+    """
+    return job_to_dict(enqueue(db, kind, payload, priority))
+
+
+def claim_job(db, worker, max_priority=None, kinds=None):
+    """
+    Reserva a próxima tarefa pronta para `worker` e a retorna como dict (ou None).
+
+    A reserva é um único UPDATE ... WHERE id = (próxima tarefa) RETURNING, seguro
+    entre processos: no SQLite (3.35+) o comando já começa com o lock de escrita;
+    no PostgreSQL a subconsulta usa FOR UPDATE SKIP LOCKED.
+    """
+    now = _utcnow()
+    candidate, running = aliased(Job), aliased(Job)
+    next_job = (select(candidate.id)
+                .where(candidate.status == QUEUED, candidate.run_at <= now)
+                .where(~exists().where(running.dedupe_key == candidate.dedupe_key, running.status == RUNNING))
+                .order_by(candidate.priority, candidate.run_at, candidate.id)
+                .limit(1))
+    if max_priority is not None:
+        next_job = next_job.where(candidate.priority <= max_priority)
+    if kinds:
+        next_job = next_job.where(candidate.kind.in_(kinds))
+    if db.get_bind().dialect.name == "postgresql":
+        next_job = next_job.with_for_update(skip_locked=True)
+
+    job_id = db.execute(
+        update(Job).where(Job.id == next_job.scalar_subquery(), Job.status == QUEUED)
+        .values(status=RUNNING, worker=worker, started_at=now, attempts=Job.attempts + 1)
+        .returning(Job.id)
+        .execution_options(synchronize_session=False)).scalar()
+    db.commit()
+    return get_job(db, job_id) if job_id is not None else None
+
+
+def complete_job(db, job_id, result=None):
+    db.execute(update(Job).where(Job.id == job_id).values(
+        status=DONE, finished_at=_utcnow(), error=None, worker=None,
+        result=json.dumps(result, ensure_ascii=False, default=str) if result is not None else None))
+    db.commit()
+
+
+def retry_delay(attempts):
+    """
+    Espera antes da próxima tentativa: exponencial, com limite e variação aleatória de ±20%.
+    """
+    delay = min(config.JOB_RETRY_MAX_DELAY, config.JOB_RETRY_BASE_DELAY * 2 ** max(attempts - 1, 0))
+    return delay * random.uniform(0.8, 1.2)
+
+
+def fail_job(db, job_id, error):
+    """
+    Registra a falha: a tarefa volta para a fila após a espera ou, esgotadas as tentativas, fica "failed".
+    """
+    job = db.get(Job, job_id)
+    if job is None:
+        return
+    now = _utcnow()
+    if job.attempts < job.max_attempts:
+        job.status = QUEUED
+        job.run_at = now + datetime.timedelta(seconds=retry_delay(job.attempts))
+    else:
+        job.status = FAILED
+        job.finished_at = now
+    job.error = str(error)[:4000]
+    job.worker = None
+    db.commit()
+
+
+def requeue_stale_jobs(db, lease_seconds=None):
+    """
+    Tarefas em execução há mais que o prazo (worker interrompido) contam como
+    tentativa falha. Retorna quantas foram tratadas.
+    """
+    limit = _utcnow() - datetime.timedelta(seconds=lease_seconds or config.JOB_LEASE_SECONDS)
+    stale = db.execute(select(Job.id).where(Job.status == RUNNING, Job.started_at < limit)).scalars().all()
+    for job_id in stale:
+        fail_job(db, job_id, "Tarefa interrompida (prazo de execução excedido).")
+    return len(stale)
+
+
+def purge_finished_jobs(db, retention_days=None):
+    limit = _utcnow() - datetime.timedelta(days=retention_days or config.JOB_RETENTION_DAYS)
+    deleted = db.query(Job).filter(Job.status.in_((DONE, FAILED)), Job.finished_at < limit).delete(
+        synchronize_session=False)
+    db.commit()
+    return deleted
+
+
+def get_job(db, job_id):
+    job = db.get(Job, job_id)
+    return job_to_dict(job) if job else None
+
+
+def list_jobs(db, status=None, kind=None, limit=50):
+    stmt = select(Job).order_by(Job.id.desc()).limit(limit)
+    if status:
+        stmt = stmt.where(Job.status == status)
+    if kind:
+        stmt = stmt.where(Job.kind == kind)
+    return [job_to_dict(job) for job in db.execute(stmt).scalars()]
+
+
+def queue_stats(db):
+    """
+    Contagem de tarefas por tipo e status, e a espera da tarefa pronta mais antiga.
+    """
+    counts = {}
+    for kind, status, total in db.execute(select(Job.kind, Job.status, func.count()).group_by(Job.kind, Job.status)):
+        counts.setdefault(kind, dict.fromkeys(STATUSES, 0))[status] = total
+    oldest = db.execute(select(func.min(Job.run_at)).where(Job.status == QUEUED, Job.run_at <= _utcnow())).scalar()
+    return {"jobs": counts,
+            "oldest_ready_seconds": round((_utcnow() - oldest).total_seconds(), 1) if oldest else 0}
+
+
+@event.listens_for(Session, "after_flush")
+def _schedule_reindex(session, flush_context):
+    """
+    Com `JOB_AUTO_REINDEX`, exames gravados pelo ORM agendam uma reindexação.
+    O atraso `JOB_REINDEX_DELAY` agrupa várias gravações em uma só tarefa.
+    """
+    if not config.JOB_AUTO_REINDEX:
+        return
+    if not any(isinstance(obj, MedicalExam) for obj in itertools.chain(session.new, session.dirty, session.deleted)):
+        return
+    connection = session.connection()
+    pending = connection.execute(select(Job.id).where(Job.dedupe_key == "reindex_exams", Job.status == QUEUED)
+                                 .limit(1)).first()
+    if pending is None:
+        connection.execute(insert(Job.__table__).values(
+            **_job_values("reindex_exams", {}, JOB_KINDS["reindex_exams"], delay=config.JOB_REINDEX_DELAY)))
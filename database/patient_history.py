@@ -0,0 +1,86 @@
+from sqlalchemy.orm import joinedload, selectinload
+
+from database.models import Appointment
+
+
+def format_date(value):
+    return value.strftime('%Y-%m-%d') if value else "-"
+
+
+def load_patient_timeline(db, patient_id):
+    """
+    Carrega as consultas do paciente, em ordem cronológica, já com médico e exames.
+
+    Usa um número fixo de queries (consultas + médico via JOIN e exames via
+    SELECT ... IN), independente do tamanho do histórico.
+    """
+    return (db.query(Appointment)
+            .options(joinedload(Appointment.doctor), selectinload(Appointment.exams))
+            .filter(Appointment.patient_id == patient_id)
+            .order_by(Appointment.appointment_date, Appointment.id)
+            .all())
+
+
+def render_patient_header(patient):
+    return f"Histórico do Paciente: {patient.name} (Nasc: {format_date(patient.date_of_birth)})\n"
+
+
+def render_appointment(appt):
+    """
+    Texto de uma consulta e seus exames, como aparece no histórico.
+    """
+    parts = [f"\n  Consulta em {format_date(appt.appointment_date)} com Dr. {appt.doctor.name}: {appt.description}\n"]
+    for exam in appt.exams:
+        parts.append(f"    - Exame: {exam.exam_type}\n      Resultados: {exam.results}\n      Plano: {exam.treatment_plan}\n")
+    return "".join(parts)
+
+
+def render_patient_history(patient, appointments):
+    """
+    Monta o texto do histórico do paciente enviado aos serviços de LLM.
+    """
+    return render_patient_header(patient) + "".join(render_appointment(appt) for appt in appointments)
+
+
+def render_timeline_entry(appt, max_chars=160):
+    """
+    Linha da linha do tempo compacta: data, médico, descrição (truncada) e tipos de exame.
+    """
+    description = " ".join((appt.description or "").split())
+    if len(description) > max_chars:
+        description = description[:max_chars - 3] + "..."
+    exam_types = ", ".join(exam.exam_type for exam in appt.exams)
+    return (f"  {format_date(appt.appointment_date)} - Dr. {appt.doctor.name}: {description}"
+            + (f" [exames: {exam_types}]" if exam_types else "") + "\n")
+
+
+def render_focused_history(patient, topic, appointments, exam_ids, max_timeline=None):
+    """
+    Texto do resumo focado em um tema: cabeçalho, tema, linha do tempo compacta
+    e, por completo, apenas os exames de `exam_ids` (em ordem de relevância).
+
+    A linha do tempo mantém as `max_timeline` consultas mais recentes e as dos
+    exames selecionados; as demais são apenas contadas.
+    """
+    exams = {exam.id: (appt, exam) for appt in appointments for exam in appt.exams}
+    selected = [exams[exam_id] for exam_id in exam_ids if exam_id in exams]
+
+    timeline = appointments
+    if max_timeline is not None and len(appointments) > max_timeline:
+        keep = {id(appt) for appt, _ in selected} | {id(appt) for appt in appointments[-max_timeline:]}
+        timeline = [appt for appt in appointments if id(appt) in keep]
+
+    parts = [render_patient_header(patient), f"Tema do resumo: {topic}\n",
+             "Concentre o resumo neste tema; a linha do tempo serve apenas de contexto.\n",
+             f"\nLinha do tempo resumida ({len(appointments)} consultas"]
+    if len(timeline) < len(appointments):
+        parts.append(f", {len(appointments) - len(timeline)} omitidas")
+    parts.append("):\n")
+    parts.extend(render_timeline_entry(appt) for appt in timeline)
+    parts.append("\nExames mais relevantes para o tema:\n")
+    for appt, exam in selected:
+        parts.append(f"  Exame de {format_date(appt.appointment_date)} (Dr. {appt.doctor.name}): {exam.exam_type}\n"
+                     f"    Resultados: {exam.results}\n    Plano: {exam.treatment_plan}\n")
+    if not selected:
+        parts.append("  (nenhum exame relacionado ao tema foi encontrado)\n")
+    return "".join(parts)
@@ -0,0 +1,49 @@
+from sqlalchemy import select
+
+from database.models import Patient
+
+PATIENT_COLUMNS = (Patient.id, Patient.name, Patient.date_of_birth)
+
+
+def patient_row_to_dict(row):
+    return {"id": row.id, "name": row.name,
+            "date_of_birth": row.date_of_birth.strftime('%Y-%m-%d') if row.date_of_birth else None}
+
+
+def _patients_after(after):
+    stmt = select(*PATIENT_COLUMNS).order_by(Patient.id)
+    if after is not None:
+        stmt = stmt.where(Patient.id > after)
+    return stmt
+
+
+def list_patients_page(db, after=None, limit=100):
+    """
+    Uma página de pacientes em ordem de id (paginação por cursor/keyset).
+
+    Seleciona apenas as colunas necessárias e busca `limit + 1` linhas para
+    saber se há próxima página, sem OFFSET nem COUNT.
+    Retorna (pacientes, próximo_cursor), com cursor None na última página.
+    """
+    rows = db.execute(_patients_after(after).limit(limit + 1)).all()
+    next_cursor = rows[limit - 1].id if len(rows) > limit else None
+    return [patient_row_to_dict(row) for row in rows[:limit]], next_cursor
+
+
+def iter_patients(db, after=None, chunk_size=1000):
+    """
+    Percorre todos os pacientes a partir do cursor, buscando-os em blocos de
+    `chunk_size` linhas para manter a memória constante.
+    """
+    result = db.execute(_patients_after(after).execution_options(yield_per=chunk_size))
+    for row in result:
+        yield patient_row_to_dict(row)
+
+
+async def iter_patients_async(db, after=None, chunk_size=1000):
+    """
+    Versão de `iter_patients` para `AsyncSession` (streaming NDJSON da API).
+    """
+    result = await db.stream(_patients_after(after).execution_options(yield_per=chunk_size))
+    async for row in result:
+        yield patient_row_to_dict(row)
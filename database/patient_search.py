@@ -0,0 +1,223 @@
+import difflib
+import unicodedata
+
+from sqlalchemy import Column, ForeignKey, Integer, String, bindparam, event, select, text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+from database.database_manager import Base
+from database.models import Patient
+from database.patient_listing import patient_row_to_dict
+
+FTS_TABLE = "patient_names_fts"
+# Trechos menores que um trigrama não podem ser buscados no índice FTS
+MIN_FTS_CHARS = 3
+# Candidatos avaliados pela busca aproximada (nomes com erros de digitação)
+FUZZY_CANDIDATES = 200
+FUZZY_MIN_RATIO = 0.6
+
+
+def normalize_name(name):
+    """
+    Nome em minúsculas, sem acentos e com espaços simples ("João  Pereira" -> "joao pereira").
+    """
+    decomposed = unicodedata.normalize("NFKD", name or "")
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(stripped.casefold().split())
+
+
+class PatientSearchName(Base):
+    """
+    Nome normalizado de cada paciente, com índice, usado pela busca por nome.
+
+    `source_name` guarda o nome original para detectar alterações na sincronização.
+    """
+    __tablename__ = 'patient_search_names'
+
+    patient_id = Column(Integer, ForeignKey(Patient.id, ondelete="CASCADE"), primary_key=True)
+    source_name = Column(String, nullable=False)
+    normalized_name = Column(String, nullable=False, index=True)
+
+
+# Índice FTS5 com tokenizador trigram sobre a tabela de nomes normalizados
+# (external content); os triggers o mantêm em dia com a tabela.
+_FTS_DDL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"normalized_name, content='patient_search_names', content_rowid='patient_id', tokenize='trigram')",
+    f"CREATE TRIGGER IF NOT EXISTS patient_search_names_ai AFTER INSERT ON patient_search_names BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, normalized_name) VALUES (new.patient_id, new.normalized_name); END",
+    f"CREATE TRIGGER IF NOT EXISTS patient_search_names_ad AFTER DELETE ON patient_search_names BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, normalized_name) "
+    f"VALUES ('delete', old.patient_id, old.normalized_name); END",
+    f"CREATE TRIGGER IF NOT EXISTS patient_search_names_au AFTER UPDATE ON patient_search_names BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, normalized_name) "
+    f"VALUES ('delete', old.patient_id, old.normalized_name); "
+    f"INSERT INTO {FTS_TABLE}(rowid, normalized_name) VALUES (new.patient_id, new.normalized_name); END",
+)
+
+
+def _create_pg_trigram_index(connection):
+    """
+    No PostgreSQL, um índice GIN pg_trgm acelera o LIKE '%termo%' da busca por trechos.
+    """
+    try:
+        with connection.begin_nested():
+            connection.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            connection.exec_driver_sql(
+                "CREATE INDEX IF NOT EXISTS ix_patient_search_names_trgm "
+                "ON patient_search_names USING gin (normalized_name gin_trgm_ops)")
+    except (OperationalError, ProgrammingError) as e:
+        print(f"Índice pg_trgm indisponível, busca por trechos sem índice: {e}")
+
+
+def _create_fts(connection):
+    """
+    Cria o índice FTS5 (SQLite 3.34+). Retorna False se não for suportado;
+    nesse caso a busca por trechos usa LIKE sobre o nome normalizado.
+    """
+    if connection.dialect.name == "postgresql":
+        _create_pg_trigram_index(connection)
+    if connection.dialect.name != "sqlite":
+        return False
+    try:
+        for statement in _FTS_DDL:
+            connection.exec_driver_sql(statement)
+    except OperationalError as e:
+        print(f"Índice FTS5 (trigram) indisponível, usando busca sem FTS: {e}")
+        return False
+    return True
+
+
+_fts_available = {}
+
+
+def _has_fts(db):
+    bind = db.get_bind()
+    if bind not in _fts_available:
+        _fts_available[bind] = bind.dialect.name == "sqlite" and db.execute(
+            text("SELECT 1 FROM sqlite_master WHERE name = :name"), {"name": FTS_TABLE}).first() is not None
+    return _fts_available[bind]
+
+
+def sync_patient_search(connection):
+    """
+    Atualiza a tabela de nomes normalizados com os pacientes novos, renomeados
+    ou removidos. Só as diferenças são processadas.
+    Retorna o número de nomes inseridos ou atualizados.
+    """
+    search = PatientSearchName.__table__
+    changed = connection.execute(
+        select(Patient.id, Patient.name, search.c.patient_id.label("indexed_id"))
+        .outerjoin(search, search.c.patient_id == Patient.id)
+        .where((search.c.patient_id.is_(None)) | (search.c.source_name != Patient.name))
+    ).all()
+    inserts = [{"patient_id": row.id, "source_name": row.name or "", "normalized_name": normalize_name(row.name)}
+               for row in changed if row.indexed_id is None]
+    updates = [{"pid": row.id, "source_name": row.name or "", "normalized_name": normalize_name(row.name)}
+               for row in changed if row.indexed_id is not None]
+    if inserts:
+        connection.execute(search.insert(), inserts)
+    if updates:
+        connection.execute(search.update().where(search.c.patient_id == bindparam("pid")), updates)
+    connection.execute(search.delete().where(~search.c.patient_id.in_(select(Patient.id))))
+    return len(changed)
+
+
+def ensure_patient_search(engine):
+    """
+    Cria a tabela de nomes e o índice FTS, se necessário, e sincroniza os nomes.
+    """
+    PatientSearchName.__table__.create(bind=engine, checkfirst=True)
+    with engine.begin() as connection:
+        created = _create_fts(connection)
+        fts_empty = created and connection.exec_driver_sql(f"SELECT 1 FROM {FTS_TABLE}_docsize LIMIT 1").first() is None
+        if fts_empty:
+            # Tabela de nomes preenchida antes do índice FTS existir
+            connection.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+        synced = sync_patient_search(connection)
+    _fts_available[engine] = created
+    if synced:
+        print(f"Busca de pacientes: {synced} nomes indexados.")
+
+
+@event.listens_for(Patient, "after_insert")
+@event.listens_for(Patient, "after_update")
+def _index_patient_name(mapper, connection, patient):
+    # Mantém o nome normalizado em dia quando pacientes são gravados pelo ORM
+    if not connection.dialect.has_table(connection, PatientSearchName.__tablename__):
+        return
+    search = PatientSearchName.__table__
+    values = {"source_name": patient.name or "", "normalized_name": normalize_name(patient.name)}
+    updated = connection.execute(search.update().where(search.c.patient_id == patient.id).values(**values))
+    if updated.rowcount == 0:
+        connection.execute(search.insert().values(patient_id=patient.id, **values))
+
+
+def _fts_phrase(term):
+    return '"' + term.replace('"', '""') + '"'
+
+
+def search_patients(db, query, limit=10):
+    """
+    Busca pacientes pelo nome, sem diferenciar acentos e maiúsculas.
+
+    Ordem dos resultados: nome idêntico, nomes que começam com o termo, nomes
+    que contêm todas as palavras do termo (índice trigram, por relevância) e,
+    se nada for encontrado, nomes parecidos (tolerando erros de digitação).
+    Retorna uma lista de dicts {id, name, date_of_birth, match}.
+    """
+    term = normalize_name(query)
+    if not term:
+        return []
+    search = PatientSearchName.__table__
+    found = {}
+
+    def collect(statement, match):
+        for row in db.execute(statement):
+            if len(found) >= limit:
+                return
+            found.setdefault(row.patient_id, match)
+
+    base = select(search.c.patient_id)
+    collect(base.where(search.c.normalized_name == term).order_by(search.c.patient_id).limit(limit), "exact")
+    if len(found) < limit:
+        # Intervalo [termo, termo + U+FFFF) usa o índice de normalized_name, ao contrário de LIKE 'termo%'
+        collect(base.where(search.c.normalized_name > term, search.c.normalized_name < term + "\uffff")
+                .order_by(search.c.normalized_name).limit(limit), "prefix")
+
+    use_fts = _has_fts(db)
+    if len(found) < limit:
+        words = term.split()
+        if use_fts and all(len(word) >= MIN_FTS_CHARS for word in words):
+            statement = text(f"SELECT rowid AS patient_id FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match "
+                             f"ORDER BY rank LIMIT :limit").bindparams(
+                match=" AND ".join(_fts_phrase(word) for word in words), limit=limit + len(found))
+            collect(statement, "contains")
+        else:
+            condition = [search.c.normalized_name.contains(word, autoescape=True) for word in words]
+            collect(base.where(*condition).order_by(search.c.normalized_name).limit(limit + len(found)), "contains")
+
+    if not found and use_fts and len(term) >= MIN_FTS_CHARS:
+        trigrams = {term[i:i + 3] for i in range(len(term) - 2)}
+        statement = text(f"SELECT rowid AS patient_id, normalized_name FROM {FTS_TABLE} WHERE {FTS_TABLE} "
+                         f"MATCH :match ORDER BY rank LIMIT :limit").bindparams(
+            match=" OR ".join(_fts_phrase(trigram) for trigram in trigrams), limit=FUZZY_CANDIDATES)
+        scored = sorted(((difflib.SequenceMatcher(None, term, row.normalized_name).ratio(), row.patient_id)
+                         for row in db.execute(statement)), reverse=True)
+        for ratio, patient_id in scored[:limit]:
+            if ratio >= FUZZY_MIN_RATIO:
+                found[patient_id] = "similar"
+
+    if not found:
+        return []
+    rows = {row.id: row for row in db.execute(
+        select(Patient.id, Patient.name, Patient.date_of_birth).where(Patient.id.in_(list(found))))}
+    return [dict(patient_row_to_dict(rows[patient_id]), match=match)
+            for patient_id, match in found.items() if patient_id in rows]
+
+
+def find_patient(db, name):
+    """
+    Paciente mais relevante para o nome informado, ou None.
+    """
+    matches = search_patients(db, name, limit=1)
+    return db.get(Patient, matches[0]["id"]) if matches else None
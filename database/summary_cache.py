@@ -0,0 +1,167 @@
+import datetime
+import hashlib
+
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String, Text, UniqueConstraint
+from sqlalchemy.exc import IntegrityError
+
+import config
+from database.database_manager import Base
+from database.models import Patient
+
+
+class PatientSummary(Base):
+    """
+    Resumo gerado por LLM para o histórico de um paciente.
+
+    A chave é (paciente, serviço de LLM, versão do prompt, hash do histórico
+    renderizado): enquanto consultas e exames não mudam, o resumo é reaproveitado.
+    """
+    __tablename__ = 'patient_summaries'
+    __table_args__ = (
+        UniqueConstraint('patient_id', 'llm_service', 'prompt_version', 'history_hash',
+                         name='uq_patient_summaries_key'),
+        Index('ix_patient_summaries_patient_service', 'patient_id', 'llm_service'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    patient_id = Column(Integer, ForeignKey(Patient.id), nullable=False)
+    llm_service = Column(String(20), nullable=False)
+    prompt_version = Column(String(20), nullable=False)
+    history_hash = Column(String(64), nullable=False)
+    summary = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+
+
+class ChunkSummary(Base):
+    """
+    Resumo parcial de um trecho do histórico (sumarização map-reduce).
+
+    A chave é o hash do texto do trecho: trechos antigos de um histórico longo
+    não mudam quando novas consultas entram, então só os novos são resumidos.
+    """
+    __tablename__ = 'history_chunk_summaries'
+    __table_args__ = (
+        UniqueConstraint('llm_service', 'prompt_version', 'chunk_hash', name='uq_history_chunk_summaries_key'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    llm_service = Column(String(20), nullable=False)
+    prompt_version = Column(String(20), nullable=False)
+    chunk_hash = Column(String(64), nullable=False)
+    summary = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+
+
+def ensure_summary_table(engine):
+    """
+    Cria as tabelas de resumos se elas ainda não existirem.
+    """
+    PatientSummary.__table__.create(bind=engine, checkfirst=True)
+    ChunkSummary.__table__.create(bind=engine, checkfirst=True)
+
+
+def history_fingerprint(history_text):
+    return hashlib.sha256(history_text.encode('utf-8')).hexdigest()
+
+
+def _summary_key(patient_id, service_name, history_text):
+    return dict(patient_id=patient_id, llm_service=service_name,
+                prompt_version=config.SUMMARY_PROMPT_VERSION, history_hash=history_fingerprint(history_text))
+
+
+def get_cached_summary(db, patient_id, service_name, history_text):
+    """
+    Retorna o resumo salvo para o histórico atual, ou None.
+    """
+    cached = (db.query(PatientSummary.summary)
+              .filter_by(**_summary_key(patient_id, service_name, history_text)).first())
+    return cached.summary if cached else None
+
+
+def find_cached_summary(db, patient_id, history_text, service_name=None):
+    """
+    Como `get_cached_summary`, mas retorna (serviço, resumo), ou None. Sem
+    `service_name` aceita o resumo mais recente de qualquer serviço.
+    """
+    query = (db.query(PatientSummary.llm_service, PatientSummary.summary)
+             .filter_by(patient_id=patient_id, prompt_version=config.SUMMARY_PROMPT_VERSION,
+                        history_hash=history_fingerprint(history_text)))
+    if service_name is not None:
+        query = query.filter_by(llm_service=service_name)
+    cached = query.order_by(PatientSummary.created_at.desc()).first()
+    return (cached.llm_service, cached.summary) if cached else None
+
+
+def store_summary(db, patient_id, service_name, history_text, summary):
+    """
+    Salva o resumo do histórico atual, mantendo apenas o mais recente por
+    paciente/serviço/versão do prompt.
+    """
+    db.query(PatientSummary).filter_by(patient_id=patient_id, llm_service=service_name,
+                                       prompt_version=config.SUMMARY_PROMPT_VERSION).delete()
+    db.add(PatientSummary(summary=summary, **_summary_key(patient_id, service_name, history_text)))
+    try:
+        db.commit()
+    except IntegrityError:
+        # Outra requisição gravou o mesmo resumo ao mesmo tempo
+        db.rollback()
+
+
+def get_or_create_summary(db, patient_id, service_name, history_text, summarize, force_refresh=False):
+    """
+    Retorna (resumo, veio_do_cache). Só chama `summarize(history_text)` quando
+    não há resumo para o histórico atual ou quando `force_refresh` é verdadeiro.
+    """
+    if not force_refresh:
+        summary = get_cached_summary(db, patient_id, service_name, history_text)
+        if summary is not None:
+            return summary, True
+
+    summary = summarize(history_text)
+    store_summary(db, patient_id, service_name, history_text, summary)
+    return summary, False
+
+
+def get_chunk_summaries(db, service_name, chunk_texts):
+    """
+    Resumos parciais já salvos, indexados pelo hash do texto do trecho. Com
+    `service_name=None` aceita os de qualquer serviço (o mais recente).
+    """
+    hashes = [history_fingerprint(text) for text in chunk_texts]
+    query = (db.query(ChunkSummary.chunk_hash, ChunkSummary.summary)
+             .filter(ChunkSummary.prompt_version == config.SUMMARY_PROMPT_VERSION,
+                     ChunkSummary.chunk_hash.in_(hashes)))
+    if service_name is not None:
+        query = query.filter(ChunkSummary.llm_service == service_name)
+    return dict(query.order_by(ChunkSummary.created_at).all())
+
+
+def find_chunk_summary(db, chunk_text, service_name=None):
+    """
+    Resumo parcial salvo para o texto, como (serviço, resumo), ou None. Sem
+    `service_name` aceita o mais recente de qualquer serviço.
+    """
+    query = (db.query(ChunkSummary.llm_service, ChunkSummary.summary)
+             .filter_by(prompt_version=config.SUMMARY_PROMPT_VERSION, chunk_hash=history_fingerprint(chunk_text)))
+    if service_name is not None:
+        query = query.filter_by(llm_service=service_name)
+    cached = query.order_by(ChunkSummary.created_at.desc()).first()
+    return (cached.llm_service, cached.summary) if cached else None
+
+
+def store_chunk_summaries(db, service_name, summaries_by_text):
+    """
+    Salva os resumos parciais, substituindo os já salvos para os mesmos textos
+    (ex.: um resumo focado gerado de novo com `refresh`).
+    """
+    hashes = [history_fingerprint(text) for text in summaries_by_text]
+    db.query(ChunkSummary).filter(ChunkSummary.llm_service == service_name,
+                                  ChunkSummary.prompt_version == config.SUMMARY_PROMPT_VERSION,
+                                  ChunkSummary.chunk_hash.in_(hashes)).delete(synchronize_session=False)
+    for text, summary in summaries_by_text.items():
+        db.add(ChunkSummary(llm_service=service_name, prompt_version=config.SUMMARY_PROMPT_VERSION,
+                            chunk_hash=history_fingerprint(text), summary=summary))
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
@@ -1,5 +1,25 @@
-import os, csv, sys, time
+"""
+Exporta os itens de um GitHub Project (v2) para CSV ou Parquet.
+
+    python export_github_project.py                    # CSV, retoma exportação interrompida
+    python export_github_project.py --format parquet
+    python export_github_project.py --restart          # ignora o checkpoint e começa do zero
+    python export_github_project.py --incremental      # busca só os itens alterados desde a última exportação
+
+As páginas são buscadas por uma thread (a próxima página chega enquanto a
+atual é gravada), com sessão HTTP reutilizada e ritmo ajustado ao rate limit
+da API. Cada página é achatada, filtrada pela view e gravada em seguida; o
+cursor da última página gravada fica em um checkpoint, de modo que uma
+exportação interrompida continua de onde parou.
+
+Cada exportação grava também um manifesto (`<saída>.manifest.json`) com o id e
+a data de atualização de cada item; no modo incremental, uma listagem leve
+(só ids e datas) é comparada ao manifesto e apenas os itens novos ou alterados
+são buscados por completo e mesclados ao arquivo anterior.
+"""
+import os, csv, sys, time, json, re, queue, shutil, argparse, threading
 import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 import pandas as pd
 
@@ -9,18 +29,120 @@ GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
 GITHUB_USER = os.getenv("GITHUB_USER")                # ex: "Marcos-Lopes80"
 PROJECT_NUMBER = int(os.getenv("PROJECT_NUMBER", "3"))
 VIEW_NAME = os.getenv("VIEW_NAME", "").strip() or None
+EXPORT_FORMAT = os.getenv("EXPORT_FORMAT", "csv").lower()
+EXPORT_INCREMENTAL = os.getenv("EXPORT_INCREMENTAL", "false").lower() == "true"
 
 API = "https://api.github.com/graphql"
 HEADERS = {"Authorization": f"Bearer {GITHUB_TOKEN}"}
 
+MAX_RETRIES = 6
+# Abaixo destes pontos restantes no rate limit, as requisições são espaçadas até o reset
+RATE_LIMIT_SLOWDOWN = 500
+RATE_LIMIT_RESERVE = 50
+
+BASE_COLUMNS = ["project_item_id", "type", "title", "url", "repo", "number", "state", "assignees", "labels",
+                "milestone", "milestone_due", "createdAt", "updatedAt"]
+
+
+class GitHubClient:
+    """
+    Cliente GraphQL com sessão HTTP reutilizada (keep-alive) e ritmo adaptativo:
+    com folga no rate limit não há espera; perto do fim, as requisições restantes
+    são distribuídas até o reset. Erros temporários e limites secundários
+    (403/429) são repetidos com espera exponencial ou `Retry-After`.
+    """
+
+    def __init__(self, token=GITHUB_TOKEN):
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=4))
+        self.session.headers.update({"Authorization": f"Bearer {token}"})
+        self.remaining = None
+        self.reset_at = None
+        self.cost = 1
+        self.lock = threading.Lock()
+
+    def _update_limits(self, response, data=None):
+        headers = response.headers
+        with self.lock:
+            if "x-ratelimit-remaining" in headers:
+                self.remaining = int(headers["x-ratelimit-remaining"])
+            if "x-ratelimit-reset" in headers:
+                self.reset_at = int(headers["x-ratelimit-reset"])
+            rate = (data or {}).get("rateLimit")
+            if rate:
+                self.cost = max(int(rate.get("cost") or 1), 1)
+                self.remaining = rate.get("remaining", self.remaining)
+
+    def _pace(self):
+        with self.lock:
+            remaining, reset_at, cost = self.remaining, self.reset_at, self.cost
+        if remaining is None or reset_at is None:
+            return
+        window = reset_at - time.time()
+        if window <= 0:
+            return
+        if remaining <= RATE_LIMIT_RESERVE + cost:
+            print(f"[INFO] Rate limit quase esgotado ({remaining} pontos); aguardando {window:.0f}s até o reset.")
+            time.sleep(window + 1)
+        elif remaining < RATE_LIMIT_SLOWDOWN:
+            time.sleep(window / max((remaining - RATE_LIMIT_RESERVE) / cost, 1))
+
+    def _retry_wait(self, response, attempt):
+        if response is not None:
+            if response.headers.get("retry-after"):
+                return float(response.headers["retry-after"])
+            if response.headers.get("x-ratelimit-remaining") == "0" and response.headers.get("x-ratelimit-reset"):
+                return max(int(response.headers["x-ratelimit-reset"]) - time.time(), 0) + 1
+        return min(2 ** attempt, 60)
+
+    def gql(self, query, variables=None):
+        for attempt in range(MAX_RETRIES):
+            self._pace()
+            response = None
+            try:
+                response = self.session.post(API, json={"query": query, "variables": variables or {}}, timeout=60)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = f"{type(e).__name__}: {e}"
+            else:
+                if response.status_code == 200:
+                    data = response.json()
+                    self._update_limits(response, data.get("data"))
+                    errors = data.get("errors")
+                    if not errors:
+                        return data["data"]
+                    if not any(e.get("type") == "RATE_LIMITED" for e in errors):
+                        raise RuntimeError(errors)
+                    error = "RATE_LIMITED"
+                elif response.status_code in (403, 429) and ("rate limit" in response.text.lower()
+                                                             or "retry-after" in response.headers):
+                    error = f"HTTP {response.status_code} (limite secundário)"
+                elif response.status_code in (502, 503, 504):
+                    error = f"HTTP {response.status_code}"
+                else:
+                    raise RuntimeError(f"HTTP {response.status_code}: {response.text}")
+            if attempt == MAX_RETRIES - 1:
+                raise RuntimeError(f"Falha após {MAX_RETRIES} tentativas: {error}")
+            wait = self._retry_wait(response, attempt)
+            print(f"[WARN] {error}; nova tentativa em {wait:.0f}s.")
+            time.sleep(wait)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+def shared_client():
+    """
+    Cliente único do processo: todas as chamadas dividem a sessão HTTP e o
+    ritmo ajustado ao rate limit.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = GitHubClient()
+    return _client
+
 def gql(query, variables=None):
-    r = requests.post(API, headers=HEADERS, json={"query": query, "variables": variables or {}}, timeout=60)
-    if r.status_code != 200:
-        raise RuntimeError(f"HTTP {r.status_code}: {r.text}")
-    data = r.json()
-    if "errors" in data:
-        raise RuntimeError(data["errors"])
-    return data["data"]
+    return shared_client().gql(query, variables)
 
 def get_user_id(login):
     q = """
@@ -56,70 +178,146 @@ def get_project(user_login, project_number):
         raise RuntimeError(f"Project not found: {user_login} / #{project_number}")
     return p
 
-def list_items(project_id, per_page=100):
-    q = """
-    query($pid:ID!, $after:String){
-      node(id:$pid){
-        ... on ProjectV2{
-          items(first:100, after:$after){
-            pageInfo{ hasNextPage endCursor }
-            nodes{
-              id
-              content{
-                __typename
-                ... on Issue {
-                  id number title url state
-                  repository{ nameWithOwner }
-                  assignees(first:10){ nodes{ login } }
-                  labels(first:20){ nodes{ name } }
-                  milestone{ title dueOn }
-                  createdAt updatedAt
-                }
-                ... on PullRequest {
-                  id number title url state
-                  repository{ nameWithOwner }
-                  assignees(first:10){ nodes{ login } }
-                  labels(first:20){ nodes{ name } }
-                  milestone{ title dueOn }
-                  createdAt updatedAt
-                }
-                ... on DraftIssue {
-                  title
-                }
-              }
-              fieldValues(first:50){
-                nodes{
-                  __typename
-                  ... on ProjectV2ItemFieldTextValue { field { ... on ProjectV2FieldCommon { id name } } text }
-                  ... on ProjectV2ItemFieldNumberValue { field { ... } number }
-                  ... on ProjectV2ItemFieldDateValue { field { ... } date }
-                  ... on ProjectV2ItemFieldSingleSelectValue { field { ... } name optionId }
-                  ... on ProjectV2ItemFieldIterationValue { field { ... } title startDate duration }
-                  ... on ProjectV2ItemFieldMilestoneValue { field { ... } milestone { title dueOn } }
-                  ... on ProjectV2ItemFieldRepositoryValue { field { ... } repository { nameWithOwner } }
-                  ... on ProjectV2ItemFieldPullRequestValue { field { ... } pullRequests(first:10){ nodes{ number url } } }
-                  ... on ProjectV2ItemFieldUserValue { field { ... } users(first:10){ nodes{ login } } }
-                }
-              }
-            }
+ITEM_FRAGMENT = """
+fragment ItemFields on ProjectV2Item {
+  id updatedAt
+  content{
+    __typename
+    ... on Issue {
+      id number title url state
+      repository{ nameWithOwner }
+      assignees(first:10){ nodes{ login } }
+      labels(first:20){ nodes{ name } }
+      milestone{ title dueOn }
+      createdAt updatedAt
+    }
+    ... on PullRequest {
+      id number title url state
+      repository{ nameWithOwner }
+      assignees(first:10){ nodes{ login } }
+      labels(first:20){ nodes{ name } }
+      milestone{ title dueOn }
+      createdAt updatedAt
+    }
+    ... on DraftIssue {
+      title updatedAt
+    }
+  }
+  fieldValues(first:50){
+    nodes{
+      __typename
+      ... on ProjectV2ItemFieldTextValue { field { ... on ProjectV2FieldCommon { id name } } text }
+      ... on ProjectV2ItemFieldNumberValue { field { ... on ProjectV2FieldCommon { name } } number }
+      ... on ProjectV2ItemFieldDateValue { field { ... on ProjectV2FieldCommon { name } } date }
+      ... on ProjectV2ItemFieldSingleSelectValue { field { ... on ProjectV2FieldCommon { name } } name optionId }
+      ... on ProjectV2ItemFieldIterationValue { field { ... on ProjectV2FieldCommon { name } } title startDate duration }
+      ... on ProjectV2ItemFieldMilestoneValue { field { ... on ProjectV2FieldCommon { name } } milestone { title dueOn } }
+      ... on ProjectV2ItemFieldRepositoryValue { field { ... on ProjectV2FieldCommon { name } } repository { nameWithOwner } }
+      ... on ProjectV2ItemFieldPullRequestValue { field { ... on ProjectV2FieldCommon { name } } pullRequests(first:10){ nodes{ number url } } }
+      ... on ProjectV2ItemFieldUserValue { field { ... on ProjectV2FieldCommon { name } } users(first:10){ nodes{ login } } }
+    }
+  }
+}
+"""
+
+ITEMS_QUERY = """
+query($pid:ID!, $after:String, $first:Int!){
+  rateLimit{ cost remaining resetAt }
+  node(id:$pid){
+    ... on ProjectV2{
+      items(first:$first, after:$after){
+        pageInfo{ hasNextPage endCursor }
+        nodes{ ...ItemFields }
+      }
+    }
+  }
+}
+""" + ITEM_FRAGMENT
+
+# Só id e datas de atualização: listagem leve usada pela exportação incremental
+STAMPS_QUERY = """
+query($pid:ID!, $after:String, $first:Int!){
+  rateLimit{ cost remaining resetAt }
+  node(id:$pid){
+    ... on ProjectV2{
+      items(first:$first, after:$after){
+        pageInfo{ hasNextPage endCursor }
+        nodes{
+          id updatedAt
+          content{
+            ... on Issue { updatedAt }
+            ... on PullRequest { updatedAt }
+            ... on DraftIssue { updatedAt }
           }
         }
       }
     }
+  }
+}
+"""
+
+NODES_QUERY = """
+query($ids:[ID!]!){
+  rateLimit{ cost remaining resetAt }
+  nodes(ids:$ids){ ...ItemFields }
+}
+""" + ITEM_FRAGMENT
+
+def iter_item_pages(project_id, after=None, per_page=100, client=None, prefetch=2, query=ITEMS_QUERY):
     """
-    items = []
-    after = None
+    Gera (itens, cursor_final) página a página. Uma thread busca as próximas
+    `prefetch` páginas enquanto a atual é processada; o cursor permite retomar.
+    """
+    client = client or shared_client()
+    pages = queue.Queue(maxsize=prefetch)
+
+    def fetch(cursor):
+        try:
+            while True:
+                node = client.gql(query, {"pid": project_id, "after": cursor, "first": per_page})["node"]["items"]
+                pages.put((node["nodes"], node["pageInfo"]["endCursor"]))
+                if not node["pageInfo"]["hasNextPage"]:
+                    break
+                cursor = node["pageInfo"]["endCursor"]
+            pages.put(None)
+        except Exception as e:
+            pages.put(e)
+
+    threading.Thread(target=fetch, args=(after,), name="github-fetch", daemon=True).start()
     while True:
-        d = gql(q, {"pid": project_id, "after": after})
-        node = d["node"]["items"]
-        items.extend(node["nodes"])
-        if node["pageInfo"]["hasNextPage"]:
-            after = node["pageInfo"]["endCursor"]
-            time.sleep(0.3)
-        else:
-            break
+        page = pages.get()
+        if page is None:
+            return
+        if isinstance(page, Exception):
+            raise page
+        yield page
+
+def list_items(project_id, per_page=100):
+    items = []
+    for nodes, _ in iter_item_pages(project_id, per_page=per_page):
+        items.extend(nodes)
+    return items
+
+def fetch_items(item_ids, client=None, batch_size=100):
+    """
+    Busca itens específicos pelo id (em lotes), na ordem recebida. Itens
+    removidos entre a listagem e a busca são ignorados.
+    """
+    client = client or shared_client()
+    items = []
+    for start in range(0, len(item_ids), batch_size):
+        nodes = client.gql(NODES_QUERY, {"ids": item_ids[start:start + batch_size]})["nodes"]
+        items.extend(node for node in nodes if node)
     return items
 
+def item_stamp(item):
+    """
+    Marca de versão do item: muda quando o item do projeto (valores de campos)
+    ou o conteúdo (issue, PR ou rascunho) é atualizado.
+    """
+    content = item.get("content") or {}
+    return f"{item.get('updatedAt') or ''}|{content.get('updatedAt') or ''}"
+
 def flatten_item(item, field_map):
     # base columns
     row = {
@@ -202,6 +400,10 @@ def flatten_item(item, field_map):
             row[key] = ""
     return row
 
+def _contains_any(series, words):
+    pattern = "|".join(re.escape(w) for w in words)
+    return series.fillna("").astype(str).str.lower().str.contains(pattern, regex=True)
+
 def simple_view_filter(df: pd.DataFrame, view_filter: str) -> pd.DataFrame:
     """
     Aplicador simples de filtro da view: suporta alguns termos básicos
@@ -211,40 +413,278 @@ def simple_view_filter(df: pd.DataFrame, view_filter: str) -> pd.DataFrame:
       - assignee -> 'assignees' contém o login
       - label/labels -> coluna 'labels'
     (Se a sua view tiver filtros avançados, exportaremos sem filtro)
+    As comparações são vetorizadas (operações de coluna do pandas, sem lambdas por linha).
     """
     if not view_filter:
         return df
     s = view_filter.lower()
 
+    mask = pd.Series(True, index=df.index)
     # status:
-    import re
     m = re.findall(r"status:([^ \n]+)", s)
     if m and "field:Status" in df.columns:
-        df = df[df["field:Status"].str.lower().fillna("").isin([x.lower() for x in m])]
+        mask &= df["field:Status"].fillna("").astype(str).str.lower().isin(m)
 
     # assignee:
     m = re.findall(r"(?:assignee|assignees):([^ \n]+)", s)
     if m:
-        want = [x.replace("@", "").lower() for x in m]
-        df = df[df["assignees"].fillna("").str.lower().apply(
-            lambda txt: any(w in txt for w in want)
-        )]
+        mask &= _contains_any(df["assignees"], [x.replace("@", "") for x in m])
 
     # label:
     m = re.findall(r"(?:label|labels):([^ \n]+)", s)
     if m:
-        want = [x.lower() for x in m]
-        df = df[df["labels"].fillna("").str.lower().apply(
-            lambda txt: any(w in txt for w in want)
-        )]
+        mask &= _contains_any(df["labels"], m)
+    return df[mask]
+
+# --- Gravação em streaming e checkpoint ---
+
+def items_frame(nodes, columns, number_columns, view_filter=None):
+    """
+    DataFrame (com as colunas fixas da exportação) dos itens, já filtrado pela view.
+    """
+    df = pd.DataFrame([flatten_item(it, None) for it in nodes], columns=columns)
+    df["number"] = pd.array(df["number"], dtype="Int64")
+    for column in number_columns:
+        df[column] = df[column].astype("float64")
+    if view_filter:
+        df = simple_view_filter(df, view_filter)
     return df
 
+def export_columns(project):
+    fields = [f for f in (project.get("fields") or {}).get("nodes", []) if f and f.get("name")]
+    return BASE_COLUMNS + [f"field:{f['name']}" for f in fields], \
+        {f"field:{f['name']}" for f in fields if f.get("dataType") == "NUMBER"}
+
+class CsvPageWriter:
+    """
+    Acrescenta cada página ao CSV. Ao retomar, descarta o que foi gravado
+    depois do último checkpoint (página incompleta).
+    """
+
+    def __init__(self, path, columns, position=None):
+        self.path = path
+        self.columns = columns
+        if position:
+            with open(path, "r+b") as f:
+                f.truncate(position["bytes"])
+            self.handle = open(path, "ab")
+        else:
+            self.handle = open(path, "wb")
+        self.header = not position
+
+    def write(self, df):
+        self.handle.write(df.to_csv(index=False, header=self.header, quoting=csv.QUOTE_ALL).encode("utf-8"))
+        self.handle.flush()
+        self.header = False
+
+    def position(self):
+        return {"bytes": self.handle.tell()}
+
+    def close(self):
+        if self.header:
+            # Nenhuma página gravada: mantém ao menos o cabeçalho
+            self.write(pd.DataFrame(columns=self.columns))
+        self.handle.close()
+
+class ParquetPageWriter:
+    """
+    Grava cada página como um arquivo parcial (retomável); ao final, junta as
+    partes em um único arquivo Parquet sem carregar tudo na memória.
+    """
+
+    def __init__(self, path, columns, number_columns, position=None):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            print("ERRO: exportação em Parquet requer o pacote 'pyarrow' (pip install pyarrow).")
+            sys.exit(1)
+        self.pa, self.pq = pa, pq
+        self.path = path
+        self.parts_dir = f"{path}.parts"
+        self.schema = pa.schema([(c, pa.int64() if c == "number" else pa.float64() if c in number_columns
+                                  else pa.string()) for c in columns])
+        if not position:
+            shutil.rmtree(self.parts_dir, ignore_errors=True)
+        os.makedirs(self.parts_dir, exist_ok=True)
+        self.parts = position["parts"] if position else 0
+
+    def _part(self, number):
+        return os.path.join(self.parts_dir, f"part-{number:06d}.parquet")
+
+    def write(self, df):
+        df = df.copy()
+        for column in self.schema.names:
+            if self.schema.field(column).type == self.pa.string():
+                df[column] = df[column].astype("string")
+        self.pq.write_table(self.pa.Table.from_pandas(df, schema=self.schema, preserve_index=False),
+                            self._part(self.parts))
+        self.parts += 1
+
+    def position(self):
+        return {"parts": self.parts}
+
+    def close(self):
+        tmp = f"{self.path}.tmp"
+        with self.pq.ParquetWriter(tmp, self.schema) as writer:
+            for number in range(self.parts):
+                writer.write_table(self.pq.read_table(self._part(number), schema=self.schema))
+        os.replace(tmp, self.path)
+        shutil.rmtree(self.parts_dir, ignore_errors=True)
+
+class StampLog:
+    """
+    Marcas de versão (id -> stamp) de cada página, acrescentadas a um JSONL ao
+    lado do checkpoint, que guarda só o tamanho já confirmado. Ao retomar,
+    descarta o que passou do checkpoint e relê as marcas das páginas gravadas.
+    """
+
+    def __init__(self, path, position=None):
+        self.path = path
+        self.stamps = {}
+        if position:
+            with open(path, "r+b") as f:
+                f.truncate(position)
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    self.stamps.update(json.loads(line))
+            self.handle = open(path, "ab")
+        else:
+            self.handle = open(path, "wb")
+
+    def append(self, page_stamps):
+        self.stamps.update(page_stamps)
+        self.handle.write((json.dumps(page_stamps) + "\n").encode("utf-8"))
+        self.handle.flush()
+
+    def position(self):
+        return self.handle.tell()
+
+    def close(self):
+        self.handle.close()
+        os.remove(self.path)
+
+def page_writer(fmt, path, columns, number_columns, position=None):
+    if fmt == "parquet":
+        return ParquetPageWriter(path, columns, number_columns, position)
+    return CsvPageWriter(path, columns, position)
+
+def read_export(path, fmt, columns, number_columns):
+    if fmt == "parquet":
+        return pd.read_parquet(path)
+    dtypes = {c: "Int64" if c == "number" else "float64" if c in number_columns else "string" for c in columns}
+    return pd.read_csv(path, dtype=dtypes)
+
+def load_state(path, expected, label):
+    """
+    Estado salvo (checkpoint ou manifesto) da mesma exportação (projeto, view, formato e colunas), ou None.
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if any(state.get(key) != value for key, value in expected.items()):
+        print(f"[INFO] {label} de outra exportação (projeto, view ou colunas diferentes); começando do zero.")
+        return None
+    return state
+
+def save_state(path, state):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+def export_items(project, view_filter, out_path, fmt="csv", restart=False, per_page=100):
+    """
+    Exporta os itens em streaming (página a página) e retorna (itens lidos, linhas gravadas).
+    Ao final grava o manifesto (id -> marca de versão) usado pela exportação incremental.
+    """
+    columns, number_columns = export_columns(project)
+    checkpoint_path = f"{out_path}.checkpoint.json"
+    expected = {"project_id": project["id"], "view_filter": view_filter, "format": fmt, "columns": columns}
+    state = None if restart else load_state(checkpoint_path, expected, "Checkpoint")
+    if state:
+        print(f"[INFO] Retomando exportação interrompida: {state['items']} itens já lidos.")
+    writer = page_writer(fmt, out_path, columns, number_columns, state["position"] if state else None)
+    # As marcas vão para um JSONL por página: o checkpoint não cresce com o projeto
+    stamp_log = StampLog(f"{out_path}.stamps.jsonl", state.get("stamps_bytes") if state else None)
+
+    items, rows = (state["items"], state["rows"]) if state else (0, 0)
+    started = time.time()
+    for nodes, cursor in iter_item_pages(project["id"], state["after"] if state else None, per_page):
+        df = items_frame(nodes, columns, number_columns, view_filter)
+        if len(df):
+            writer.write(df)
+        items += len(nodes)
+        rows += len(df)
+        stamp_log.append({it["id"]: item_stamp(it) for it in nodes})
+        save_state(checkpoint_path, {**expected, "after": cursor, "items": items, "rows": rows,
+                                     "position": writer.position(), "stamps_bytes": stamp_log.position()})
+        print(f"[INFO] {items} itens lidos, {rows} linhas gravadas ({items / max(time.time() - started, 1e-9):.0f} itens/s)")
+    writer.close()
+    save_state(f"{out_path}.manifest.json", {**expected, "rows": rows, "stamps": stamp_log.stamps})
+    stamp_log.close()
+    os.remove(checkpoint_path)
+    return items, rows
+
+def export_incremental(project, view_filter, out_path, fmt="csv", per_page=100):
+    """
+    Exportação incremental: lista apenas id e datas de atualização dos itens,
+    busca por completo só os novos ou alterados desde o manifesto da última
+    exportação e os mescla ao arquivo anterior, que é reescrito na ordem do
+    projeto. Sem manifesto compatível (ou com uma exportação completa
+    interrompida) faz a exportação completa. Retorna (itens, linhas gravadas).
+    """
+    columns, number_columns = export_columns(project)
+    manifest_path = f"{out_path}.manifest.json"
+    expected = {"project_id": project["id"], "view_filter": view_filter, "format": fmt, "columns": columns}
+    manifest = load_state(manifest_path, expected, "Manifesto") if os.path.exists(out_path) else None
+    if manifest is None or os.path.exists(f"{out_path}.checkpoint.json"):
+        print("[INFO] Sem manifesto utilizável da exportação anterior; exportação completa.")
+        return export_items(project, view_filter, out_path, fmt, per_page=per_page)
+
+    stamps = {}
+    for nodes, _ in iter_item_pages(project["id"], per_page=per_page, query=STAMPS_QUERY):
+        stamps.update((it["id"], item_stamp(it)) for it in nodes)
+    previous = manifest["stamps"]
+    changed = [item_id for item_id, stamp in stamps.items() if previous.get(item_id) != stamp]
+    removed = len(previous.keys() - stamps.keys())
+    print(f"[INFO] {len(stamps)} itens no projeto: {len(changed)} novos ou alterados, {removed} removidos.")
+    if not changed and not removed:
+        return len(stamps), manifest["rows"]
+
+    fetched = fetch_items(changed)
+    stamps.update((it["id"], item_stamp(it)) for it in fetched)
+    df = read_export(out_path, fmt, columns, number_columns)
+    df = df[df["project_item_id"].isin(stamps.keys() - set(changed))]
+    frames = [frame for frame in (df, items_frame(fetched, columns, number_columns, view_filter)) if len(frame)]
+    df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns)
+    position = pd.Series(range(len(stamps)), index=list(stamps))
+    df = df.iloc[position.reindex(df["project_item_id"]).to_numpy().argsort(kind="stable")]
+
+    tmp = f"{out_path}.new"
+    writer = page_writer(fmt, tmp, columns, number_columns)
+    if len(df):
+        writer.write(df)
+    writer.close()
+    os.replace(tmp, out_path)
+    save_state(manifest_path, {**expected, "rows": len(df), "stamps": stamps})
+    return len(stamps), len(df)
+
 def main():
+    parser = argparse.ArgumentParser(description="Exporta os itens de um GitHub Project (v2).")
+    parser.add_argument("--format", choices=("csv", "parquet"), default=EXPORT_FORMAT)
+    parser.add_argument("--output", help="Arquivo de saída (padrão: project_<número>_export.<formato>).")
+    parser.add_argument("--restart", action="store_true", help="Ignorar o checkpoint e exportar do zero.")
+    parser.add_argument("--incremental", action="store_true", default=EXPORT_INCREMENTAL,
+                        help="Buscar só os itens alterados desde a última exportação e mesclá-los ao arquivo.")
+    args = parser.parse_args()
+
     if not GITHUB_TOKEN:
         print("ERRO: GITHUB_TOKEN vazio no .env")
         sys.exit(1)
     pid = get_project(GITHUB_USER, PROJECT_NUMBER)
-    project_id = pid["id"]
     title = pid["title"]
     views = pid.get("views", {}).get("nodes", [])
     view_filter = None
@@ -259,21 +699,16 @@ def main():
     if view_filter:
         print(f"[INFO] Filtro da view: {view_filter}")
 
-    items = list_items(project_id)
-    # coletar mapa de campos (opcional)
-    field_map = {}  # não precisamos agora, mas deixo para extensões futuras
-    rows = [flatten_item(it, field_map) for it in items]
-    if not rows:
+    out_path = args.output or f"project_{PROJECT_NUMBER}_export.{args.format}"
+    if args.incremental and not args.restart:
+        items, rows = export_incremental(pid, view_filter, out_path, args.format)
+    else:
+        items, rows = export_items(pid, view_filter, out_path, args.format, args.restart)
+    if not items:
+        os.remove(out_path)
         print("[INFO] Nenhum item encontrado.")
         return
-
-    df = pd.DataFrame(rows)
-    if view_filter:
-        df = simple_view_filter(df, view_filter)
-
-    out_csv = f"project_{PROJECT_NUMBER}_export.csv"
-    df.to_csv(out_csv, index=False, quoting=csv.QUOTE_ALL)
-    print(f"[OK] Exportado: {out_csv}  ({len(df)} linhas)")
+    print(f"[OK] Exportado: {out_path}  ({rows} linhas)")
 
 if __name__ == "__main__":
     main()
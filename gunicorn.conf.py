@@ -0,0 +1,32 @@
+"""
+Configuração do gunicorn para a API em produção:
+
+    gunicorn -c gunicorn.conf.py
+
+O processo mestre prepara o banco, carrega o índice de exames (memory-map) e o
+modelo de embeddings uma única vez (`preload_app`); os workers herdam essa
+memória por copy-on-write e preparam os serviços de LLM ao iniciar (lifespan).
+"""
+import os
+
+import config
+
+bind = config.API_BIND
+workers = config.API_WORKERS
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = 120
+preload_app = True
+wsgi_app = "api:create_app(preload=True)"
+
+
+def post_fork(server, worker):
+    # Conexões do pool abertas no mestre não podem ser usadas por outro processo
+    from database import database_manager
+    database_manager.engine.dispose(close=False)
+
+
+def child_exit(server, worker):
+    # Métricas em modo multiprocesso (PROMETHEUS_MULTIPROC_DIR): descarta os gauges do worker encerrado
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
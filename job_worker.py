@@ -0,0 +1,230 @@
+"""
+Workers da fila de tarefas (`database/job_queue.py`).
+
+    python -m job_worker                        # JOB_WORKERS processos
+    python -m job_worker --workers 1 --interactive-only
+
+Cada processo roda um event loop com `JOB_CONCURRENCY` vagas: resumos (chamadas
+aos LLMs) rodam concorrentemente; reindexação e banco rodam em threads. As
+primeiras `JOB_RESERVED_SLOTS` vagas só aceitam tarefas interativas, para que
+um reprocessamento em massa (`summarize_backfill`) nunca ocupe o worker todo.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import socket
+import time
+
+import config
+from database.database_manager import SessionLocal
+from database.engine_profiles import configure_database
+from database.job_queue import (PRIORITY_BACKFILL, PRIORITY_INTERACTIVE, claim_job, complete_job, enqueue,
+                                ensure_job_table, fail_job, purge_finished_jobs, requeue_stale_jobs)
+
+HANDLERS = {}
+
+
+def handler(kind):
+    def register(function):
+        HANDLERS[kind] = function
+        return function
+    return register
+
+
+def call_db(function, *args, **kwargs):
+    """
+    Executa uma função de banco com uma sessão própria (para uso em threads).
+    """
+    db = SessionLocal()
+    try:
+        return function(db, *args, **kwargs)
+    finally:
+        db.close()
+
+
+# --- Tarefas ---
+
+@handler("reindex_exams")
+async def reindex_exams(worker, payload):
+    vector_manager = worker.vector_manager
+
+    def sync():
+        # Outro processo (ex.: a API em INDEX_SYNC_MODE=startup) pode ter salvo o índice
+        vector_manager.reload_if_changed(force=True)
+        vector_manager.index_medical_exams()
+        return vector_manager.status()
+    return await asyncio.to_thread(sync)
+
+
+@handler("summarize_patient")
+async def summarize_patient(worker, payload):
+    from database.async_session import AsyncSessionLocal
+    from database.models import Patient
+    from llm_services.history_summarizer import summarize_patient_history_async
+
+    service = payload.get("service", "gemini")
+    chat_service = worker.llm_router.for_provider(None if service == "auto" else service)
+    async with AsyncSessionLocal() as db:
+        patient = await db.get(Patient, payload["patient_id"])
+        if patient is None:
+            return {"patient_id": payload["patient_id"], "summary": None, "error": "Paciente não encontrado."}
+        summary, cached, provider = await summarize_patient_history_async(
+            db, patient, service, chat_service, force_refresh=payload.get("force_refresh", False))
+    return {"patient_id": patient.id, "patient_name": patient.name, "summary": summary, "cached": cached,
+            "llm_service_used": provider}
+
+
+@handler("summarize_backfill")
+async def summarize_backfill(worker, payload):
+    """
+    Agenda o resumo de todos os pacientes (prioridade de backfill); os que já
+    têm resumo atualizado em cache terminam sem chamar o LLM.
+    """
+    from database.patient_listing import iter_patients
+
+    service = payload.get("service", "gemini")
+
+    def schedule(db):
+        total = 0
+        for patient in iter_patients(db, payload.get("after")):
+            enqueue(db, "summarize_patient", {"patient_id": patient["id"], "service": service},
+                    priority=PRIORITY_BACKFILL, commit=False)
+            total += 1
+            if total % 1000 == 0:
+                db.commit()
+        db.commit()
+        return total
+    return {"scheduled": await asyncio.to_thread(call_db, schedule)}
+
+
+# --- Worker ---
+
+class JobWorker:
+    """
+    Um processo worker: reserva tarefas por prioridade e as executa, registrando
+    resultado ou falha (com nova tentativa após espera exponencial).
+    """
+
+    def __init__(self, name=None, concurrency=None, reserved_slots=None, interactive_only=False):
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.concurrency = concurrency or config.JOB_CONCURRENCY
+        self.reserved_slots = self.concurrency if interactive_only else min(
+            config.JOB_RESERVED_SLOTS if reserved_slots is None else reserved_slots, self.concurrency - 1)
+        self._vector_manager = None
+        self._llm_router = None
+        self._stopping = None
+
+    @property
+    def vector_manager(self):
+        if self._vector_manager is None:
+            from vector_store.exam_index import ExamIndex
+            self._vector_manager = ExamIndex()
+        return self._vector_manager
+
+    @property
+    def llm_router(self):
+        if self._llm_router is None:
+            from llm_services.async_chat import AsyncGeminiChatService, AsyncOpenAIChatService
+            from llm_services.router import AsyncLLMRouter
+            self._llm_router = AsyncLLMRouter({'gemini': AsyncGeminiChatService(), 'openai': AsyncOpenAIChatService()})
+        return self._llm_router
+
+    async def execute(self, job):
+        started = time.perf_counter()
+        try:
+            function = HANDLERS.get(job["kind"])
+            if function is None:
+                raise ValueError(f"Tipo de tarefa sem handler: '{job['kind']}'.")
+            result = await function(self, job["payload"])
+        except Exception as e:
+            print(f"[{self.name}] tarefa {job['id']} ({job['kind']}) falhou na tentativa {job['attempts']}: {e}")
+            await asyncio.to_thread(call_db, fail_job, job["id"], f"{type(e).__name__}: {e}")
+            return
+        await asyncio.to_thread(call_db, complete_job, job["id"], result)
+        print(f"[{self.name}] tarefa {job['id']} ({job['kind']}) concluída em {time.perf_counter() - started:.1f}s")
+
+    async def _slot(self, number):
+        # Vagas reservadas só pegam tarefas interativas; as demais pegam qualquer uma, por prioridade
+        max_priority = PRIORITY_INTERACTIVE if number < self.reserved_slots else None
+        while not self._stopping.is_set():
+            job = await asyncio.to_thread(call_db, claim_job, self.name, max_priority)
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), config.JOB_POLL_INTERVAL)
+                except TimeoutError:
+                    pass
+                continue
+            await self.execute(job)
+
+    async def _housekeeping(self):
+        while not self._stopping.is_set():
+            stale = await asyncio.to_thread(call_db, requeue_stale_jobs)
+            if stale:
+                print(f"[{self.name}] {stale} tarefas interrompidas voltaram para a fila.")
+            await asyncio.to_thread(call_db, purge_finished_jobs)
+            try:
+                await asyncio.wait_for(self._stopping.wait(), 60)
+            except TimeoutError:
+                pass
+
+    def stop(self):
+        self._stopping.set()
+
+    async def run(self):
+        """
+        Executa até receber SIGINT/SIGTERM; as tarefas em andamento terminam antes da saída.
+        """
+        from database.async_session import configure_async_database, dispose_async_database
+        from llm_services.async_chat import close_http_client
+
+        self._stopping = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, self.stop)
+
+        ensure_job_table(configure_database())
+        configure_async_database()
+        print(f"[{self.name}] worker iniciado ({self.concurrency} vagas, {self.reserved_slots} reservadas "
+              f"para tarefas interativas).")
+        try:
+            await asyncio.gather(self._housekeeping(), *(self._slot(number) for number in range(self.concurrency)))
+        finally:
+            await close_http_client()
+            await dispose_async_database()
+        print(f"[{self.name}] worker encerrado.")
+
+
+def run_worker(concurrency=None, interactive_only=False):
+    asyncio.run(JobWorker(concurrency=concurrency, interactive_only=interactive_only).run())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Workers da fila de tarefas (indexação e resumos).")
+    parser.add_argument("--workers", type=int, default=config.JOB_WORKERS, help="Número de processos.")
+    parser.add_argument("--concurrency", type=int, default=config.JOB_CONCURRENCY,
+                        help="Tarefas simultâneas por processo.")
+    parser.add_argument("--interactive-only", action="store_true",
+                        help="Atender apenas tarefas interativas (prioridade 0).")
+    args = parser.parse_args()
+
+    if args.workers <= 1:
+        run_worker(args.concurrency, args.interactive_only)
+        return
+    processes = [multiprocessing.Process(target=run_worker, args=(args.concurrency, args.interactive_only),
+                                         name=f"job-worker-{number}")
+                 for number in range(args.workers)]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        # Ctrl+C já chega aos filhos (mesmo grupo de processos); aguarda o encerramento
+        for process in processes:
+            process.join()
+
+
+if __name__ == "__main__":
+    main()
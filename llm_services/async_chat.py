@@ -0,0 +1,168 @@
+import asyncio
+import json
+
+import httpx
+
+import config
+from metrics import llm_call, record_llm_tokens
+
+SUMMARY_INSTRUCTIONS = (
+    "Você é um assistente médico. Resuma de forma objetiva e em português o histórico clínico "
+    "a seguir, destacando queixas, diagnósticos, resultados de exames relevantes e planos de tratamento."
+)
+
+GEMINI_API_URL = "https://generativelanguage.googleapis.com/v1beta/models"
+
+_http_client = None
+
+
+def get_http_client():
+    """
+    Cliente HTTP assíncrono compartilhado (pool de conexões) entre os provedores.
+    """
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=config.LLM_MAX_CONNECTIONS,
+                                max_keepalive_connections=config.LLM_MAX_CONNECTIONS),
+            timeout=httpx.Timeout(config.LLM_TIMEOUT, connect=10.0),
+        )
+    return _http_client
+
+
+async def close_http_client():
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+class AsyncChatService:
+    """
+    Base dos serviços assíncronos de sumarização.
+
+    Cada provedor tem um semáforo que limita as chamadas simultâneas e um
+    timeout por chamada; no streaming o timeout vale para a espera de cada
+    trecho, de modo que respostas longas não são interrompidas.
+    """
+    provider = ""
+
+    def __init__(self, max_concurrency, timeout=None):
+        self.timeout = timeout or config.LLM_TIMEOUT
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _complete(self, text):
+        raise NotImplementedError
+
+    def _stream(self, text):
+        raise NotImplementedError
+
+    async def summarize_text(self, text):
+        async with self._semaphore:
+            with llm_call(self.provider, "complete"):
+                return await asyncio.wait_for(self._complete(text), self.timeout)
+
+    async def stream_summary(self, text):
+        """
+        Gera o resumo em trechos, à medida que o provedor os envia.
+        """
+        async with self._semaphore:
+            chunks = self._stream(text)
+            try:
+                with llm_call(self.provider, "stream"):
+                    while True:
+                        try:
+                            chunk = await asyncio.wait_for(chunks.__anext__(), self.timeout)
+                        except StopAsyncIteration:
+                            return
+                        if chunk:
+                            yield chunk
+            finally:
+                await chunks.aclose()
+
+
+class AsyncGeminiChatService(AsyncChatService):
+    provider = "gemini"
+
+    def __init__(self, max_concurrency=None, timeout=None):
+        super().__init__(max_concurrency or config.GEMINI_MAX_CONCURRENCY, timeout)
+        self.model = config.GEMINI_MODEL
+
+    def _request(self, text):
+        return {
+            "system_instruction": {"parts": [{"text": SUMMARY_INSTRUCTIONS}]},
+            "contents": [{"role": "user", "parts": [{"text": text}]}],
+        }
+
+    @staticmethod
+    def _text_of(payload):
+        candidates = payload.get("candidates") or [{}]
+        parts = (candidates[0].get("content") or {}).get("parts") or []
+        return "".join(part.get("text", "") for part in parts)
+
+    def _record_usage(self, payload):
+        usage = payload.get("usageMetadata") or {}
+        record_llm_tokens(self.provider, usage.get("promptTokenCount"), usage.get("candidatesTokenCount"))
+
+    async def _complete(self, text):
+        response = await get_http_client().post(
+            f"{GEMINI_API_URL}/{self.model}:generateContent",
+            headers={"x-goog-api-key": config.GEMINI_API_KEY or ""},
+            json=self._request(text),
+        )
+        response.raise_for_status()
+        payload = response.json()
+        self._record_usage(payload)
+        return self._text_of(payload)
+
+    async def _stream(self, text):
+        async with get_http_client().stream(
+            "POST",
+            f"{GEMINI_API_URL}/{self.model}:streamGenerateContent",
+            params={"alt": "sse"},
+            headers={"x-goog-api-key": config.GEMINI_API_KEY or ""},
+            json=self._request(text),
+        ) as response:
+            response.raise_for_status()
+            last = {}
+            async for line in response.aiter_lines():
+                if line.startswith("data:"):
+                    last = json.loads(line[5:])
+                    yield self._text_of(last)
+            # A contagem de tokens é acumulada: vale a do último trecho
+            self._record_usage(last)
+
+
+class AsyncOpenAIChatService(AsyncChatService):
+    provider = "openai"
+
+    def __init__(self, max_concurrency=None, timeout=None):
+        super().__init__(max_concurrency or config.OPENAI_MAX_CONCURRENCY, timeout)
+        self.model = config.OPENAI_MODEL
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            from openai import AsyncOpenAI
+            self._client = AsyncOpenAI(api_key=config.OPENAI_API_KEY, http_client=get_http_client())
+        return self._client
+
+    def _messages(self, text):
+        return [{"role": "system", "content": SUMMARY_INSTRUCTIONS}, {"role": "user", "content": text}]
+
+    async def _complete(self, text):
+        response = await self.client.chat.completions.create(model=self.model, messages=self._messages(text))
+        if response.usage:
+            record_llm_tokens(self.provider, response.usage.prompt_tokens, response.usage.completion_tokens)
+        return response.choices[0].message.content or ""
+
+    async def _stream(self, text):
+        stream = await self.client.chat.completions.create(model=self.model, messages=self._messages(text), stream=True,
+                                                           stream_options={"include_usage": True})
+        async for chunk in stream:
+            if chunk.choices:
+                yield chunk.choices[0].delta.content or ""
+            if chunk.usage:
+                # Último trecho (sem choices) traz o uso de tokens
+                record_llm_tokens(self.provider, chunk.usage.prompt_tokens, chunk.usage.completion_tokens)
@@ -0,0 +1,245 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+from database.patient_history import (format_date, load_patient_timeline, render_appointment,
+                                      render_focused_history, render_patient_header, render_patient_history)
+from database.summary_cache import (find_cached_summary, find_chunk_summary, get_chunk_summaries,
+                                    get_or_create_summary, history_fingerprint, store_chunk_summaries,
+                                    store_summary)
+from metrics import stage
+
+
+def split_timeline(appointments, max_chars):
+    """
+    Divide a linha do tempo em trechos de consultas consecutivas, sem passar de
+    `max_chars` e sem misturar anos diferentes.
+
+    A divisão é gulosa a partir da consulta mais antiga: ao entrar uma consulta
+    nova, apenas o último trecho muda e os demais continuam no cache.
+    Retorna uma lista de (início, fim, texto).
+    """
+    chunks = []
+    current, size = [], 0
+    for appt in appointments:
+        block = render_appointment(appt)
+        year = appt.appointment_date.year if appt.appointment_date else None
+        if current and (size + len(block) > max_chars or year != current[-1][1]):
+            chunks.append(current)
+            current, size = [], 0
+        current.append((appt, year, block))
+        size += len(block)
+    if current:
+        chunks.append(current)
+
+    result = []
+    for chunk in chunks:
+        start, end = format_date(chunk[0][0].appointment_date), format_date(chunk[-1][0].appointment_date)
+        result.append((start, end, f"Período {start} a {end}:\n" + "".join(block for _, _, block in chunk)))
+    return result
+
+
+class ChunkedSummarizer:
+    """
+    Sumarização map-reduce de históricos longos.
+
+    Cada trecho da linha do tempo é resumido em paralelo (resumos parciais
+    ficam em cache pelo hash do texto) e os resumos parciais são então
+    combinados em um resumo final. Se os parciais ainda forem grandes demais,
+    são agrupados e resumidos novamente até caberem em um único prompt.
+    """
+
+    def __init__(self, chat_service, service_name, max_chars=None, workers=None):
+        self.chat_service = chat_service
+        self.service_name = service_name
+        self.max_chars = max_chars or config.SUMMARY_CHUNK_CHARS
+        self.workers = workers or config.SUMMARY_CHUNK_WORKERS
+
+    def _summarize_chunks(self, db, chunk_texts):
+        cached = get_chunk_summaries(db, self.service_name, chunk_texts)
+        pending = list(dict.fromkeys(text for text in chunk_texts if history_fingerprint(text) not in cached))
+        if pending:
+            print(f"Resumindo {len(pending)} de {len(chunk_texts)} trechos do histórico...")
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                fresh = dict(zip(pending, executor.map(self.chat_service.summarize_text, pending)))
+            store_chunk_summaries(db, self.service_name, fresh)
+            cached.update((history_fingerprint(text), summary) for text, summary in fresh.items())
+        return [cached[history_fingerprint(text)] for text in chunk_texts]
+
+    def _group(self, partials):
+        groups, current, size = [], [], 0
+        for start, end, summary in partials:
+            block = f"[{start} a {end}]\n{summary}\n"
+            if current and size + len(block) > self.max_chars:
+                groups.append(current)
+                current, size = [], 0
+            current.append((start, end, block))
+            size += len(block)
+        if current:
+            groups.append(current)
+        return groups
+
+    def _next_level(self, partials):
+        """
+        Agrupa resumos parciais que ainda não cabem em um prompt; retorna
+        (grupos, textos a resumir) ou None quando não há mais o que combinar.
+        """
+        if sum(len(summary) for _, _, summary in partials) <= self.max_chars or len(partials) <= 1:
+            return None
+        groups = self._group(partials)
+        if len(groups) == len(partials):
+            return None
+        return groups, ["Resumos parciais do histórico:\n" + "".join(block for _, _, block in group) for group in groups]
+
+    @staticmethod
+    def _reduce_text(patient, partials):
+        return (render_patient_header(patient) + "\nResumos parciais do histórico, por período:\n"
+                + "".join(f"\n[{start} a {end}]\n{summary}\n" for start, end, summary in partials))
+
+    def reduce_input(self, db, patient, appointments):
+        """
+        Executa a etapa "map" e retorna o texto compacto (cabeçalho + resumos
+        parciais por período) a ser resumido na etapa final.
+        """
+        chunks = split_timeline(appointments, self.max_chars)
+        summaries = self._summarize_chunks(db, [text for _, _, text in chunks])
+        partials = [(start, end, summary) for (start, end, _), summary in zip(chunks, summaries)]
+
+        while (level := self._next_level(partials)) is not None:
+            groups, texts = level
+            merged = self._summarize_chunks(db, texts)
+            partials = [(group[0][0], group[-1][1], summary) for group, summary in zip(groups, merged)]
+
+        return self._reduce_text(patient, partials)
+
+    def summarize(self, db, patient, appointments):
+        return self.chat_service.summarize_text(self.reduce_input(db, patient, appointments))
+
+
+def summarize_patient_history(db, patient, service_name, chat_service, force_refresh=False):
+    """
+    Resume o histórico do paciente usando o cache de resumos. Históricos maiores
+    que `SUMMARY_CHUNK_CHARS` passam pela sumarização map-reduce.
+    Retorna (resumo, veio_do_cache).
+    """
+    appointments = load_patient_timeline(db, patient.id)
+    history_text = render_patient_history(patient, appointments)
+    if len(history_text) <= config.SUMMARY_CHUNK_CHARS:
+        summarize = chat_service.summarize_text
+    else:
+        summarizer = ChunkedSummarizer(chat_service, service_name)
+        summarize = lambda _: summarizer.summarize(db, patient, appointments)
+    return get_or_create_summary(db, patient.id, service_name, history_text, summarize, force_refresh)
+
+
+class AsyncChunkedSummarizer(ChunkedSummarizer):
+    """
+    Versão assíncrona da sumarização map-reduce, para os serviços de
+    `async_chat`: os trechos são resumidos concorrentemente no event loop
+    (até `workers` por requisição) e o banco é acessado por uma `AsyncSession`.
+
+    Com o roteador cada trecho fica no cache sob o provedor que o resumiu, e
+    com `service_name="auto"` valem os trechos em cache de qualquer provedor.
+    """
+
+    async def _summarize_with_provider(self, text):
+        if hasattr(self.chat_service, "summarize_with_provider"):
+            return await self.chat_service.summarize_with_provider(text)
+        return self.service_name, await self.chat_service.summarize_text(text)
+
+    async def _summarize_chunks(self, db, chunk_texts):
+        cached = await db.run_sync(get_chunk_summaries, None if self.service_name == "auto" else self.service_name,
+                                   chunk_texts)
+        pending = list(dict.fromkeys(text for text in chunk_texts if history_fingerprint(text) not in cached))
+        if pending:
+            print(f"Resumindo {len(pending)} de {len(chunk_texts)} trechos do histórico...")
+            semaphore = asyncio.Semaphore(self.workers)
+
+            async def summarize(text):
+                async with semaphore:
+                    return await self._summarize_with_provider(text)
+
+            by_provider = {}
+            for text, (provider, summary) in zip(pending, await asyncio.gather(*(summarize(text) for text in pending))):
+                by_provider.setdefault(provider, {})[text] = summary
+            for provider, fresh in by_provider.items():
+                await db.run_sync(store_chunk_summaries, provider, fresh)
+                cached.update((history_fingerprint(text), summary) for text, summary in fresh.items())
+        return [cached[history_fingerprint(text)] for text in chunk_texts]
+
+    async def reduce_input(self, db, patient, appointments):
+        chunks = split_timeline(appointments, self.max_chars)
+        summaries = await self._summarize_chunks(db, [text for _, _, text in chunks])
+        partials = [(start, end, summary) for (start, end, _), summary in zip(chunks, summaries)]
+
+        while (level := self._next_level(partials)) is not None:
+            groups, texts = level
+            merged = await self._summarize_chunks(db, texts)
+            partials = [(group[0][0], group[-1][1], summary) for group, summary in zip(groups, merged)]
+
+        return self._reduce_text(patient, partials)
+
+    async def summarize(self, db, patient, appointments):
+        return await self.chat_service.summarize_text(await self.reduce_input(db, patient, appointments))
+
+
+async def summarize_patient_history_async(db, patient, service_name, chat_service, force_refresh=False):
+    """
+    Igual a `summarize_patient_history`, com uma `AsyncSession` e um serviço
+    assíncrono (em geral o roteador de LLM). Retorna (resumo, veio_do_cache,
+    provedor que gerou o resumo).
+
+    O resumo fica no cache sob o provedor que de fato respondeu (após um
+    failover, o outro provedor), não sob o pedido; com `service_name="auto"`
+    vale o resumo em cache de qualquer provedor.
+    """
+    with stage("summary.history"):
+        appointments = await db.run_sync(load_patient_timeline, patient.id)
+        history_text = render_patient_history(patient, appointments)
+    if not force_refresh:
+        with stage("summary.cache_lookup"):
+            found = await db.run_sync(find_cached_summary, patient.id, history_text,
+                                      None if service_name == "auto" else service_name)
+        if found is not None:
+            provider, summary = found
+            return summary, True, provider
+
+    with stage("summary.llm"):
+        if len(history_text) <= config.SUMMARY_CHUNK_CHARS:
+            summary = await chat_service.summarize_text(history_text)
+        else:
+            summary = await AsyncChunkedSummarizer(chat_service, service_name).summarize(db, patient, appointments)
+    provider = getattr(chat_service, "last_provider", None) or service_name
+    await db.run_sync(store_summary, patient.id, provider, history_text, summary)
+    return summary, False, provider
+
+
+async def summarize_patient_focus_async(db, patient, service_name, chat_service, topic, exam_ids,
+                                        force_refresh=False):
+    """
+    Resumo focado em um tema: envia ao LLM só a linha do tempo compacta e os
+    exames `exam_ids` (os mais relevantes para o tema, vindos da busca vetorial
+    restrita ao paciente), em vez do histórico completo.
+
+    O resultado fica no cache de resumos parciais, pelo hash do texto enviado e
+    pelo provedor que respondeu, para não substituir o resumo completo do
+    paciente; `force_refresh` substitui a entrada. Retorna (resumo,
+    veio_do_cache, provedor).
+    """
+    with stage("summary.history"):
+        appointments = await db.run_sync(load_patient_timeline, patient.id)
+        focus_text = render_focused_history(patient, topic, appointments, exam_ids,
+                                            config.SUMMARY_FOCUS_TIMELINE_MAX)
+    if not force_refresh:
+        with stage("summary.cache_lookup"):
+            found = await db.run_sync(find_chunk_summary, focus_text,
+                                      None if service_name == "auto" else service_name)
+        if found is not None:
+            provider, summary = found
+            return summary, True, provider
+
+    with stage("summary.llm"):
+        summary = await chat_service.summarize_text(focus_text)
+    provider = getattr(chat_service, "last_provider", None) or service_name
+    await db.run_sync(store_chunk_summaries, provider, {focus_text: summary})
+    return summary, False, provider
@@ -0,0 +1,218 @@
+import asyncio
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+import config
+
+
+class NoProviderAvailable(RuntimeError):
+    pass
+
+
+class ProviderState:
+    """
+    Latências recentes, contadores e estado do circuit breaker de um provedor.
+    """
+
+    def __init__(self, window=200):
+        self.latencies = deque(maxlen=window)
+        self.requests = 0
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.failovers = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.open_until = 0.0
+        self.trial_in_flight = False
+
+    def percentile(self, q):
+        return float(np.percentile(self.latencies, q)) if self.latencies else None
+
+    def circuit(self, now):
+        if self.consecutive_failures < config.LLM_CIRCUIT_FAILURES:
+            return "closed"
+        return "open" if now < self.open_until else "half_open"
+
+
+class LLMRouter:
+    """
+    Estado e política do roteador entre os serviços de sumarização (Gemini e
+    OpenAI); o roteamento das chamadas fica em `AsyncLLMRouter`.
+
+    - Failover: se o provedor escolhido falhar, tenta o próximo.
+    - Hedging (opcional): se o primeiro não responder dentro do seu p95 de
+      latência, dispara o segundo e usa a resposta que chegar primeiro.
+    - Circuit breaker: após `LLM_CIRCUIT_FAILURES` falhas seguidas o provedor
+      fica fora por `LLM_CIRCUIT_COOLDOWN` segundos; depois recebe uma chamada
+      de teste antes de voltar ao normal.
+    """
+
+    def __init__(self, services, hedge=None):
+        self.services = services
+        self.hedge = config.LLM_HEDGE_ENABLED if hedge is None else hedge
+        self._states = {name: ProviderState() for name in services}
+        self._lock = threading.Lock()
+
+    # --- Estado dos provedores ---
+
+    def _candidates(self, preferred=None):
+        now = time.monotonic()
+        with self._lock:
+            available = []
+            for name, state in self._states.items():
+                circuit = state.circuit(now)
+                if circuit == "open" or (circuit == "half_open" and state.trial_in_flight):
+                    continue
+                available.append(name)
+            # Preferido primeiro; os demais pelo p50 de latência (sem histórico = último)
+            available.sort(key=lambda name: (name != preferred, self._states[name].percentile(50) or float("inf")))
+            return available
+
+    def _begin(self, name):
+        with self._lock:
+            state = self._states[name]
+            state.requests += 1
+            if state.circuit(time.monotonic()) == "half_open":
+                state.trial_in_flight = True
+
+    def _record(self, name, elapsed, ok):
+        with self._lock:
+            state = self._states[name]
+            state.trial_in_flight = False
+            if ok:
+                state.successes += 1
+                state.consecutive_failures = 0
+                state.latencies.append(elapsed)
+            else:
+                state.failures += 1
+                state.consecutive_failures += 1
+                if state.consecutive_failures >= config.LLM_CIRCUIT_FAILURES:
+                    state.open_until = time.monotonic() + config.LLM_CIRCUIT_COOLDOWN
+
+    def _hedge_delay(self, name):
+        with self._lock:
+            state = self._states[name]
+            p95 = state.percentile(95) if len(state.latencies) >= 20 else None
+        return max(config.LLM_HEDGE_MIN_DELAY, p95 if p95 is not None else config.LLM_HEDGE_DEFAULT_DELAY)
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            result = {}
+            for name, state in self._states.items():
+                p50, p95 = state.percentile(50), state.percentile(95)
+                result[name] = {
+                    "circuit": state.circuit(now),
+                    "requests": state.requests,
+                    "successes": state.successes,
+                    "failures": state.failures,
+                    "failovers_to": state.failovers,
+                    "hedges_launched": state.hedges,
+                    "hedge_wins": state.hedge_wins,
+                    "latency_p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+                    "latency_p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+                }
+            return {"hedging": self.hedge, "providers": result}
+
+
+class AsyncLLMRouter(LLMRouter):
+    """
+    Roteia as chamadas aos serviços assíncronos com a política do `LLMRouter`:
+    as chamadas são aguardadas no event loop, sem threads, e a chamada que
+    perde o hedge é cancelada.
+    """
+
+    async def _acall(self, name, text):
+        self._begin(name)
+        started = time.monotonic()
+        try:
+            result = await self.services[name].summarize_text(text)
+        except asyncio.CancelledError:
+            with self._lock:
+                self._states[name].trial_in_flight = False
+            raise
+        except Exception:
+            self._record(name, time.monotonic() - started, ok=False)
+            raise
+        self._record(name, time.monotonic() - started, ok=True)
+        return result
+
+    async def route(self, text, preferred=None):
+        """
+        Resume `text` e retorna (provedor_que_respondeu, resumo).
+        """
+        order = self._candidates(preferred)
+        if not order:
+            raise NoProviderAvailable("Nenhum provedor de LLM disponível (circuit breaker aberto).")
+
+        pending = {asyncio.ensure_future(self._acall(order[0], text)): order[0]}
+        next_index = 1
+        hedge_delay = self._hedge_delay(order[0]) if self.hedge and len(order) > 1 else None
+        errors = []
+        try:
+            while pending:
+                timeout = hedge_delay if next_index == 1 and hedge_delay is not None else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # O primeiro passou do seu p95: dispara o próximo em paralelo
+                    name = order[next_index]
+                    next_index += 1
+                    with self._lock:
+                        self._states[name].hedges += 1
+                    pending[asyncio.ensure_future(self._acall(name, text))] = name
+                    continue
+                for future in done:
+                    name = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        errors.append(f"{name}: {e}")
+                        if not pending and next_index < len(order):
+                            fallback = order[next_index]
+                            next_index += 1
+                            with self._lock:
+                                self._states[fallback].failovers += 1
+                            print(f"[LLM] Falha em '{name}'; usando '{fallback}'.")
+                            pending[asyncio.ensure_future(self._acall(fallback, text))] = fallback
+                        continue
+                    if name != order[0] and len(errors) == 0:
+                        with self._lock:
+                            self._states[name].hedge_wins += 1
+                    return name, result
+        finally:
+            for future in pending:
+                future.cancel()
+        raise RuntimeError("Todos os provedores de LLM falharam: " + "; ".join(errors))
+
+    def for_provider(self, preferred=None):
+        """
+        Serviço com a interface `summarize_text` que passa pelo roteador.
+        """
+        return AsyncRoutedChatService(self, preferred)
+
+
+class AsyncRoutedChatService:
+    """
+    Adaptador por requisição: guarda qual provedor respondeu a última chamada.
+    Em chamadas concorrentes (trechos do map-reduce) use `summarize_with_provider`,
+    que retorna o provedor de cada chamada.
+    """
+
+    def __init__(self, router, preferred=None):
+        self.router = router
+        self.preferred = preferred
+        self.last_provider = None
+
+    async def summarize_with_provider(self, text):
+        """
+        Retorna (provedor_que_respondeu, resumo).
+        """
+        self.last_provider, summary = await self.router.route(text, self.preferred)
+        return self.last_provider, summary
+
+    async def summarize_text(self, text):
+        return (await self.summarize_with_provider(text))[1]
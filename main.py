@@ -1,6 +1,9 @@
-from database.database_manager import engine, Base, SessionLocal
+from database.database_manager import Base, SessionLocal
+from database.engine_profiles import configure_database
 from database.models import Patient, Doctor, Appointment, MedicalExam, User # <-- Adicionado User
-from vector_store.vector_manager import VectorManager
+from database.patient_search import ensure_patient_search, find_patient
+from llm_services.history_summarizer import summarize_patient_history
+from vector_store.exam_index import ExamIndex
 from llm_services.gemini_service import GeminiChatService
 from llm_services.openai_service import OpenAIChatService
 import datetime
@@ -100,16 +103,13 @@ def main_cli(vector_manager, gemini_chat_service, openai_chat_service):
             patient_name = input("Digite o nome do paciente para gerar o resumo: ")
             db = SessionLocal()
             try:
-                patient = db.query(Patient).filter(Patient.name.ilike(f"%{patient_name}%")).first()
+                patient = find_patient(db, patient_name)
                 if patient:
-                    history_text = f"Histórico do Paciente: {patient.name} (Nasc: {patient.date_of_birth.strftime('%Y-%m-%d')})\n"
-                    appointments = db.query(Appointment).filter_by(patient_id=patient.id).all()
-                    for appt in appointments:
-                        history_text += f"\n  Consulta em {appt.appointment_date.strftime('%Y-%m-%d')} com Dr. {appt.doctor.name}: {appt.description}\n"
-                        for exam in appt.exams:
-                            history_text += f"    - Exame: {exam.exam_type}\n      Resultados: {exam.results}\n      Plano: {exam.treatment_plan}\n"
-                    print(f"\nGerando resumo para {patient.name} usando {'Gemini' if current_chat_service == gemini_chat_service else 'OpenAI'}...\")
-                    summary = current_chat_service.summarize_text(history_text)
+                    print(f"\nGerando resumo para {patient.name} usando {'Gemini' if current_chat_service == gemini_chat_service else 'OpenAI'}...")
+                    service_name = 'gemini' if current_chat_service == gemini_chat_service else 'openai'
+                    summary, cached = summarize_patient_history(db, patient, service_name, current_chat_service)
+                    if cached:
+                        print("(Resumo reaproveitado: o histórico não mudou desde a última geração.)")
                     print("\n--- Resumo do Histórico ---")
                     print(summary)
                 else:
@@ -146,12 +146,14 @@ def main_cli(vector_manager, gemini_chat_service, openai_chat_service):
 
 if __name__ == "__main__":
     print("Iniciando o Sistema de Gerenciamento Hospitalar com IA...")
+    engine = configure_database()
     create_database_tables()
     populate_database_with_sample_data()
     create_initial_user() # <-- Chamada para criar o usuário adm
+    ensure_patient_search(engine)
 
     print("\n--- Inicializando Módulos de IA ---")
-    vector_manager = VectorManager()
+    vector_manager = ExamIndex()
     vector_manager.index_medical_exams()
     gemini_chat_service = GeminiChatService()
     openai_chat_service = OpenAIChatService()
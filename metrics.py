@@ -0,0 +1,215 @@
+"""
+Instrumentação da API no formato do Prometheus (exposta em GET /metrics).
+
+- `api_request_duration_seconds`: duração de cada requisição por rota (até o último byte).
+- `api_stage_duration_seconds`: etapas internas (`stage("search.faiss")`, ...).
+- `api_db_queries_per_request`: comandos SQL executados por requisição.
+- `llm_request_duration_seconds` e `llm_tokens_total`: latência e tokens por provedor.
+- `cache_hits_total`, `cache_misses_total`, `cache_entries`: caches registrados.
+
+Com o gunicorn (vários workers), defina `PROMETHEUS_MULTIPROC_DIR` para que
+o /metrics agregue os contadores de todos os processos.
+Opcionalmente, `PROFILE_SLOW_REQUESTS_MS` grava um perfil cProfile das
+requisições mais lentas que o limite em `PROFILE_DIR`.
+"""
+import asyncio
+import contextvars
+import cProfile
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+import config
+
+REQUEST_LATENCY = Histogram(
+    "api_request_duration_seconds", "Duração das requisições HTTP, até o último byte da resposta.",
+    ["method", "route", "status"])
+STAGE_LATENCY = Histogram(
+    "api_stage_duration_seconds", "Duração das etapas internas da busca e da sumarização.", ["stage"])
+DB_QUERIES = Histogram(
+    "api_db_queries_per_request", "Comandos SQL executados por requisição.", ["route"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 200))
+LLM_LATENCY = Histogram(
+    "llm_request_duration_seconds", "Duração das chamadas aos provedores de LLM.", ["provider", "mode", "outcome"],
+    buckets=(0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120))
+LLM_TOKENS = Counter("llm_tokens", "Tokens consumidos nos provedores de LLM.", ["provider", "kind"])
+
+# Contador de comandos SQL da requisição atual (lista mutável, compartilhada com as threads)
+_request_queries = contextvars.ContextVar("request_queries", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    counter = _request_queries.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+@contextmanager
+def stage(name):
+    """
+    Mede uma etapa interna: `with stage("search.encode"): ...`
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_LATENCY.labels(name).observe(time.perf_counter() - started)
+
+
+@contextmanager
+def llm_call(provider, mode):
+    """
+    Mede uma chamada a um provedor de LLM, com o desfecho (ok, timeout, cancelled, error).
+    """
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    except TimeoutError:
+        outcome = "timeout"
+        raise
+    except (asyncio.CancelledError, GeneratorExit):
+        # Perdedor de uma chamada duplicada (hedge) ou cliente que desconectou
+        outcome = "cancelled"
+        raise
+    finally:
+        LLM_LATENCY.labels(provider, mode, outcome).observe(time.perf_counter() - started)
+
+
+def record_llm_tokens(provider, prompt_tokens, completion_tokens):
+    if prompt_tokens:
+        LLM_TOKENS.labels(provider, "prompt").inc(prompt_tokens)
+    if completion_tokens:
+        LLM_TOKENS.labels(provider, "completion").inc(completion_tokens)
+
+
+class CacheCollector:
+    """
+    Exporta os contadores de `TTLCache.stats()` das fontes registradas; cada
+    fonte é uma função que retorna {nome do cache: stats}.
+    """
+
+    def __init__(self):
+        self.sources = {}
+
+    def collect(self):
+        hits = CounterMetricFamily("cache_hits", "Acertos de cache.", labels=["cache"])
+        misses = CounterMetricFamily("cache_misses", "Erros de cache.", labels=["cache"])
+        entries = GaugeMetricFamily("cache_entries", "Entradas em cache.", labels=["cache"])
+        hit_ratio = GaugeMetricFamily("cache_hit_ratio", "Taxa de acertos desde o início do processo.",
+                                      labels=["cache"])
+        for source in list(self.sources.values()):
+            for name, stats in source().items():
+                hits.add_metric([name], stats["hits"])
+                misses.add_metric([name], stats["misses"])
+                entries.add_metric([name], stats["size"])
+                hit_ratio.add_metric([name], stats["hit_rate"])
+        yield from (hits, misses, entries, hit_ratio)
+
+
+caches = CacheCollector()
+REGISTRY.register(caches)
+
+
+def register_cache_source(name, source):
+    caches.sources[name] = source
+
+
+def render():
+    """
+    Retorna (corpo, content-type) das métricas no formato texto do Prometheus.
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        # Caches são por processo: vale o worker que respondeu
+        registry.register(caches)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def route_label(scope):
+    """
+    Modelo da rota (`/api/patients`), não o caminho da requisição, para não criar
+    uma série por URL; requisições sem rota correspondente ficam em "unmatched".
+    """
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI: mede cada requisição HTTP (inclusive respostas em streaming)
+    e conta os comandos SQL executados durante ela.
+
+    Com `PROFILE_SLOW_REQUESTS_MS` > 0, uma requisição por vez é perfilada com
+    cProfile e o perfil é gravado em `PROFILE_DIR` se ela passar do limite.
+    O perfil cobre a thread do event loop (o trabalho no pool de busca aparece
+    em `api_stage_duration_seconds`) e pode incluir outras requisições
+    intercaladas no mesmo loop.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._profile_lock = threading.Lock()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        queries = [0]
+        token = _request_queries.set(queries)
+        profiler = self._start_profiler()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            _request_queries.reset(token)
+            route = route_label(scope)
+            REQUEST_LATENCY.labels(scope["method"], route, str(status[0])).observe(elapsed)
+            DB_QUERIES.labels(route).observe(queries[0])
+            if profiler is not None:
+                self._finish_profiler(profiler, scope["method"], route, elapsed)
+
+    def _start_profiler(self):
+        if config.PROFILE_SLOW_REQUESTS_MS <= 0 or not self._profile_lock.acquire(blocking=False):
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Outro profiler já ativo no processo (ex.: python -m cProfile)
+            self._profile_lock.release()
+            return None
+        return profiler
+
+    def _finish_profiler(self, profiler, method, route, elapsed):
+        profiler.disable()
+        self._profile_lock.release()
+        elapsed_ms = elapsed * 1000
+        if elapsed_ms < config.PROFILE_SLOW_REQUESTS_MS:
+            return
+        os.makedirs(config.PROFILE_DIR, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root"
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{method}-{slug}-{elapsed_ms:.0f}ms.prof"
+        profiler.dump_stats(os.path.join(config.PROFILE_DIR, name))
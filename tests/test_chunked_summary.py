@@ -0,0 +1,77 @@
+"""
+Sumarização map-reduce pelo roteador: cada trecho fica no cache sob o provedor
+que o resumiu, e `service=auto` reaproveita os trechos de qualquer provedor.
+"""
+import asyncio
+import datetime
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+import config
+from benchmarks.fakes import FakeChatService
+from database.async_session import build_async_engine
+from database.database_manager import Base
+from database.models import Appointment, Doctor, MedicalExam, Patient
+from database.summary_cache import ChunkSummary, PatientSummary
+from llm_services.history_summarizer import summarize_patient_history_async
+from llm_services.router import AsyncLLMRouter
+
+
+class DownChatService(FakeChatService):
+    async def _complete(self, text):
+        raise RuntimeError("fora do ar")
+
+
+def add_patient(db):
+    doctor = Doctor(name="Ana", specialty="Cardiologia")
+    patient = Patient(name="Paciente Longo", date_of_birth=datetime.datetime(1970, 1, 1))
+    db.add_all([doctor, patient])
+    db.flush()
+    for i in range(24):
+        appointment = Appointment(patient_id=patient.id, doctor_id=doctor.id, description="retorno de rotina " * 5,
+                                  appointment_date=datetime.datetime(2018, 1, 1) + datetime.timedelta(days=90 * i))
+        db.add(appointment)
+        db.flush()
+        db.add(MedicalExam(appointment_id=appointment.id, exam_type="PA",
+                           results=f"pressão arterial medida {i} " * 5, treatment_plan="manter"))
+    db.commit()
+    return patient.id
+
+
+def stored_services(db):
+    return ({service for (service,) in db.query(ChunkSummary.llm_service)},
+            {service for (service,) in db.query(PatientSummary.llm_service)})
+
+
+def test_chunks_are_cached_under_answering_provider(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "SUMMARY_CHUNK_CHARS", 1500)
+    monkeypatch.setattr(config, "LLM_HEDGE_ENABLED", False)
+    openai = FakeChatService()
+    router = AsyncLLMRouter({"gemini": DownChatService(), "openai": openai})
+
+    async def main():
+        engine = build_async_engine(f"sqlite:///{tmp_path / 'chunks.db'}")
+        sessions = async_sessionmaker(engine, expire_on_commit=False)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with sessions() as db:
+            patient_id = await db.run_sync(add_patient)
+        results = []
+        for service_name, force_refresh in (("gemini", False), ("auto", True)):
+            async with sessions() as db:
+                patient = await db.get(Patient, patient_id)
+                chat_service = router.for_provider(None if service_name == "auto" else service_name)
+                calls = openai.calls
+                summary, cached, provider = await summarize_patient_history_async(
+                    db, patient, service_name, chat_service, force_refresh=force_refresh)
+                results.append((cached, provider, openai.calls - calls, await db.run_sync(stored_services)))
+        await engine.dispose()
+        return results
+
+    (cached, provider, calls, services), (auto_cached, auto_provider, auto_calls, auto_services) = asyncio.run(main())
+    assert (cached, provider) == (False, "openai")
+    assert calls > 2
+    assert services == ({"openai"}, {"openai"})
+    # Os trechos já resumidos pelo OpenAI são reaproveitados: só a etapa final vai ao LLM
+    assert (auto_cached, auto_provider, auto_calls) == (False, "openai", 1)
+    assert auto_services == ({"openai"}, {"openai"})
@@ -0,0 +1,113 @@
+"""
+Índice de exames: sincronização com remoções e buscas filtradas em cada tipo de índice.
+
+Os exames ficam em uma lista em memória (sem banco) e os embeddings vêm do
+modelo falso dos benchmarks.
+"""
+import datetime
+from collections import namedtuple
+
+import numpy as np
+import pytest
+
+import config
+from benchmarks.fakes import FakeEmbeddingModel
+from vector_store.exam_index import ExamIndex, build_exam_text
+
+ExamRow = namedtuple("ExamRow", "id results treatment_plan exam_type patient_id doctor_id specialty appointment_date")
+
+WORDS = "dor cabeça joelho febre tosse cansaço coração pressão glicemia sangue".split()
+
+
+def make_rows(count=600, patients=5):
+    rng = np.random.default_rng(7)
+    return [ExamRow(exam_id, " ".join(rng.choice(WORDS, 5)), "repouso", "ECG", exam_id % patients + 1, 1,
+                    "Cardiologia", datetime.datetime(2024, 1, 1) + datetime.timedelta(days=exam_id))
+            for exam_id in range(1, count + 1)]
+
+
+class MemoryExamIndex(ExamIndex):
+    """
+    ExamIndex que lê os exames de uma lista em vez do banco.
+    """
+
+    def __init__(self, rows, index_path, **kwargs):
+        super().__init__(index_path=index_path, manifest_path=f"{index_path}.manifest.npz",
+                         model=FakeEmbeddingModel(dim=32), **kwargs)
+        self.rows = rows
+
+    def _iter_exam_chunks(self, chunk_size):
+        for start in range(0, len(self.rows), chunk_size):
+            yield self.rows[start:start + chunk_size]
+
+    def _training_sample(self):
+        return self._encode_documents([build_exam_text(row.results, row.treatment_plan) for row in self.rows])
+
+    def _load_texts(self, exam_ids):
+        wanted = set(exam_ids)
+        return {row.id: build_exam_text(row.results, row.treatment_plan) for row in self.rows if row.id in wanted}
+
+
+@pytest.fixture(autouse=True)
+def small_index_settings(monkeypatch):
+    monkeypatch.setattr(config, "FAISS_NLIST", 8)
+    monkeypatch.setattr(config, "FAISS_PQ_M", 4)
+    monkeypatch.setattr(config, "INDEX_RELOAD_INTERVAL", 0)
+
+
+def brute_force(exam_index, rows, query, patient_id, k):
+    candidates = [row for row in rows if row.patient_id == patient_id]
+    vectors = exam_index._encode([build_exam_text(row.results, row.treatment_plan) for row in candidates])
+    scores = vectors @ exam_index._encode([query])[0]
+    return np.sort(scores)[::-1][:k]
+
+
+@pytest.mark.parametrize("index_type", ["flat", "ivf_flat", "ivf_pq", "hnsw"])
+@pytest.mark.parametrize("exact_max", [20000, 0])
+def test_filtered_search_after_deletion(tmp_path, monkeypatch, index_type, exact_max):
+    monkeypatch.setattr(config, "FILTER_EXACT_MAX", exact_max)
+    rows = make_rows()
+    index_path = str(tmp_path / "exams.index")
+    exam_index = MemoryExamIndex(rows, index_path=index_path, index_type=index_type)
+    exam_index.index_medical_exams()
+    assert exam_index.search_similar_exams("dor febre", 5, filters={"patient_id": 2})
+
+    # Remoções deixam os ids fora de sequência
+    rows[:] = [row for row in rows if row.id not in (2, 7, 300)]
+    exam_index.index_medical_exams()
+
+    for current in (exam_index, MemoryExamIndex(rows, index_path=index_path, index_type=index_type)):
+        results = current.search_similar_exams("dor febre", 5, nprobe=64, filters={"patient_id": 2})
+        found = [result["exam_id"] for result in results]
+        assert len(found) == 5
+        assert {2, 7, 300}.isdisjoint(found)
+        assert all(exam_id % 5 + 1 == 2 for exam_id in found)
+        if index_type != "ivf_pq":
+            scores = [result["score"] for result in results]
+            assert np.allclose(scores, brute_force(current, rows, "dor febre", 2, 5), atol=1e-5)
+
+
+def test_manifest_without_metadata_is_rebuilt(tmp_path):
+    rows = make_rows()
+    index_path = str(tmp_path / "exams.index")
+    exam_index = MemoryExamIndex(rows, index_path)
+    exam_index.index_medical_exams()
+    expected = exam_index.search_similar_exams("dor febre", 5, filters={"patient_id": 3})
+
+    # Manifesto no formato anterior aos filtros: só modelo, tipo, ids e hashes
+    manifest_path = f"{index_path}.manifest.npz"
+    with np.load(manifest_path) as manifest:
+        old = {key: manifest[key] for key in manifest.files if not key.startswith("meta_")}
+    with open(manifest_path, "wb") as f:
+        np.savez(f, **old)
+    removed = expected[0]["exam_id"]
+    rows[:] = [row for row in rows if row.id != removed]
+
+    loaded = MemoryExamIndex(rows, index_path)
+    found = [result["exam_id"] for result in loaded.search_similar_exams("dor febre", 5, filters={"patient_id": 3})]
+    assert len(found) == 5
+    assert removed not in found
+    assert all(exam_id % 5 + 1 == 3 for exam_id in found)
+    assert len(loaded._meta) == len(loaded._ids)
+    with np.load(manifest_path) as manifest:
+        assert "meta_patient_ids" in manifest.files
@@ -0,0 +1,101 @@
+"""
+Resumo focado em um tema: cache por provedor e `refresh` sobre um tema já em cache.
+
+Usa um banco SQLite temporário (sessão assíncrona, como a API) e o serviço de
+LLM falso dos benchmarks atrás do roteador.
+"""
+import asyncio
+import datetime
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+import config
+from benchmarks.fakes import FakeChatService
+from database.async_session import build_async_engine
+from database.database_manager import Base
+from database.models import Appointment, Doctor, MedicalExam, Patient
+from llm_services.history_summarizer import summarize_patient_focus_async
+from llm_services.router import AsyncLLMRouter
+
+
+class CountingChatService(FakeChatService):
+    """
+    Cada chamada gera um resumo diferente, para distinguir um resumo novo do salvo.
+    """
+
+    def _answer(self, text):
+        return f"{super()._answer(text)} #{self.calls}"
+
+
+class DownChatService(FakeChatService):
+    async def _complete(self, text):
+        raise RuntimeError("fora do ar")
+
+
+def add_patient(db):
+    doctor = Doctor(name="Ana", specialty="Endocrinologia")
+    patient = Patient(name="Paciente Teste", date_of_birth=datetime.datetime(1980, 1, 1))
+    db.add_all([doctor, patient])
+    db.flush()
+    exam_ids = []
+    for i in range(3):
+        appointment = Appointment(patient_id=patient.id, doctor_id=doctor.id, description="retorno",
+                                  appointment_date=datetime.datetime(2024, 1, 1) + datetime.timedelta(days=30 * i))
+        db.add(appointment)
+        db.flush()
+        exam = MedicalExam(appointment_id=appointment.id, exam_type="Glicemia",
+                           results=f"glicemia de jejum {100 + i}", treatment_plan="metformina")
+        db.add(exam)
+        db.flush()
+        exam_ids.append(exam.id)
+    db.commit()
+    return patient.id, exam_ids
+
+
+def run_focus(tmp_path, services, requests):
+    """
+    Executa `requests` [(serviço, force_refresh)] em sessões novas e retorna
+    [(resumo, veio_do_cache, provedor, nome_do_paciente)].
+    """
+    async def main():
+        engine = build_async_engine(f"sqlite:///{tmp_path / 'focus.db'}")
+        sessions = async_sessionmaker(engine, expire_on_commit=False)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with sessions() as db:
+            patient_id, exam_ids = await db.run_sync(add_patient)
+        router = AsyncLLMRouter(services)
+        results = []
+        for service_name, force_refresh in requests:
+            async with sessions() as db:
+                patient = await db.get(Patient, patient_id)
+                chat_service = router.for_provider(None if service_name == "auto" else service_name)
+                summary, cached, provider = await summarize_patient_focus_async(
+                    db, patient, service_name, chat_service, "glicemia", exam_ids, force_refresh=force_refresh)
+                results.append((summary, cached, provider, patient.name))
+        await engine.dispose()
+        return results
+    return asyncio.run(main())
+
+
+def test_refresh_replaces_cached_topic(tmp_path):
+    gemini = CountingChatService()
+    results = run_focus(tmp_path, {"gemini": gemini, "openai": CountingChatService()},
+                        [("gemini", False), ("gemini", False), ("gemini", True), ("gemini", False)])
+    first, again, refreshed, after = results
+    assert not first[1] and again[1] and not refreshed[1] and after[1]
+    assert again[0] == first[0]
+    assert refreshed[0] != first[0]
+    assert after[0] == refreshed[0]
+    assert refreshed[3] == "Paciente Teste"
+    assert gemini.calls == 2
+
+
+def test_failover_summary_is_cached_under_provider(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "LLM_HEDGE_ENABLED", False)
+    openai = CountingChatService()
+    results = run_focus(tmp_path, {"gemini": DownChatService(), "openai": openai},
+                        [("gemini", False), ("openai", False), ("auto", False)])
+    assert [(cached, provider) for _, cached, provider, _ in results] == [
+        (False, "openai"), (True, "openai"), (True, "openai")]
+    assert openai.calls == 1
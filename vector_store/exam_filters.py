@@ -0,0 +1,132 @@
+import datetime
+
+import numpy as np
+
+FILTER_KEYS = ("patient_id", "doctor_id", "specialty", "exam_type", "date_from", "date_to")
+
+MISSING_ID = -1
+NO_DATE = np.iinfo(np.int64).min
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+
+def normalize_label(value):
+    return (value or "").strip().lower()
+
+
+def to_timestamp(value):
+    """
+    Converte uma data/datahora em segundos desde 1970 (sem fuso), como nas colunas de metadados.
+    """
+    if value is None:
+        return NO_DATE
+    if not isinstance(value, datetime.datetime):
+        value = datetime.datetime.combine(value, datetime.time())
+    return int((value.replace(tzinfo=None) - _EPOCH).total_seconds())
+
+
+class ExamMetadata:
+    """
+    Colunas de metadados dos exames, alinhadas posição a posição com os ids do índice.
+
+    Especialidade e tipo de exame são guardados como códigos inteiros com um
+    vocabulário à parte, para que os filtros sejam comparações vetorizadas.
+    """
+
+    ARRAYS = ("patient_ids", "doctor_ids", "specialties", "exam_types", "dates")
+
+    def __init__(self, patient_ids, doctor_ids, specialties, exam_types, dates, specialty_vocab, exam_type_vocab):
+        self.patient_ids = patient_ids
+        self.doctor_ids = doctor_ids
+        self.specialties = specialties
+        self.exam_types = exam_types
+        self.dates = dates
+        self.specialty_vocab = list(specialty_vocab)
+        self.exam_type_vocab = list(exam_type_vocab)
+
+    @classmethod
+    def empty(cls):
+        ints = np.empty(0, dtype=np.int64)
+        codes = np.empty(0, dtype=np.int32)
+        return cls(ints, ints, codes, codes, ints, [], [])
+
+    @classmethod
+    def from_manifest(cls, manifest):
+        if "meta_patient_ids" not in manifest.files:
+            return None
+        return cls(*(manifest[f"meta_{name}"] for name in cls.ARRAYS),
+                   manifest["meta_specialty_vocab"].tolist(), manifest["meta_exam_type_vocab"].tolist())
+
+    def to_manifest(self):
+        arrays = {f"meta_{name}": getattr(self, name) for name in self.ARRAYS}
+        arrays["meta_specialty_vocab"] = np.array(self.specialty_vocab, dtype=str)
+        arrays["meta_exam_type_vocab"] = np.array(self.exam_type_vocab, dtype=str)
+        return arrays
+
+    def __len__(self):
+        return len(self.patient_ids)
+
+    def __eq__(self, other):
+        if not isinstance(other, ExamMetadata):
+            return NotImplemented
+        return (self.specialty_vocab == other.specialty_vocab and self.exam_type_vocab == other.exam_type_vocab
+                and all(np.array_equal(getattr(self, name), getattr(other, name)) for name in self.ARRAYS))
+
+    def mask(self, filters):
+        """
+        Máscara booleana das posições que satisfazem todos os filtros.
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if filters.get("patient_id") is not None:
+            mask &= self.patient_ids == int(filters["patient_id"])
+        if filters.get("doctor_id") is not None:
+            mask &= self.doctor_ids == int(filters["doctor_id"])
+        for key, column, vocab in (("specialty", self.specialties, self.specialty_vocab),
+                                   ("exam_type", self.exam_types, self.exam_type_vocab)):
+            if filters.get(key) is not None:
+                label = normalize_label(filters[key])
+                if label not in vocab:
+                    return np.zeros(len(self), dtype=bool)
+                mask &= column == vocab.index(label)
+        if filters.get("date_from") is not None:
+            mask &= self.dates >= to_timestamp(filters["date_from"])
+        if filters.get("date_to") is not None:
+            date_to = filters["date_to"]
+            if isinstance(date_to, datetime.datetime):
+                mask &= self.dates <= to_timestamp(date_to)
+            else:
+                # Datas sem hora incluem o dia inteiro
+                mask &= self.dates < to_timestamp(date_to + datetime.timedelta(days=1))
+            mask &= self.dates != NO_DATE
+        return mask
+
+
+class ExamMetadataBuilder:
+    """
+    Acumula os metadados bloco a bloco durante a sincronização do índice.
+    """
+
+    def __init__(self):
+        self._vocabs = {"specialty": {}, "exam_type": {}}
+        self._parts = {name: [] for name in ExamMetadata.ARRAYS}
+
+    def _code(self, vocab, value):
+        return self._vocabs[vocab].setdefault(normalize_label(value), len(self._vocabs[vocab]))
+
+    def add(self, rows):
+        count = len(rows)
+        self._parts["patient_ids"].append(np.fromiter(
+            (MISSING_ID if row.patient_id is None else row.patient_id for row in rows), dtype=np.int64, count=count))
+        self._parts["doctor_ids"].append(np.fromiter(
+            (MISSING_ID if row.doctor_id is None else row.doctor_id for row in rows), dtype=np.int64, count=count))
+        self._parts["specialties"].append(np.fromiter(
+            (self._code("specialty", row.specialty) for row in rows), dtype=np.int32, count=count))
+        self._parts["exam_types"].append(np.fromiter(
+            (self._code("exam_type", row.exam_type) for row in rows), dtype=np.int32, count=count))
+        self._parts["dates"].append(np.fromiter(
+            (to_timestamp(row.appointment_date) for row in rows), dtype=np.int64, count=count))
+
+    def build(self):
+        if not self._parts["patient_ids"]:
+            return ExamMetadata.empty()
+        arrays = [np.concatenate(self._parts[name]) for name in ExamMetadata.ARRAYS]
+        return ExamMetadata(*arrays, self._vocabs["specialty"].keys(), self._vocabs["exam_type"].keys())
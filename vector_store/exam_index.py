@@ -0,0 +1,569 @@
+import hashlib
+import os
+import time
+
+import faiss
+import numpy as np
+from sqlalchemy import func, select
+
+import config
+from database.database_manager import SessionLocal
+from database.models import Appointment, Doctor, MedicalExam
+from metrics import stage
+from ttl_cache import TTLCache
+from vector_store.exam_filters import FILTER_KEYS, MISSING_ID, NO_DATE, ExamMetadata, ExamMetadataBuilder
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+
+
+def build_exam_text(results, treatment_plan):
+    """
+    Monta o texto indexado de um exame (resultados + plano de tratamento).
+    """
+    return f"Resultados: {results or ''}\nPlano de tratamento: {treatment_plan or ''}"
+
+
+def normalize_query(query):
+    """
+    Normaliza a consulta para uso como chave de cache (caixa e espaços).
+    """
+    return " ".join(query.lower().split())
+
+
+def content_digest(text):
+    """
+    Hash de 64 bits do texto de um exame, usado para detectar alterações.
+    """
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little", signed=True)
+
+
+def base_index(index):
+    """
+    Índice FAISS propriamente dito (flat, HNSW ou IVF), sem o mapeamento de ids.
+    """
+    if isinstance(index, faiss.IndexIDMap2):
+        return faiss.downcast_index(index.index)
+    return faiss.downcast_index(index)
+
+
+def with_direct_map(index):
+    """
+    Índices IVF guardam os ids dos exames nas próprias listas (sem IndexIDMap2,
+    cuja remoção renumera posições que o IVF não renumera) e usam o mapa
+    direto id -> posição em tabela hash, que aceita ids não sequenciais e
+    remoções, para reconstruir vetores na busca exata filtrada. Configurado ao
+    criar ou carregar o índice, nunca durante uma busca.
+    """
+    if isinstance(index, faiss.IndexIVF) and index.direct_map.type != faiss.DirectMap.Hashtable:
+        index.set_direct_map_type(faiss.DirectMap.Hashtable)
+    return index
+
+
+class ExamIndex:
+    """
+    Índice vetorial persistente dos exames médicos.
+
+    O índice FAISS fica salvo em `config.FAISS_INDEX_PATH` e um manifesto
+    (id do exame -> hash do conteúdo) em `config.FAISS_MANIFEST_PATH`. Na
+    inicialização o índice salvo é carregado via memory-map e apenas os exames
+    novos, alterados ou removidos desde a última execução são reprocessados.
+
+    O tipo do índice (`config.FAISS_INDEX_TYPE`) pode ser exato (flat) ou
+    aproximado (IVF-Flat, IVF-PQ, HNSW); os aproximados são treinados em uma
+    amostra dos exames e aceitam `nprobe`/`ef_search` por consulta.
+
+    Embeddings de consultas e resultados de busca ficam em caches LRU com TTL;
+    o cache de resultados é invalidado sempre que o índice é atualizado.
+
+    Paciente, médico, especialidade, tipo e data de cada exame ficam em arrays
+    alinhados com os ids do índice (`ExamMetadata`), permitindo buscas
+    filtradas sem buscar resultados a mais para filtrar depois.
+    """
+
+    def __init__(self, index_path=None, manifest_path=None, model_name=None, batch_size=None, index_type=None,
+                 model=None):
+        self.index_path = index_path or config.FAISS_INDEX_PATH
+        self.manifest_path = manifest_path or config.FAISS_MANIFEST_PATH
+        self.model_name = model_name or config.EMBEDDING_MODEL
+        self.batch_size = batch_size or config.EMBEDDING_BATCH_SIZE
+        self.index_type = index_type or config.FAISS_INDEX_TYPE
+        if self.index_type not in INDEX_TYPES:
+            raise ValueError(f"Tipo de índice FAISS inválido: '{self.index_type}'. Use um de {INDEX_TYPES}.")
+        # Modelo já carregado (ex.: o modelo falso dos benchmarks); senão é carregado no primeiro uso
+        self._model = model
+        self._index = None
+        self._mmapped = False
+        self._ids = np.empty(0, dtype=np.int64)
+        self._digests = np.empty(0, dtype=np.int64)
+        self._meta = ExamMetadata.empty()
+        # Marca (mtime) do manifesto carregado, para notar atualizações feitas por outros processos
+        self._manifest_stamp = None
+        self._checked_at = time.monotonic()
+        self._embedding_cache = TTLCache(config.QUERY_CACHE_SIZE, config.QUERY_CACHE_TTL)
+        self._result_cache = TTLCache(config.QUERY_CACHE_SIZE, config.QUERY_CACHE_TTL)
+
+    # --- Modelo de embeddings ---
+
+    @property
+    def model(self):
+        if self._model is None:
+            from sentence_transformers import SentenceTransformer
+            print(f"Carregando modelo de embeddings '{self.model_name}'...")
+            self._model = SentenceTransformer(self.model_name)
+        return self._model
+
+    def _encode(self, texts):
+        vectors = self.model.encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+        return np.ascontiguousarray(vectors, dtype=np.float32)
+
+    def _encode_query(self, query):
+        key = normalize_query(query)
+        vector = self._embedding_cache.get(key)
+        if vector is None:
+            vector = self._encode([key])
+            self._embedding_cache.set(key, vector)
+        return vector
+
+    def _training_sample(self):
+        """
+        Codifica uma amostra aleatória dos exames para treinar índices IVF.
+        """
+        db = SessionLocal()
+        try:
+            rows = db.execute(select(MedicalExam.results, MedicalExam.treatment_plan)
+                              .order_by(func.random())
+                              .limit(config.FAISS_TRAIN_SAMPLE)).all()
+        finally:
+            db.close()
+        print(f"Treinando índice '{self.index_type}' com {len(rows)} exames de amostra...")
+        return self._encode_documents([build_exam_text(results, plan) for results, plan in rows])
+
+    def _new_index(self):
+        """
+        Cria um índice vazio do tipo configurado (treinado, quando o tipo exige).
+        """
+        dim = self.model.get_sentence_embedding_dimension()
+        if self.index_type == "flat":
+            base = faiss.IndexFlatIP(dim)
+        elif self.index_type == "hnsw":
+            base = faiss.IndexHNSWFlat(dim, config.FAISS_HNSW_M, faiss.METRIC_INNER_PRODUCT)
+            base.hnsw.efConstruction = config.FAISS_HNSW_EF_CONSTRUCTION
+        else:
+            sample = self._training_sample()
+            # O k-means do FAISS pede ao menos ~39 pontos por lista
+            nlist = max(1, min(config.FAISS_NLIST, len(sample) // 39))
+            quantizer = faiss.IndexFlatIP(dim)
+            # PQ de 8 bits precisa de ao menos 256 pontos de treino; abaixo disso usa IVF-Flat
+            if self.index_type == "ivf_pq" and len(sample) >= 256:
+                if dim % config.FAISS_PQ_M:
+                    raise ValueError(f"FAISS_PQ_M ({config.FAISS_PQ_M}) precisa dividir a dimensão do embedding ({dim}).")
+                base = faiss.IndexIVFPQ(quantizer, dim, nlist, config.FAISS_PQ_M, 8, faiss.METRIC_INNER_PRODUCT)
+            else:
+                base = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+            base.train(sample)
+            return with_direct_map(base)
+        return faiss.IndexIDMap2(base)
+
+    def _supports_removal(self):
+        # O HNSW do FAISS não remove vetores; alterações exigem reconstrução
+        return self.index_type != "hnsw"
+
+    # --- Persistência ---
+
+    def _read_saved(self):
+        """
+        Lê o índice (memory-map) e o manifesto salvos. Retorna (marca do manifesto,
+        índice, ids, hashes, metadados), ou None se não existirem, forem de outro
+        modelo/tipo ou estiverem inconsistentes.
+        """
+        if not (os.path.exists(self.index_path) and os.path.exists(self.manifest_path)):
+            return None
+        stamp = os.stat(self.manifest_path).st_mtime_ns
+        with np.load(self.manifest_path) as manifest:
+            if str(manifest["model"]) != self.model_name:
+                print("Modelo de embeddings alterado; o índice será reconstruído.")
+                return None
+            stored_type = str(manifest["index_type"]) if "index_type" in manifest.files else "flat"
+            if stored_type != self.index_type:
+                print(f"Tipo de índice alterado ({stored_type} -> {self.index_type}); o índice será reconstruído.")
+                return None
+            ids = manifest["ids"]
+            digests = manifest["digests"]
+            # Manifestos antigos não têm metadados; são recriados ao carregar (_rebuild_metadata)
+            meta = ExamMetadata.from_manifest(manifest) or ExamMetadata.empty()
+        index = faiss.read_index(self.index_path, faiss.IO_FLAG_MMAP)
+        if index.ntotal != len(ids):
+            print("Índice e manifesto inconsistentes; o índice será reconstruído.")
+            return None
+        if isinstance(index, faiss.IndexIDMap2) and isinstance(base_index(index), faiss.IndexIVF):
+            # Formato antigo: após remoções os ids do IDMap2 não correspondem mais às listas do IVF
+            print("Índice IVF em formato antigo; o índice será reconstruído.")
+            return None
+        index = with_direct_map(index)
+        return stamp, index, ids, digests, meta
+
+    def _load(self):
+        """
+        Carrega o índice e o manifesto salvos (se existirem e forem do mesmo modelo).
+        """
+        if self._index is not None:
+            return
+        saved = self._read_saved()
+        if saved is not None:
+            self._manifest_stamp, index, ids, digests, meta = saved
+            self._index, self._mmapped = index, True
+            self._ids, self._digests, self._meta = ids, digests, meta
+            if len(meta) != len(ids):
+                self._rebuild_metadata()
+
+    def reload_if_changed(self, force=False):
+        """
+        Recarrega o índice salvo se outro processo (ex.: um worker da fila de
+        tarefas) o atualizou. Verifica o arquivo no máximo a cada
+        `INDEX_RELOAD_INTERVAL` segundos, a menos que `force` seja verdadeiro.
+        """
+        now = time.monotonic()
+        if not force and (not config.INDEX_RELOAD_INTERVAL or now - self._checked_at < config.INDEX_RELOAD_INTERVAL):
+            return False
+        self._checked_at = now
+        try:
+            stamp = os.stat(self.manifest_path).st_mtime_ns
+        except OSError:
+            return False
+        if self._index is None or stamp == self._manifest_stamp:
+            return False
+        saved = self._read_saved()
+        if saved is None:
+            return False
+        self._manifest_stamp, index, ids, digests, meta = saved
+        self._index, self._mmapped, self._ids, self._digests, self._meta = index, True, ids, digests, meta
+        if len(meta) != len(ids):
+            self._rebuild_metadata()
+        self._result_cache.clear()
+        print("Índice de exames recarregado (atualizado por outro processo).")
+        return True
+
+    def _rebuild_metadata(self):
+        """
+        Recria os metadados de um manifesto salvo sem eles (ou com tamanho
+        diferente dos ids), alinhados aos ids do índice, lendo os exames do banco
+        sem recodificar nada. Exames que já saíram do banco ficam sem paciente,
+        médico e data, e não entram em buscas filtradas até a próxima sincronização.
+        """
+        print("Manifesto do índice sem metadados de filtro; recriando a partir do banco...")
+        builder = ExamMetadataBuilder()
+        found_ids = []
+        for rows in self._iter_exam_chunks(config.INDEX_CHUNK_SIZE):
+            chunk_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+            keep = np.isin(chunk_ids, self._ids)
+            builder.add([row for row, wanted in zip(rows, keep) if wanted])
+            found_ids.append(chunk_ids[keep])
+        found_ids = np.concatenate(found_ids) if found_ids else np.empty(0, dtype=np.int64)
+        meta = builder.build()
+
+        order = np.argsort(found_ids, kind="stable")
+        pos = np.minimum(np.searchsorted(found_ids[order], self._ids), max(len(found_ids) - 1, 0))
+        present = found_ids[order][pos] == self._ids if len(found_ids) else np.zeros(len(self._ids), dtype=bool)
+        take = order[pos[present]]
+        columns = []
+        for name in ExamMetadata.ARRAYS:
+            source = getattr(meta, name)
+            column = np.full(len(self._ids), NO_DATE if name == "dates" else MISSING_ID, dtype=source.dtype)
+            column[present] = source[take]
+            columns.append(column)
+        self._meta = ExamMetadata(*columns, meta.specialty_vocab, meta.exam_type_vocab)
+        self._save_manifest()
+
+    def _writable_index(self, from_scratch=False):
+        """
+        Retorna uma cópia do índice em memória que pode ser alterada; o índice
+        em uso continua atendendo buscas até a troca ao fim da sincronização.
+        """
+        if self._index is None or from_scratch:
+            return self._new_index()
+        if self._mmapped:
+            return with_direct_map(faiss.read_index(self.index_path))
+        return with_direct_map(faiss.clone_index(self._index))
+
+    def _save_manifest(self):
+        # Escrita atômica: vários workers podem ler o arquivo enquanto ele é atualizado
+        tmp_manifest = f"{self.manifest_path}.tmp"
+        with open(tmp_manifest, "wb") as f:
+            np.savez(f, model=np.array(self.model_name), index_type=np.array(self.index_type),
+                     ids=self._ids, digests=self._digests, **self._meta.to_manifest())
+        os.replace(tmp_manifest, self.manifest_path)
+        self._manifest_stamp = os.stat(self.manifest_path).st_mtime_ns
+
+    def _save(self):
+        tmp_index = f"{self.index_path}.tmp"
+        faiss.write_index(self._index, tmp_index)
+        os.replace(tmp_index, self.index_path)
+        self._save_manifest()
+
+    # --- Indexação ---
+
+    def _iter_exam_chunks(self, chunk_size):
+        """
+        Percorre a tabela de exames com cursor do lado do servidor, em blocos de `chunk_size`.
+        """
+        db = SessionLocal()
+        try:
+            stmt = (select(MedicalExam.id, MedicalExam.results, MedicalExam.treatment_plan,
+                           MedicalExam.exam_type, Appointment.patient_id, Appointment.doctor_id,
+                           Doctor.specialty, Appointment.appointment_date)
+                    .outerjoin(Appointment, MedicalExam.appointment_id == Appointment.id)
+                    .outerjoin(Doctor, Appointment.doctor_id == Doctor.id)
+                    .order_by(MedicalExam.id)
+                    .execution_options(yield_per=chunk_size))
+            for rows in db.execute(stmt).partitions():
+                yield rows
+        finally:
+            db.close()
+
+    def _encode_documents(self, texts, pool=None):
+        if pool is not None:
+            vectors = self.model.encode_multi_process(texts, pool, batch_size=self.batch_size)
+        else:
+            vectors = self.model.encode(texts, batch_size=self.batch_size, convert_to_numpy=True)
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        faiss.normalize_L2(vectors)
+        return vectors
+
+    def index_medical_exams(self, workers=None, chunk_size=None):
+        """
+        Sincroniza o índice com a tabela de exames, reprocessando apenas o que mudou.
+
+        Os exames são lidos em blocos; em cada bloco os textos pendentes são
+        ordenados por tamanho (lotes com menos padding), codificados pelo modelo
+        (ou por um pool de processos quando `workers` > 1) e os vetores float32
+        são adicionados diretamente ao índice. A memória fica limitada ao bloco.
+        """
+        self._load()
+        self._sync(workers or config.EMBEDDING_WORKERS, chunk_size or config.INDEX_CHUNK_SIZE)
+
+    def _sync(self, workers, chunk_size, from_scratch=False):
+        if from_scratch:
+            known_ids = known_digests = np.empty(0, dtype=np.int64)
+        else:
+            order = np.argsort(self._ids, kind="stable")
+            known_ids, known_digests = self._ids[order], self._digests[order]
+        seen = np.zeros(len(known_ids), dtype=bool)
+        all_ids, all_digests = [], []
+        metadata = ExamMetadataBuilder()
+        index = None
+        pool = None
+        indexed = 0
+        rebuild = False
+        started = time.perf_counter()
+        try:
+            for rows in self._iter_exam_chunks(chunk_size):
+                ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+                texts = [build_exam_text(row[1], row[2]) for row in rows]
+                digests = np.fromiter((content_digest(text) for text in texts), dtype=np.int64, count=len(rows))
+                all_ids.append(ids)
+                all_digests.append(digests)
+                metadata.add(rows)
+
+                if len(known_ids):
+                    pos = np.minimum(np.searchsorted(known_ids, ids), len(known_ids) - 1)
+                    found = known_ids[pos] == ids
+                    seen[pos[found]] = True
+                    changed = ~found | (known_digests[pos] != digests)
+                else:
+                    found = np.zeros(len(ids), dtype=bool)
+                    changed = np.ones(len(ids), dtype=bool)
+                if not changed.any():
+                    continue
+
+                replaced = ids[changed & found]
+                if len(replaced) and not self._supports_removal():
+                    rebuild = True
+                    break
+                if index is None:
+                    index = self._writable_index(from_scratch)
+                if len(replaced):
+                    index.remove_ids(replaced)
+
+                pending = np.flatnonzero(changed)
+                pending = pending[np.argsort([len(texts[i]) for i in pending], kind="stable")]
+                if workers > 1 and pool is None:
+                    pool = self.model.start_multi_process_pool(["cpu"] * workers)
+                index.add_with_ids(self._encode_documents([texts[i] for i in pending], pool), ids[pending])
+                indexed += len(pending)
+        finally:
+            if pool is not None:
+                self.model.stop_multi_process_pool(pool)
+
+        deleted = known_ids[~seen]
+        if rebuild or (len(deleted) and not self._supports_removal()):
+            print(f"O índice '{self.index_type}' não aceita remoções; reconstruindo do zero...")
+            return self._sync(workers, chunk_size, from_scratch=True)
+
+        if len(deleted):
+            if index is None:
+                index = self._writable_index()
+            index.remove_ids(deleted)
+
+        new_ids = np.concatenate(all_ids) if all_ids else np.empty(0, dtype=np.int64)
+        new_digests = np.concatenate(all_digests) if all_digests else np.empty(0, dtype=np.int64)
+        new_meta = metadata.build()
+        if index is None and from_scratch:
+            index = self._writable_index(from_scratch)
+        if index is None:
+            if np.array_equal(new_ids, self._ids) and new_meta == self._meta:
+                print(f"Índice de exames atualizado ({len(known_ids)} exames, nada a reprocessar).")
+                return
+            # Só os metadados (paciente, médico, data...) mudaram: o índice vetorial continua válido
+            self._ids, self._digests, self._meta = new_ids, new_digests, new_meta
+            self._save_manifest()
+            self._result_cache.clear()
+            print("Metadados do índice de exames atualizados.")
+            return
+
+        # Troca em uma única atribuição: buscas concorrentes veem o índice antigo ou o novo
+        self._index, self._mmapped, self._ids, self._digests, self._meta = (
+            index, False, new_ids, new_digests, new_meta)
+        self._save()
+        self._result_cache.clear()
+        elapsed = time.perf_counter() - started
+        rate = indexed / elapsed if elapsed else 0.0
+        print(f"Índice de exames sincronizado: {indexed} indexados, {len(deleted)} removidos "
+              f"({rate:.0f} exames/s).")
+
+    # --- Busca ---
+
+    def _load_texts(self, exam_ids):
+        db = SessionLocal()
+        try:
+            rows = (db.query(MedicalExam.id, MedicalExam.results, MedicalExam.treatment_plan)
+                    .filter(MedicalExam.id.in_(exam_ids)).all())
+        finally:
+            db.close()
+        return {exam_id: build_exam_text(results, plan) for exam_id, results, plan in rows}
+
+    def _search_params(self, nprobe=None, ef_search=None, selector=None):
+        """
+        Parâmetros de busca por consulta: `nprobe`/`ef_search` dos índices
+        aproximados e, opcionalmente, um seletor de ids (busca filtrada).
+        """
+        base = base_index(self._index)
+        if isinstance(base, faiss.IndexIVF):
+            return faiss.SearchParametersIVF(sel=selector, nprobe=nprobe or config.FAISS_NPROBE)
+        if isinstance(base, faiss.IndexHNSW):
+            return faiss.SearchParametersHNSW(sel=selector, efSearch=ef_search or config.FAISS_EF_SEARCH)
+        if selector is not None:
+            return faiss.SearchParameters(sel=selector)
+        return None
+
+    def search_vectors(self, vectors, k, nprobe=None, ef_search=None, allowed_ids=None):
+        """
+        Busca direta no índice a partir de vetores já codificados; retorna (scores, ids).
+
+        Com `allowed_ids`, só esses exames são considerados: conjuntos pequenos
+        (filtros muito seletivos) são comparados de forma exata com os vetores
+        reconstruídos; os demais usam um seletor de ids do FAISS.
+        """
+        self._load()
+        if self._index is None or self._index.ntotal == 0:
+            return (np.empty((len(vectors), 0), dtype=np.float32), np.empty((len(vectors), 0), dtype=np.int64))
+        if allowed_ids is None:
+            return self._index.search(vectors, k, params=self._search_params(nprobe, ef_search))
+        if len(allowed_ids) <= config.FILTER_EXACT_MAX:
+            return self._exact_search(vectors, allowed_ids, k)
+        selector = faiss.IDSelectorBatch(allowed_ids)
+        return self._index.search(vectors, k, params=self._search_params(nprobe, ef_search, selector))
+
+    def _exact_search(self, vectors, candidate_ids, k):
+        candidates = self._index.reconstruct_batch(candidate_ids)
+        similarities = vectors @ candidates.T
+        top = min(k, len(candidate_ids))
+        best = np.argpartition(-similarities, top - 1, axis=1)[:, :top]
+        order = np.take_along_axis(similarities, best, axis=1).argsort(axis=1)[:, ::-1]
+        best = np.take_along_axis(best, order, axis=1)
+
+        scores = np.full((len(vectors), k), -np.inf, dtype=np.float32)
+        ids = np.full((len(vectors), k), -1, dtype=np.int64)
+        scores[:, :top] = np.take_along_axis(similarities, best, axis=1)
+        ids[:, :top] = candidate_ids[best]
+        return scores, ids
+
+    def search_similar_exams(self, query, k=5, nprobe=None, ef_search=None, filters=None):
+        """
+        Retorna os `k` exames mais similares à consulta em texto livre.
+
+        `nprobe` (IVF) e `ef_search` (HNSW) ajustam o compromisso entre recall e
+        latência apenas para esta consulta. `filters` restringe a busca por
+        `patient_id`, `doctor_id`, `specialty`, `exam_type`, `date_from` e `date_to`.
+        """
+        return self.search_similar_exams_batch([query], k, nprobe, ef_search, filters)[0]
+
+    def search_similar_exams_batch(self, queries, k=5, nprobe=None, ef_search=None, filters=None):
+        """
+        Busca várias consultas de uma vez: as que não estão em cache são
+        codificadas em uma única chamada ao modelo e pesquisadas em uma única
+        busca matricial no FAISS. Retorna uma lista de resultados por consulta.
+        """
+        filters = {key: value for key, value in (filters or {}).items() if value is not None}
+        unknown = set(filters) - set(FILTER_KEYS)
+        if unknown:
+            raise ValueError(f"Filtros desconhecidos: {', '.join(sorted(unknown))}.")
+
+        self._load()
+        self.reload_if_changed()
+        if self._index is None or self._index.ntotal == 0:
+            return [[] for _ in queries]
+
+        allowed_ids = None
+        if filters:
+            with stage("search.filter"):
+                allowed_ids = self._ids[self._meta.mask(filters)]
+            if not len(allowed_ids):
+                return [[] for _ in queries]
+
+        options = (k, nprobe, ef_search, tuple(sorted(filters.items())))
+        keys = [normalize_query(query) for query in queries]
+        results = [self._result_cache.get((key, options)) for key in keys]
+        missing = list(dict.fromkeys(key for key, cached in zip(keys, results) if cached is None))
+        if missing:
+            vectors = [self._embedding_cache.get(key) for key in missing]
+            to_encode = [key for key, vector in zip(missing, vectors) if vector is None]
+            if to_encode:
+                with stage("search.encode"):
+                    encoded = dict(zip(to_encode, self._encode(to_encode)))
+                for key, vector in encoded.items():
+                    self._embedding_cache.set(key, vector[None, :])
+                vectors = [vector if vector is not None else encoded[key][None, :]
+                           for key, vector in zip(missing, vectors)]
+            with stage("search.faiss"):
+                scores, ids = self.search_vectors(np.vstack(vectors), k, nprobe, ef_search, allowed_ids)
+            with stage("search.load_texts"):
+                texts = self._load_texts(np.unique(ids[ids != -1]).tolist())
+
+            fresh = {}
+            for key, row_scores, row_ids in zip(missing, scores, ids):
+                fresh[key] = [{"exam_id": int(exam_id), "original_text": texts.get(int(exam_id), ""),
+                               "score": float(score)}
+                              for exam_id, score in zip(row_ids, row_scores) if exam_id != -1]
+                self._result_cache.set((key, options), fresh[key])
+            results = [cached if cached is not None else fresh[key] for key, cached in zip(keys, results)]
+
+        return [[dict(result) for result in query_results] for query_results in results]
+
+    def warm_up(self):
+        """
+        Carrega o índice salvo (memory-map) e o modelo, sem sincronizar com o banco.
+        """
+        self._load()
+        self.model
+        self._encode(["aquecimento"])
+
+    def status(self):
+        return {"index_loaded": self._index is not None,
+                "vectors": int(self._index.ntotal) if self._index is not None else 0,
+                "model_loaded": self._model is not None}
+
+    def cache_stats(self):
+        """
+        Contadores de acertos/erros dos caches de consulta.
+        """
+        return {"query_embeddings": self._embedding_cache.stats(), "search_results": self._result_cache.stats()}
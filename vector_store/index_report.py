@@ -0,0 +1,124 @@
+"""
+Relatório de recall x latência dos índices aproximados de exames.
+
+Compara o índice configurado (`FAISS_INDEX_TYPE`) com uma busca exata
+(IndexFlatIP) sobre os mesmos exames, variando `nprobe` (IVF) ou
+`ef_search` (HNSW), para escolher a configuração com base em números.
+
+Uso:
+    python -m vector_store.index_report --k 10 --sample 200
+    python -m vector_store.index_report --queries "dor de cabeça" "cansaço"
+"""
+import argparse
+import json
+import time
+
+import faiss
+import numpy as np
+from sqlalchemy import func, select
+
+import config
+from database.database_manager import SessionLocal
+from database.engine_profiles import configure_database
+from database.models import MedicalExam
+from vector_store.exam_index import ExamIndex, base_index, build_exam_text
+
+
+def build_exact_index(exam_index):
+    """
+    Codifica todos os exames em um índice exato em memória (referência de recall).
+    """
+    dim = exam_index.model.get_sentence_embedding_dimension()
+    exact = faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+    for rows in exam_index._iter_exam_chunks(config.INDEX_CHUNK_SIZE):
+        ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        exact.add_with_ids(exam_index._encode_documents([build_exam_text(row[1], row[2]) for row in rows]), ids)
+    return exact
+
+
+def sample_queries(n):
+    """
+    Usa os resultados de exames sorteados como consultas de avaliação.
+    """
+    db = SessionLocal()
+    try:
+        rows = db.execute(select(MedicalExam.results).order_by(func.random()).limit(n)).all()
+    finally:
+        db.close()
+    return [results for (results,) in rows if results]
+
+
+def _time_queries(search, vectors, k):
+    latencies, found = [], []
+    for i in range(len(vectors)):
+        started = time.perf_counter()
+        _, ids = search(vectors[i:i + 1], k)
+        latencies.append((time.perf_counter() - started) * 1000)
+        found.append(ids[0])
+    return np.array(latencies), found
+
+
+def _recall(found, truth):
+    hits = []
+    for approx_ids, exact_ids in zip(found, truth):
+        expected = set(exact_ids.tolist()) - {-1}
+        if expected:
+            hits.append(len(expected & set(approx_ids.tolist())) / len(expected))
+    return float(np.mean(hits)) if hits else 1.0
+
+
+def recall_report(exam_index, queries, k=10, nprobes=(1, 4, 16, 64), ef_searches=(16, 32, 64, 128)):
+    """
+    Mede recall@k e latência (média e p95, em ms) de cada configuração de busca.
+    """
+    exam_index.index_medical_exams()
+    vectors = exam_index._encode(queries)
+    exact = build_exact_index(exam_index)
+    latencies, truth = _time_queries(lambda v, kk: exact.search(v, kk), vectors, k)
+    report = [{"setting": "exact", "recall": 1.0,
+               "mean_ms": float(latencies.mean()), "p95_ms": float(np.percentile(latencies, 95))}]
+
+    base = base_index(exam_index._index)
+    if isinstance(base, faiss.IndexIVF):
+        settings = [("nprobe", value) for value in nprobes]
+    elif isinstance(base, faiss.IndexHNSW):
+        settings = [("ef_search", value) for value in ef_searches]
+    else:
+        settings = [(None, None)]
+
+    for name, value in settings:
+        params = {name: value} if name else {}
+        latencies, found = _time_queries(lambda v, kk: exam_index.search_vectors(v, kk, **params), vectors, k)
+        report.append({"setting": f"{exam_index.index_type} {name}={value}" if name else exam_index.index_type,
+                       "recall": _recall(found, truth),
+                       "mean_ms": float(latencies.mean()), "p95_ms": float(np.percentile(latencies, 95))})
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall x latência do índice de exames.")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--sample", type=int, default=100, help="Número de consultas sorteadas dos exames.")
+    parser.add_argument("--queries", nargs="*", help="Consultas explícitas (substituem a amostra).")
+    parser.add_argument("--json", help="Arquivo para salvar o relatório em JSON.")
+    args = parser.parse_args()
+    configure_database()
+
+    queries = args.queries or sample_queries(args.sample)
+    if not queries:
+        print("Nenhuma consulta disponível para avaliar.")
+        return
+    report = recall_report(ExamIndex(), queries, k=args.k)
+
+    print(f"\n--- Recall@{args.k} x latência ({len(queries)} consultas) ---")
+    for row in report:
+        print(f"  {row['setting']:<28} recall={row['recall']:.3f}  "
+              f"média={row['mean_ms']:.2f} ms  p95={row['p95_ms']:.2f} ms")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Relatório salvo em {args.json}")
+
+
+if __name__ == "__main__":
+    main()